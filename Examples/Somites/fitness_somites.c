@@ -10,7 +10,7 @@ static double result[NTRIES][NFUNCTIONS]; //global matrix with fitness fns each
 
 /* These two arrays of stored data used to compute prob[][]  */
 
-static double output_ncell[NCELLTOT][NOUTPUT];  // save the vector of output variables
+static TRY_LOCAL double output_ncell[NCELLTOT][NOUTPUT];  // save the vector of output variables
 
 
 static int input_state=0;   // set in inputs() subroutine input_state = [0,.. NUMLEVELS)
@@ -88,6 +88,8 @@ prmt['ncelltot']=40            #number of cells in an organism
 prmt['nneighbor'] = 3 # must be >0, whatever geometry requires, even for ncelltot=1
 prmt['ntries'] = 1    # number of initial conditions tried in C programs
 prmt['dt'] = 0.01      # time step
+# treatment_fitness only reads the last 10% of the time course, see fitness_somites.c
+prmt['streaming_fitness'] = {'record':['Species'],'window':[int(0.9*prmt['nstep']),prmt['nstep']]}
 
 # Needed in evolution_gill to define evol algorithm and create initial network
 prmt['npopulation'] =50
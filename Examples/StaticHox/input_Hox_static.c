@@ -2,7 +2,7 @@
 
 
 
-static double variability=0;
+static TRY_LOCAL double variability=0;  // drawn at every try, per thread with prmt['openmp_tries']
 
 
 void inputs(int pas,int ncell, int ntry){
@@ -23,8 +23,8 @@ void nogood(int ntry){
 
 void fitness( double history[][NSTEP][NCELLTOT], int trackout[],int ntry)  {
 
-    static int ncalls;
-    static double sum_scores;
+    static TRY_LOCAL int ncalls;
+    static TRY_LOCAL double sum_scores;
     static int max_lag = 100;
     double norm, *hist1;
     int ll;
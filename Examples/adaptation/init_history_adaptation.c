@@ -5,8 +5,8 @@ init_signal creates time dependent input from [0, NSTEP) by integrating a sum of
 tfitness is defined in the fitness C file
 */
 
-static double isignal[NSTEP][NCELLTOT];
-static double dsignal[NSTEP][NCELLTOT];
+static TRY_LOCAL double isignal[NSTEP][NCELLTOT];  // per thread with prmt['openmp_tries']
+static TRY_LOCAL double dsignal[NSTEP][NCELLTOT];
 
 
 static int t1 = 1;   // duration of delta function spike in dsignal, dt units
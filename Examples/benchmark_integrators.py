@@ -0,0 +1,98 @@
+"""Compare the integrators compiled with two sets of prmt values on projects
+
+For every project, the initial network (init_network of the initialization
+file) is written by deriv2.write_program with prmt updated by --baseline and by
+--variant, compiled and run --repeat times. The program prints the output of
+treatment_fitness, the average run time and its peak resident memory (VmHWM,
+printed by the program itself at exit, Linux only). With --statistics the
+histories of the tries are also written and the mean and standard deviation of
+every species over the tries and the second half of the time steps are printed,
+to compare stochastic integrators (the Langevin noise is on when the updated
+prmt['langevin_noise'] is positive).
+
+Example:
+    python benchmark_integrators.py --variant "dict(average_history=False)" Somites StaticHox lac_operon
+    python benchmark_integrators.py --statistics --baseline "dict(langevin_noise=20,ntries=500,nstep=3001,dt=0.05)" --variant "dict(langevin_noise=20,ntries=500,nstep=751,dt=0.2,integrator='../phievo/CCodes/stochastic_heun_integrator.c')" minimal_project
+"""
+import argparse, os, random, subprocess, sys, tempfile, time
+import numpy
+from phievo import initialization_code
+from phievo.Networks import mutation
+
+# printed on stderr by the benchmarked programs, see compiler_flags in run_project
+vmhwm_header = r"""
+#include <stdio.h>
+#include <string.h>
+static void print_vmhwm(void) __attribute__((destructor));
+static void print_vmhwm(void){
+  char line[256];
+  FILE *status=fopen("/proc/self/status","r");
+  if (!status) return;
+  while (fgets(line,sizeof(line),status))
+    if (!strncmp(line,"VmHWM:",6)) fprintf(stderr,"%s",line);
+  fclose(status);
+}
+"""
+
+def load_project(project):
+    """Return the initialization module, deriv2 and the initial network of a project"""
+    model_dir,inits,init_file = initialization_code.check_model_dir(project)
+    mutation.dictionary_ranges.update(inits.dictionary_ranges)
+    deriv2 = initialization_code.init_networks(inits)
+    return inits,deriv2,inits.init_network()
+
+def run_project(deriv2, net, prmt, directory, repeat, print_buf=False):
+    """Compile and run the integrator of net, return [output, seconds per run, peak memory]"""
+    cfile_directory = os.path.join(directory,'built_integrator')
+    with open(cfile_directory+'.c','w') as programm_file:
+        deriv2.write_program(programm_file, net, prmt, print_buf, 1234)
+    header = os.path.join(directory,'vmhwm.h')
+    with open(header,'w') as header_file:
+        header_file.write(vmhwm_header)
+    flags = prmt.get('compiler_flags','')+' -include '+header
+    executable = deriv2.compile_program(cfile_directory, dict(prmt,compiler_flags=flags))
+    start = time.time()
+    for _ in range(repeat):
+        process = subprocess.run([executable], cwd=directory, capture_output=True, text=True)
+    seconds = (time.time()-start)/repeat
+    memory = [line.split(':')[1].strip() for line in process.stderr.splitlines() if line.startswith('VmHWM:')]
+    return [process.stdout.split(), seconds, memory[0] if memory else '?']
+
+def species_statistics(deriv2, net, prmt, directory):
+    """Return the mean and standard deviation of every species in the Buffer files of
+    the tries over the second half of the time steps"""
+    histories = [deriv2.load_history(os.path.join(directory,'Buffer%i'%k), len(net.dict_types['Species']), prmt['nstep'], prmt['ncelltot'])
+                 for k in range(prmt['ntries'])]
+    second_half = numpy.array([history[:,prmt['nstep']//2:,:] for history in histories])
+    return [second_half.mean(axis=(0,2,3)), second_half.std(axis=(0,2,3))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('projects', nargs='+', help='project directories')
+    parser.add_argument('--baseline', default='{}', help='python dict updating prmt for the reference integrator')
+    parser.add_argument('--variant', default='{}', help='python dict updating prmt for the compared integrator')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of every integrator')
+    parser.add_argument('--statistics', action='store_true', help='print the mean and standard deviation of the species')
+    args = parser.parse_args()
+    if len(args.projects) > 1: # a process can only load one project
+        for project in args.projects:
+            subprocess.run([sys.executable,__file__,project,'--baseline',args.baseline,'--variant',args.variant,'--repeat',str(args.repeat)]+(['--statistics'] if args.statistics else []))
+        return
+    project = os.path.abspath(args.projects[0])
+    random.seed(0)
+    inits,deriv2,net = load_project(project)
+    for name,update in [('baseline',args.baseline),('variant',args.variant)]:
+        prmt = dict(inits.prmt)
+        prmt.update(eval(update))
+        deriv2.noise_flag = prmt.get('langevin_noise',0) > 0
+        with tempfile.TemporaryDirectory() as directory:
+            output,seconds,memory = run_project(deriv2, net, prmt, directory, args.repeat, args.statistics)
+            if args.statistics:
+                mean,std = species_statistics(deriv2, net, prmt, directory)
+        print("%-20s %-8s %8.3f s %12s  %s" % (os.path.basename(project),name,seconds,memory,' '.join(output)))
+        if args.statistics:
+            print("%-20s %-8s mean %s" % ('',name,' '.join('%.4g' % value for value in mean)))
+            print("%-20s %-8s std  %s" % ('',name,' '.join('%.4g' % value for value in std)))
+
+if __name__ == '__main__':
+    main()
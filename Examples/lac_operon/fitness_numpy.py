@@ -0,0 +1,36 @@
+"""
+NumPy version of init_history.c, input.c and fitness.c used with
+prmt['backend'] = 'numpy' (see phievo/Networks/deriv_numpy.py).
+
+The signals are drawn with the numpy generator, the fitness is thus only
+statistically comparable to the one of the C version.
+"""
+import numpy
+
+def next_time(rng):
+    return 100+rng.integers(500)
+
+def init_signal(nstep, rng):
+    # a random gate function switching every next_time() steps
+    signal = numpy.zeros(nstep)
+    t, val = 0, rng.integers(2)
+    while t < nstep:
+        tnext = next_time(rng)
+        signal[t:t+tnext] = val
+        t, val = t+tnext, 1-val
+    return signal
+
+def inputs(trackin, prmt, rng):
+    nstep,ncelltot,ntries = prmt['nstep'],prmt['ncelltot'],prmt['ntries']
+    signal = numpy.zeros((len(trackin),nstep,ncelltot,ntries))
+    for ntry in range(ntries):
+        for ninput in range(len(trackin)):
+            for ncell in range(ncelltot):
+                signal[ninput,:,ncell,ntry] = init_signal(nstep, rng)
+    return signal
+
+def fitness(history, trackin, trackout, prmt):
+    prod = numpy.floor(history[trackin[0],:,0]*history[trackin[1],:,0])
+    conc = numpy.minimum(history[trackout[0],:,0],1.)
+    result = ((1.75*prod-.75)*conc).sum(axis=0)/prod.sum(axis=0)
+    return [-result.mean()]
@@ -4,7 +4,7 @@ For this problem, we created a function init_signal that just make a random gate
 
 tfitness is defined in the fitness C file
 */
-static double isignal[NSTEP][NCELLTOT][2];
+static TRY_LOCAL double isignal[NSTEP][NCELLTOT][2];  // per thread with prmt['openmp_tries']
  int next_time(){
         return 100+(rand()%500);
     }
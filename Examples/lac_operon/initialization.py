@@ -47,7 +47,9 @@ cfile['fitness'] = 'fitness.c'
 cfile['init_history'] = 'init_history.c'
 cfile['input'] =  'input.c'
 
+## python version of the C files, used with prmt['backend'] = 'numpy'
 pfile = {}
+pfile['numpy_fitness'] = 'fitness_numpy'
 
 ####################################
 ### Mutation rates for evolution ###
@@ -0,0 +1,24 @@
+"""
+NumPy version of init_history.c, input.c and fitness.c used with
+prmt['backend'] = 'numpy' (see phievo/Networks/deriv_numpy.py).
+
+The arrays have one more axis than in the C files for the tries:
+history[n_gene][pas][ncell][trial].
+"""
+import numpy
+
+def init_history(history, trackin, trackout, prmt, rng):
+    # Everything to 0, except output Species set to 0.5 (for the sake of the example)
+    history[:,0] = 0
+    history[trackout,0] = 0.5
+
+def inputs(trackin, prmt, rng):
+    # input=1 for pas<2.0, 0 afterwards
+    signal = numpy.zeros((len(trackin),prmt['nstep'],prmt['ncelltot'],prmt['ntries']))
+    signal[:,:2] = 1.0
+    return signal
+
+def fitness(history, trackin, trackout, prmt):
+    # Combine the fitnesses obtained in the different trials.
+    result = numpy.zeros(prmt['ntries'])
+    return [result.sum()]
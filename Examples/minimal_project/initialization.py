@@ -29,6 +29,10 @@ cfile['fitness'] = 'fitness.c'
 cfile['init_history'] = 'init_history.c'
 cfile['input'] =  'input.c'
 
+## python version of the C files, used with prmt['backend'] = 'numpy'
+pfile = {}
+pfile['numpy_fitness'] = 'fitness_numpy'
+
 ###############################
 ## SET THE RATES OF MUTATION ##
 ###############################
@@ -168,15 +168,27 @@ class Simulation:
         N_species = len(net.dict_types['Species'])
         self.buffer_data = {"time":np.arange(0,prmt["dt"]*(prmt["nstep"]),prmt["dt"])}
         prmt["ntries"] = trial
-        treatment_fitness = self.deriv2.compile_and_integrate(net,prmt,1000,True)
-        col_select = np.arange(N_species)
-        for i in range(trial):
-            temp = np.genfromtxt('Buffer%d'%i, delimiter='\t')[:,1:]
-            self.buffer_data[i] = {cell:temp[:,col_select + cell*N_species] for cell in range(N_cell)}
-            if erase_buffer:
-                os.remove("Buffer%d"%i)
-            else:
-                os.rename("Buffer{0}".format(i),os.path.join(self.root,"Buffer{0}".format(i)))
+        if prmt.get("backend") == "shared_library":
+            ## The history is directly returned by the shared library, no Buffer file
+            treatment_fitness,history = self.deriv2.shared_integrate(net,prmt,True)
+            for i in range(trial):
+                self.buffer_data[i] = {cell:history[i,:,:,cell].T for cell in range(N_cell)}
+        elif prmt.get("backend") == "numpy":
+            from phievo.Networks import deriv_numpy
+            treatment_fitness,history = deriv_numpy.numpy_integrate(net,prmt,True)
+            for i in range(trial):
+                self.buffer_data[i] = {cell:history[i,:,:,cell].T for cell in range(N_cell)}
+        else:
+            ## Binary Buffer files are mapped in memory instead of being parsed
+            prmt.setdefault("binary_buffer",True)
+            treatment_fitness = self.deriv2.compile_and_integrate(net,prmt,1000,True)
+            for i in range(trial):
+                history = self.deriv2.load_history('Buffer%d'%i,N_species,prmt["nstep"],N_cell)
+                self.buffer_data[i] = {cell:history[:,:,cell].T for cell in range(N_cell)}
+                if erase_buffer:
+                    os.remove("Buffer%d"%i)
+                else:
+                    os.rename("Buffer{0}".format(i),os.path.join(self.root,"Buffer{0}".format(i)))
 
         self.buffer_data["net"] = net
         get_species = re.compile("s\[(\d+)\]")
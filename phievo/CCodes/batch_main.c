@@ -0,0 +1,34 @@
+/* Main of a batch program integrating several networks with the same shape,
+   see deriv2.write_batch_program. It is preceded by the derivC_k functions and
+   the following arrays for every network k:
+   batch_derivCs[k], batch_prm[k], batch_nparam[k], batch_seed[k] and batch_id[k]
+   (the index of the network in the population), and batch_jacobianCs[k] with
+   prmt['jacobian'] (JACOBIAN)
+
+   The main of the project, renamed phievo_main, is called for every network
+   after the tag line "#network id", deriv2.run_batch splits the output on these tags.
+*/
+
+double *prm;
+int runtime_nparam, runtime_seed, runtime_generation, runtime_print_buf;
+
+int main(){
+
+  int k;
+
+  for (k=0;k<NBATCH;k++){
+    batch_derivC=batch_derivCs[k];
+#ifdef JACOBIAN
+    batch_jacobianC=batch_jacobianCs[k];
+#endif
+    prm=batch_prm[k];
+    runtime_nparam=batch_nparam[k];
+    runtime_seed=batch_seed[k];
+    runtime_generation=BATCH_GENERATION;
+    runtime_print_buf=0;
+    printf("\n#network %i\n",batch_id[k]);
+    phievo_main();
+    fflush(stdout);
+  }
+  return 0;
+}
@@ -0,0 +1,203 @@
+/* Adaptive integrator: Dormand-Prince 5(4) embedded Runge-Kutta method with step
+   size control, written on the DT grid of history by its 4th order dense output.
+   Select it with cfile['integrator'] = 'dopri5_integrator.c' in the initialization
+   file (stock cfiles are found in CCodes, see initialization_code.check_model_dir).
+
+   The states of all the cells are integrated together, the diffusion between
+   neighbours is computed from the stage states. At a time between the steps p and
+   p+1 of the grid, derivC is called at step p with the current state written in the
+   column p of HIST and the inputs interpolated linearly between p and p+1: a
+   piecewise constant right hand side would force steps shorter than DT. With
+   delays (HIST(species,step-delay,cell), see TFHill.py) derivC is also called at
+   step p+1 and the two derivatives are interpolated, the steps stop before the
+   delayed values leave the part of the grid already written (min_delay, see
+   deriv2.min_delay2C). The inputs of the steps ahead are read in history, they
+   are copied to HIST with the dense output so that the ring of
+   prmt['streaming_fitness'] only receives complete steps.
+
+   The relative and absolute tolerances are RTOL and ATOL (prmt['rtol'] and
+   prmt['atol']). Deterministic networks only, the langevin noise of
+   compute_noisy_increment is not defined for a variable step.
+*/
+
+#ifndef RTOL
+#define RTOL 1e-6
+#endif
+#ifndef ATOL
+#define ATOL 1e-9
+#endif
+
+int min_delay(void); // see deriv2.min_delay2C
+
+static TRY_LOCAL double dopri_y[NCELLTOT][SIZE],dopri_stage[NCELLTOT][SIZE];
+static TRY_LOCAL double dopri_k[7][NCELLTOT][SIZE];
+static TRY_LOCAL int dopri_input[SIZE];   // 1 for the input species, set by inputs and not integrated
+static TRY_LOCAL int dopri_delay;         // min_delay(), see deriv2.min_delay2C
+static TRY_LOCAL int dopri_ninputs;       // last step of the inputs in history, see dopri_deriv
+
+/* index of the grid point of time t (with a tolerance for the rounding errors) */
+static int dopri_step(double t){
+  int p=(int)(t/DT+1e-6);
+  return p<NSTEP-1 ? p : NSTEP-1;
+}
+
+/* derivC at step p with the state y written in the column p of HIST */
+static void dopri_derivC(double y[], int p, double k[], int ncell){
+  static TRY_LOCAL double memory[SIZE];
+  double column[SIZE];
+  int index;
+  for (index=0;index<SIZE;index++){
+    column[index]=HIST(index,p,ncell);
+    HIST(index,p,ncell)=y[index];
+  }
+  derivC(y,history,p,k,memory,ncell);
+  for (index=0;index<SIZE;index++)
+    HIST(index,p,ncell)=column[index];
+}
+
+/* derivative k[ncell][] of the states y[ncell][] of all the cells at time t */
+static void dopri_deriv(double t, double y[][SIZE], double k[][SIZE], int kk){
+
+  double knext[SIZE],f;
+  int index,ncell,g,neig,neighbour,n_localneig,p=dopri_step(t),pnext=p<NSTEP-1 ? p+1 : p;
+
+  f=MIN(1.0,MAX(0.0,t/DT-p));
+  while (dopri_ninputs<pnext){
+    dopri_ninputs++;
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      inputs(dopri_ninputs,ncell,kk);
+  }
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    for (index=0;index<NINPUT;index++)
+      y[ncell][trackin[index]]=(1-f)*history[trackin[index]][p][ncell]+f*history[trackin[index]][pnext][ncell];
+    dopri_derivC(y[ncell],p,k[ncell],ncell);
+    if (dopri_delay && f>0){  // blend with the delayed values of the step p+1
+      dopri_derivC(y[ncell],pnext,knext,ncell);
+      for (index=0;index<SIZE;index++)
+        k[ncell][index]=(1-f)*k[ncell][index]+f*knext[index];
+    }
+  }
+  /* diffusion between neighbours, see diffusion in utilities.c */
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    for (g=0;g<NDIFFUSIBLE;g++){
+      index=trackdiff[g];
+      n_localneig=0;
+      for (neig=0;neig<NNEIGHBOR;neig++){
+        neighbour=geometry[ncell][neig];
+        if (neighbour>=0){
+          k[ncell][index]+=diff_constant[g]*y[neighbour][index];
+          n_localneig++;
+        }
+      }
+      k[ncell][index]-=diff_constant[g]*n_localneig*y[ncell][index];
+    }
+    for (index=0;index<SIZE;index++)
+      if (dopri_input[index]) k[ncell][index]=0;
+  }
+}
+
+/* stage = y + h*sum_j a[j]*k[j] */
+static void dopri_combine(double h, int nstage, const double a[]){
+  int j,index,ncell;
+  for (ncell=0;ncell<NCELLTOT;ncell++)
+    for (index=0;index<SIZE;index++){
+      dopri_stage[ncell][index]=dopri_y[ncell][index];
+      for (j=0;j<nstage;j++)
+        dopri_stage[ncell][index]+=h*a[j]*dopri_k[j][ncell][index];
+    }
+}
+
+void integrator(int kk){
+
+  /* Dormand-Prince coefficients and dense output (Hairer, Norsett and Wanner) */
+  static const double c[7]={0,1.0/5,3.0/10,4.0/5,8.0/9,1,1};
+  static const double a[7][6]={{0},{1.0/5},{3.0/40,9.0/40},{44.0/45,-56.0/15,32.0/9},
+    {19372.0/6561,-25360.0/2187,64448.0/6561,-212.0/729},
+    {9017.0/3168,-355.0/33,46732.0/5247,49.0/176,-5103.0/18656},
+    {35.0/384,0,500.0/1113,125.0/192,-2187.0/6784,11.0/84}};
+  static const double e[7]={71.0/57600,0,-71.0/16695,71.0/1920,-17253.0/339200,22.0/525,-1.0/40};
+  static const double d[7]={-12715105075.0/11282082432,0,87487479700.0/32700410799,-10690763975.0/1880347072,
+    701980252875.0/199316789632,-1453857185.0/822651844,69997945.0/29380423};
+  double t=0,h=DT,tend=(NSTEP-1)*DT,err,sc,y0,y1,theta,r2,r3,r4,r5,value;
+  int index,ncell,j,s,pas,nfinal=0,fsal=0;
+
+  init_geometry();
+  init_history(kk);
+  for (index=0;index<SIZE;index++) dopri_input[index]=0;
+  for (index=0;index<NINPUT;index++) dopri_input[trackin[index]]=1;
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    history2hist(0,ncell,SIZE,NULL);
+    inputs(0,ncell,kk);
+    history2hist(0,ncell,NINPUT,trackin);
+    for (index=0;index<SIZE;index++)
+      dopri_y[ncell][index]=HIST(index,0,ncell);
+  }
+  dopri_ninputs=0;
+  stream_step(0,kk);  //see utilities.c
+  dopri_delay=min_delay();
+
+  while (nfinal<NSTEP-1 && !integration_aborted){  // see stream_step in utilities.c
+    h=MIN(h,tend-t);
+    if (dopri_delay)  // the delayed values of the stages must be on the grid
+      h=MIN(h,(nfinal+dopri_delay)*DT-t);
+    if (!fsal) dopri_deriv(t,dopri_y,dopri_k[0],kk);
+    for (s=1;s<7;s++){
+      dopri_combine(h,s,a[s]);
+      dopri_deriv(t+c[s]*h,dopri_stage,dopri_k[s],kk);
+    }
+    /* dopri_stage holds the 5th order solution (a[6] are its weights), error of the 4th order one */
+    err=0;
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      for (index=0;index<SIZE;index++){
+        value=0;
+        for (j=0;j<7;j++) value+=e[j]*dopri_k[j][ncell][index];
+        sc=ATOL+RTOL*MAX(fabs(dopri_y[ncell][index]),fabs(dopri_stage[ncell][index]));
+        err+=(h*value/sc)*(h*value/sc);
+      }
+    err=sqrt(err/(SIZE*NCELLTOT));
+    if (!(err<=1) && h>1e-6*DT){  // rejected step (err may be nan), k[0] is still the derivative at t
+      h*=err>1 ? MAX(0.2,0.9*pow(err,-0.2)) : 0.2;
+      fsal=1;
+      continue;
+    }
+    /* accepted step: write the dense output on the grid points in (t,t+h] */
+    for (pas=nfinal+1;pas<NSTEP && pas*DT<=t+h+1e-6*DT;pas++){
+      theta=MIN(1.0,(pas*DT-t)/h);
+      for (ncell=0;ncell<NCELLTOT;ncell++){
+        history2hist(pas,ncell,NINPUT,trackin);
+        for (index=0;index<SIZE;index++){
+          if (dopri_input[index]) continue;
+          y0=dopri_y[ncell][index];
+          y1=dopri_stage[ncell][index];
+          r2=y1-y0;
+          r3=h*dopri_k[0][ncell][index]-r2;
+          r4=r2-h*dopri_k[6][ncell][index]-r3;
+          r5=0;
+          for (j=0;j<7;j++) r5+=d[j]*dopri_k[j][ncell][index];
+          r5*=h;
+          value=y0+theta*(r2+(1-theta)*(r3+theta*(r4+(1-theta)*r5)));
+          HIST(index,pas,ncell)=value<0 ? 0 : value;
+        }
+      }
+      if (stream_step(pas,kk)) break;
+      nfinal=pas;
+    }
+    /* the derivative at t+h is the first stage of the next step unless a species is clamped at 0 */
+    fsal=1;
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      for (index=0;index<SIZE;index++){
+        dopri_y[ncell][index]=dopri_stage[ncell][index];
+        if (dopri_y[ncell][index]<0){
+          dopri_y[ncell][index]=0;
+          fsal=0;
+        }
+      }
+    if (fsal)
+      for (ncell=0;ncell<NCELLTOT;ncell++)
+        for (index=0;index<SIZE;index++)
+          dopri_k[0][ncell][index]=dopri_k[6][ncell][index];
+    t+=h;
+    h*=MIN(5.0,MAX(0.2,0.9*pow(err>1e-10 ? err : 1e-10,-0.2)));
+  }
+  hist2history();
+}
@@ -12,7 +12,7 @@ void integrator(int kk){
     double ds[SIZE];
     double sumligands[SIZE];
     double memory[SIZE];
-    int index,n,pas,ncell;
+    int index,n,pas,ncell,inputs_set=0,moving=0;
 
     for (index=0;index<SIZE;index++){
 	s[index] = 0;
@@ -23,13 +23,40 @@ void integrator(int kk){
     /* initialize geometry here, incase cells move  */
     init_geometry();
     init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+
+#ifdef STEADY_STATE
+    steady_state_init();
+#endif
 
     /* loop over time steps, then over each cell etc */
     for (pas=0;pas<NSTEP-1;pas++)  {
+#ifdef STEADY_STATE
+        /* fast-forward at steady state (prmt['steady_state'], see utilities.c) */
+        inputs_set=(steady_state_quiet>=STEADY_STATE_WINDOW);
+        if (inputs_set){
+            for (ncell=0;ncell<NCELLTOT;ncell++)  {
+                hist2history_cell(pas,ncell);
+                inputs(pas,ncell,kk);
+                inputs2hist(pas,ncell);
+            }
+            if (steady_state_skip(pas)){
+                if (stream_step(pas,kk)) break;
+                continue;
+            }
+        }
+        moving=0;
+#endif
 	for (ncell=0;ncell<NCELLTOT;ncell++)  {
-            inputs(pas,ncell,kk);
+            if (!inputs_set){
+                hist2history_cell(pas,ncell);
+                inputs(pas,ncell,kk);
+                inputs2hist(pas,ncell);
+            }
             for (index=0;index<SIZE;index++) {
-	        s[index]=history[index][pas][ncell];
+	        s[index]=HIST(index,pas,ncell);
             }
             derivC(s,history,pas,ds,memory,ncell);  //local integration
             sum_concentration(ncell,pas,sumligands);  //perform sum of ligands concentrations for non external ligands
@@ -37,15 +64,26 @@ void integrator(int kk){
             /*LRinC(s,ds,sumligands);*/
 
             for (index=0;index<SIZE;index++) {
-	 	 history[index][pas+1][ncell] = s[index] + DT*ds[index];
-		 if (history[index][pas+1][ncell]<0)//might happen for langevin
-		   history[index][pas+1][ncell]=0;
+	 	 HIST(index,pas+1,ncell) = s[index] + DT*ds[index];
+		 if (HIST(index,pas+1,ncell)<0)//might happen for langevin
+		   HIST(index,pas+1,ncell)=0;
+#ifdef STEADY_STATE
+		 moving|=!steady_state_still(index,s[index],ds[index]);
+#endif
 	    }
 	}
+#ifdef STEADY_STATE
+        steady_state_quiet=moving ? 0 : steady_state_quiet+1;
+#endif
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
     }
 
     /* fill in inputs for last time.  */
     for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      hist2history_cell(NSTEP-1,ncell);
       inputs(NSTEP-1,ncell,kk);
+      inputs2hist(NSTEP-1,ncell);
     }
+    stream_step(NSTEP-1,kk);
+    hist2history();
 }
@@ -0,0 +1,95 @@
+/* compute the RHS of equations and run over NSTEP's with 1st order Euler method,
+   all the cells at once (prmt['cell_batched'], see deriv2.derivC2cells).
+   The arugment kk, is an index passed to inputs that records which iteration of
+   initial or boundary conditions the same system of equs is being integrated for
+
+   derivC fills ds[SIZE][NCELLTOT] from history[][step][] whose last index is the
+   cell, so that every loop over the cells is contiguous and can be vectorized.
+   Same results as euler_integrator.c (the ligands sums are not used there either).
+*/
+
+static TRY_LOCAL double ds_cells[SIZE][NCELLTOT];
+
+/* diffusion of the external ligands of all the cells, see diffusion in utilities.c */
+
+static void diffusion_cells(int step, double ds[][NCELLTOT]){
+
+  int g,neig,index,index_diff,n_localneig,ncell;
+  double diff,diffusion;
+
+  for (g=0;g<NDIFFUSIBLE;g++){
+    index_diff=trackdiff[g];
+    diff=diff_constant[g];
+    for (ncell=0;ncell<NCELLTOT;ncell++){
+      diffusion=0;
+      n_localneig=0;
+      for (neig=0;neig<NNEIGHBOR;neig++){
+        index=geometry[ncell][neig];
+        if (index>=0){
+          diffusion+=HIST(index_diff,step,index);
+          n_localneig+=1;
+        }
+      }
+      diffusion-=n_localneig*HIST(index_diff,step,ncell);
+      diffusion*=diff;
+      ds[index_diff][ncell]+=diffusion;
+    }
+  }
+}
+
+void integrator(int kk){
+
+    int index,pas,ncell,moving=0;
+
+    /* initialize geometry here, incase cells move  */
+    init_geometry();
+    init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+
+#ifdef STEADY_STATE
+    steady_state_init();
+#endif
+
+    /* loop over time steps, the cells are looped over in derivC */
+    for (pas=0;pas<NSTEP-1;pas++)  {
+        for (ncell=0;ncell<NCELLTOT;ncell++)  {
+            hist2history_cell(pas,ncell);
+            inputs(pas,ncell,kk);
+            inputs2hist(pas,ncell);
+        }
+#ifdef STEADY_STATE
+        if (steady_state_skip(pas)){  // fast-forward at steady state, see utilities.c
+            if (stream_step(pas,kk)) break;
+            continue;
+        }
+#endif
+        derivC(history,pas,ds_cells);  //local integration of all the cells
+        diffusion_cells(pas,ds_cells);  //computes diffusion of external ligands
+#ifdef STEADY_STATE
+        moving=0;
+        for (index=0;index<SIZE;index++)
+            for (ncell=0;ncell<NCELLTOT;ncell++)
+                moving|=!steady_state_still(index,HIST(index,pas,ncell),ds_cells[index][ncell]);
+        steady_state_quiet=moving ? 0 : steady_state_quiet+1;
+#endif
+
+        for (index=0;index<SIZE;index++) {
+            for (ncell=0;ncell<NCELLTOT;ncell++)  {
+                double next = HIST(index,pas,ncell) + DT*ds_cells[index][ncell];
+                HIST(index,pas+1,ncell) = next<0 ? 0 : next; //might happen for langevin
+            }
+        }
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
+    }
+
+    /* fill in inputs for last time.  */
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      hist2history_cell(NSTEP-1,ncell);
+      inputs(NSTEP-1,ncell,kk);
+      inputs2hist(NSTEP-1,ncell);
+    }
+    stream_step(NSTEP-1,kk);
+    hist2history();
+}
@@ -6,7 +6,15 @@ Any results needed for computing fitness for selection and other diagonstic to b
 returned to python code are accumulated in result[][] array.
 treatment_fitness is called by main after all ntries are run and
 computes what is to be returned to python.  At this stage can compute the fitness
-from history[][][] arveraged over all tries.
+from history[][][] arveraged over all tries (history2[][][], the history of the last try
+with prmt['average_history'] set to False).
+With prmt['streaming_fitness'] only the recorded species and window of history are
+filled, and fitness_step(int step, int trackout[], int ntry) is also supplied when
+prmt['streaming_fitness']['fitness_step'] is set (see integrator_header.h).
+With prmt['early_termination'] the integration stops as soon as a concentration
+diverges, and int early_reject(int step, int trackout[], int ntry) is also supplied
+when prmt['early_termination']['early_reject'] is set to stop hopeless integrations:
+the fitness is then None, fitness() and treatment_fitness() are not called.
 */
 
 #define NFUNCTIONS 2 //number of  functions computed by the fitness function. should be at least 1 for the fitness
@@ -22,6 +30,13 @@ void nogood(int ntry){
     }
 }
 
+#ifdef EARLY_REJECT
+int early_reject(int step, int trackout[], int ntry){
+    /* return 1 to abort, e.g. when the outputs are still 0 halfway */
+    return 0;
+}
+#endif
+
 void fitness(double history[][NSTEP][NCELLTOT], int trackout[], int ntry){
     int k,i;
 
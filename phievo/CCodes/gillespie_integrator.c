@@ -1,107 +1,135 @@
+/* Stochastic integrator: next reaction method of Gibson and Bruck (J. Phys. Chem. A
+   104, 1876 (2000)), an exact Gillespie algorithm. Select it with
+   cfile['integrator'] = 'gillespie_integrator.c' and prmt['gillespie'] = True in the
+   initialization file.
+
+   The reactions of the network, their propensities and the reactions whose
+   propensity changes when a reaction occurs (the dependency graph) are written by
+   deriv2.write_gillespieC. Every reaction of every cell has a putative time in an
+   indexed binary heap: the next reaction is the top of the heap and only the
+   propensities of its dependents are recomputed, their times are rescaled (a
+   single random number per reaction). The cost of a reaction is thus
+   O(dependents*log(reactions)) instead of O(reactions).
+
+   The concentrations stay in the units of derivC: a reaction changes them by
+   1/GILLESPIE_VOLUME and its propensity is GILLESPIE_VOLUME times its rate
+   (see deriv2.gillespie_volume). The state is written in HIST at every time step,
+   the inputs are then set and the propensities depending on the inputs or on the
+   delayed values (gillespie_step_dependent) are updated. No diffusion between the
+   cells, see next_subvolume_integrator.c.
+*/
 
-void sum_concentration_embryo(int step, double concentrations[][NCELLTOT]) {
-
-  int g,neig,index,ncell;
-  for (ncell=0;ncell<NCELLTOT;ncell++)
-  {
-    for (g=0;g<SIZE;g++){
-      concentrations[g][ncell]=0;
-      for (neig=0;neig<NNEIGHBOR;neig++){
-	index=geometry[ncell][neig];
-	if ((index>=0) && (index!=ncell) ) {
-	  concentrations[g][ncell]+=history[g][step][index];
-	}
-      }
-    }
-  }
+#ifndef GILLESPIE
+#error "gillespie_integrator.c requires prmt['gillespie']"
+#endif
+
+static TRY_LOCAL double gillespie_s[NCELLTOT][SIZE];
+static TRY_LOCAL double *gillespie_a,*gillespie_tau;  // propensity and putative time of every reaction of every cell
+static TRY_LOCAL int *gillespie_heap,*gillespie_position;  // heap of the reactions ordered by gillespie_tau and its inverse
+static TRY_LOCAL int gillespie_nactions;
+
+static void gillespie_swap(int i, int j){
+  int action=gillespie_heap[i];
+  gillespie_heap[i]=gillespie_heap[j];
+  gillespie_heap[j]=action;
+  gillespie_position[gillespie_heap[i]]=i;
+  gillespie_position[gillespie_heap[j]]=j;
 }
 
-
-double sum_proba(){//computes the sum of probabilities p
-  double a0=0;
-  int i;
-  for (i=0;i<NACTIONS;i++)
-    a0+=p[i];
-
-  return a0;
-
+/* move the action up or down the heap after a change of its putative time */
+static void gillespie_sift(int action){
+  int i=gillespie_position[action],child;
+  while (i>0 && gillespie_tau[gillespie_heap[(i-1)/2]]>gillespie_tau[action]){
+    gillespie_swap(i,(i-1)/2);
+    i=(i-1)/2;
+  }
+  for (;;){
+    child=2*i+1;
+    if (child>=gillespie_nactions) break;
+    if (child+1<gillespie_nactions && gillespie_tau[gillespie_heap[child+1]]<gillespie_tau[gillespie_heap[child]]) child++;
+    if (!(gillespie_tau[gillespie_heap[child]]<gillespie_tau[action])) break;
+    gillespie_swap(i,child);
+    i=child;
+  }
 }
 
-
-
-int index_next_event(double a){// randomly draws the index of the next mutation
-  double mutation=FRAND()*a;
-  int index_mutation=0;
-  double thresh=0;
-  do{
-    thresh+=p[index_mutation];
-    index_mutation+=1;
-  }while(thresh<mutation);
-  return index_mutation-1;
-
+/* recompute the propensity of the action (reaction+gillespie_nreactions*ncell) at time t:
+   a new putative time is drawn for the action that just occurred (fired) and when the
+   propensity was 0, the others are rescaled */
+static void gillespie_update(int action, double t, int step, int fired){
+  int reaction=action%gillespie_nreactions,ncell=action/gillespie_nreactions;
+  double a=GILLESPIE_VOLUME*propensity(reaction,gillespie_s[ncell],history,step,ncell);
+  if (!(a>0)){  // intercepts nan
+    a=0;
+    gillespie_tau[action]=HUGE_VAL;
+  }
+  else if (fired || gillespie_a[action]==0)
+    gillespie_tau[action]=t-log(1-FRAND())/a;
+  else
+    gillespie_tau[action]=t+gillespie_a[action]/a*(gillespie_tau[action]-t);
+  gillespie_a[action]=a;
+  gillespie_sift(action);
 }
 
-
-
-
-
-
-/* compute the evolution of a system using gillepsie algorithm
-*/
-
 void integrator(int kk){
 
-    double s[SIZE][NCELLTOT];
-    double sumligands[SIZE][NCELLTOT];
-    int index,n,pas,next_event,ncell;
-    double t=0;
-    double dt=0;
-    double a0=0;
-
-    /* initialize geometry here, incase cells move  */
-    init_geometry();
-    init_history(kk);
-    for (n=0;n<NACTIONS;n++)
-      p[n]=0.0;
+  int index,ncell,action,reaction,k,pas=0;
+  double t=0;
 
+  init_geometry();
+  init_history(kk);
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    history2hist(0,ncell,SIZE,NULL);
+    inputs(0,ncell,kk);
+    history2hist(0,ncell,NINPUT,trackin);
     for (index=0;index<SIZE;index++)
+      gillespie_s[ncell][index]=HIST(index,0,ncell);
+  }
+  stream_step(0,kk);  //see utilities.c
+
+  gillespie_nactions=gillespie_nreactions*NCELLTOT;
+  if (!gillespie_heap){  // once per thread with prmt['openmp_tries']
+    gillespie_a=calloc(gillespie_nactions+1,sizeof(double));
+    gillespie_tau=calloc(gillespie_nactions+1,sizeof(double));
+    gillespie_heap=calloc(gillespie_nactions+1,sizeof(int));
+    gillespie_position=calloc(gillespie_nactions+1,sizeof(int));
+  }
+  for (action=0;action<gillespie_nactions;action++){
+    gillespie_a[action]=0;
+    gillespie_tau[action]=HUGE_VAL;
+    gillespie_heap[action]=action;
+    gillespie_position[action]=action;
+  }
+  for (action=0;action<gillespie_nactions;action++)
+    gillespie_update(action,t,pas,1);
+
+  while (pas<NSTEP-1){
+    action=gillespie_heap[0];
+    if (gillespie_nactions==0 || gillespie_tau[action]>(pas+1)*DT){  // no reaction before the next step
+      pas++;
+      t=pas*DT;
+      for (ncell=0;ncell<NCELLTOT;ncell++){
+        for (index=0;index<SIZE;index++)
+          HIST(index,pas,ncell)=gillespie_s[ncell][index];
+        inputs(pas,ncell,kk);
+        history2hist(pas,ncell,NINPUT,trackin);
+        for (index=0;index<NINPUT;index++)
+          gillespie_s[ncell][trackin[index]]=HIST(trackin[index],pas,ncell);
+      }
+      if (stream_step(pas,kk)) break;  //the integration may be aborted
       for (ncell=0;ncell<NCELLTOT;ncell++)
-	s[index][ncell] = history[index][0][ncell];
-
-
-    pas=0;
-    do{
-      for (ncell=0;ncell<NCELLTOT;ncell++)
-	{
-	  inputs(pas,ncell,kk);
-
-	  for (index=0;index<NINPUT;index++) {
-	    s[trackin[index]][ncell]=history[trackin[index]][pas][ncell];
-	  }
-	}
-       //sum_concentration_embryo(pas,sumligands);  //perform sum of ligands concentrations
-	compute_probabilities(s,history,sumligands,pas);
-	a0=sum_proba();
-	//printf(" %f %i\n",a0,pas);
-	if (a0>0){
-	  dt=-1.0/a0*log(FRAND());
-	  next_event=index_next_event(a0);
-	  update_state(s,next_event);
-	  t+=dt;
-	  if (t>(pas+1)*DT)
-	    {
-	      pas+=1;
-	      for (index=0;index<SIZE;index++)
-		for (ncell=0;ncell<NCELLTOT;ncell++)
-		  history[index][pas][ncell]= s[index][ncell] ;
-	    }
-	}
-	else	 {
-
-	    t+=DT;
-	    pas+=1;
-	  }
-
-    }while(pas<NSTEP);
-
+        for (k=0;k<gillespie_nstep_dependent;k++)
+          gillespie_update(gillespie_step_dependent[k]+gillespie_nreactions*ncell,t,pas,0);
+      continue;
+    }
+    t=gillespie_tau[action];
+    reaction=action%gillespie_nreactions;
+    ncell=action/gillespie_nreactions;
+    update_state(gillespie_s[ncell],reaction,1.0/GILLESPIE_VOLUME);
+    for (k=gillespie_dependents_start[reaction];k<gillespie_dependents_start[reaction+1];k++)
+      if (gillespie_dependents[k]!=reaction)
+        gillespie_update(gillespie_dependents[k]+gillespie_nreactions*ncell,t,pas,0);
+    gillespie_update(action,t,pas,1);
+  }
+  hist2history();
 }
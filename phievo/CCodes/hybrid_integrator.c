@@ -0,0 +1,126 @@
+/* Hybrid deterministic/stochastic integrator: the species with more than
+   HYBRID_THRESHOLD molecules (prmt['hybrid_threshold'], 100 by default) follow the
+   Euler method of derivC while the reactions changing a species with fewer molecules
+   occur one at a time as in the Gillespie algorithm. Select it with
+   cfile['integrator'] = 'hybrid_integrator.c' and prmt['gillespie'] in the
+   initialization file.
+
+   The partition is updated at every step. The mean contribution of the stochastic
+   reactions (see deriv2.write_gillespieC) is removed from the derivatives of derivC,
+   these reactions are simulated exactly during the step, with their dependents
+   (gillespie_dependents) updated after every reaction, and the Euler step of the
+   remaining derivatives is added at the end of the step. The propensities see the
+   deterministic species at their value at the beginning of the step. The diffusion
+   stays deterministic.
+*/
+
+#ifndef GILLESPIE
+#error "hybrid_integrator.c requires prmt['gillespie']"
+#endif
+#ifndef HYBRID_THRESHOLD
+#define HYBRID_THRESHOLD 100
+#endif
+
+static TRY_LOCAL double *hybrid_a;     // propensities of the stochastic reactions
+static TRY_LOCAL int *hybrid_stochastic;
+
+/* the state s[] of the cell ncell with the derivatives ds[] of derivC from the step to the next one */
+static void hybrid_step(double s[], double ds[], int step, int ncell){
+
+  double t=0,a0=0,threshold;
+  int index,reaction,last,j,k,dependent,continuous[SIZE];
+
+  for (index=0;index<SIZE;index++)
+    continuous[index]=s[index]*GILLESPIE_VOLUME>=HYBRID_THRESHOLD;
+  for (reaction=0;reaction<gillespie_nreactions;reaction++){
+    hybrid_stochastic[reaction]=0;
+    hybrid_a[reaction]=0;
+    for (j=gillespie_changes_start[reaction];j<gillespie_changes_start[reaction+1];j++)
+      if (!continuous[gillespie_changes_species[j]]) hybrid_stochastic[reaction]=1;
+    if (!hybrid_stochastic[reaction]) continue;
+    hybrid_a[reaction]=GILLESPIE_VOLUME*propensity(reaction,s,history,step,ncell);
+    if (!(hybrid_a[reaction]>0)) hybrid_a[reaction]=0;  // intercepts nan
+    a0+=hybrid_a[reaction];
+    for (j=gillespie_changes_start[reaction];j<gillespie_changes_start[reaction+1];j++)
+      ds[gillespie_changes_species[j]]-=hybrid_a[reaction]*gillespie_changes[j]/GILLESPIE_VOLUME;
+  }
+
+  /* direct method for the stochastic reactions */
+  while (a0>0){
+    t+=-log(1-FRAND())/a0;
+    if (t>=DT) break;
+    threshold=FRAND()*a0;
+    last=-1;
+    for (reaction=0;reaction<gillespie_nreactions;reaction++){
+      if (!(hybrid_a[reaction]>0)) continue;
+      last=reaction;
+      threshold-=hybrid_a[reaction];
+      if (threshold<0) break;
+    }
+    if (last<0) break;  // rounding errors of the updates of a0
+    reaction=last;
+    update_state(s,reaction,1.0/GILLESPIE_VOLUME);
+    for (k=gillespie_dependents_start[reaction];k<gillespie_dependents_start[reaction+1];k++){
+      dependent=gillespie_dependents[k];
+      if (!hybrid_stochastic[dependent]) continue;
+      a0-=hybrid_a[dependent];
+      hybrid_a[dependent]=GILLESPIE_VOLUME*propensity(dependent,s,history,step,ncell);
+      if (!(hybrid_a[dependent]>0)) hybrid_a[dependent]=0;
+      a0+=hybrid_a[dependent];
+    }
+  }
+
+  for (index=0;index<SIZE;index++){
+    s[index]+=DT*ds[index];
+    if (s[index]<0) s[index]=0;
+  }
+}
+
+void integrator(int kk){
+
+    double s[SIZE];
+    double ds[SIZE];
+    double memory[SIZE];
+    int index,pas,ncell;
+
+    for (index=0;index<SIZE;index++){
+	s[index] = 0;
+        ds[index]=0;
+        memory[index]=0;
+    }
+
+    /* initialize geometry here, incase cells move  */
+    init_geometry();
+    init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+    if (!hybrid_a){  // once per thread with prmt['openmp_tries']
+      hybrid_a=calloc(gillespie_nreactions+1,sizeof(double));
+      hybrid_stochastic=calloc(gillespie_nreactions+1,sizeof(int));
+    }
+
+    /* loop over time steps, then over each cell etc */
+    for (pas=0;pas<NSTEP-1;pas++)  {
+	for (ncell=0;ncell<NCELLTOT;ncell++)  {
+            inputs(pas,ncell,kk);
+            history2hist(pas,ncell,NINPUT,trackin);
+            for (index=0;index<SIZE;index++)
+                s[index]=HIST(index,pas,ncell);
+            derivC(s,history,pas,ds,memory,ncell);  //local integration
+            diffusion(ncell,pas,ds,history,geometry);//computes diffusion of external ligands
+            hybrid_step(s,ds,pas,ncell);
+            for (index=0;index<SIZE;index++)
+                HIST(index,pas+1,ncell)=s[index];
+	}
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
+    }
+
+    /* fill in inputs for last time.  */
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      inputs(NSTEP-1,ncell,kk);
+      history2hist(NSTEP-1,ncell,NINPUT,trackin);
+    }
+    stream_step(NSTEP-1,kk);
+    hist2history();
+}
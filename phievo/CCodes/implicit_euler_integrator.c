@@ -0,0 +1,128 @@
+/* Linearly implicit Euler integrator for stiff networks: every step solves
+   (I-DT*J) (s(t+DT)-s(t)) = DT*ds, i.e. a single Newton iteration of the backward
+   Euler method, with J the analytic Jacobian written by deriv2.write_jacobianC.
+   It stays stable when the rates of the network span several orders of
+   magnitude (fast PPI for instance) at a DT for which the Euler method diverges.
+   Select it with cfile['integrator'] = 'implicit_euler_integrator.c' and
+   prmt['jacobian'] = True in the initialization file.
+
+   The diffusion is explicit apart from its diagonal term. The Jacobian is stored
+   dense on purpose: SIZE is the number of species (tens), the matrix stays in
+   the L1 cache and the pivots change the fill-in from step to step, so the
+   elimination simply skips the zeros instead of using a precomputed sparsity
+   pattern. The arguments are the ones of euler_integrator.c.
+*/
+
+#ifndef JACOBIAN
+#error "implicit_euler_integrator.c requires prmt['jacobian'] = True"
+#endif
+
+/* solve a x = b, x is returned in b. Gaussian elimination with partial pivoting
+   skipping the zeros of a, returns 0 if a is singular */
+
+static int sparse_solve(double a[][SIZE], double b[]){
+
+  int i,j,k,pivot,ncols,cols[SIZE];
+  double factor,tmp;
+
+  for (k=0;k<SIZE;k++){
+    pivot=k;
+    for (i=k+1;i<SIZE;i++)
+      if (fabs(a[i][k])>fabs(a[pivot][k])) pivot=i;
+    if (a[pivot][k]==0) return 0;
+    if (pivot!=k){
+      for (j=k;j<SIZE;j++){
+        tmp=a[k][j]; a[k][j]=a[pivot][j]; a[pivot][j]=tmp;
+      }
+      tmp=b[k]; b[k]=b[pivot]; b[pivot]=tmp;
+    }
+    ncols=0;
+    for (j=k+1;j<SIZE;j++)
+      if (a[k][j]!=0) cols[ncols++]=j;
+    for (i=k+1;i<SIZE;i++){
+      if (a[i][k]==0) continue;
+      factor=a[i][k]/a[k][k];
+      for (j=0;j<ncols;j++) a[i][cols[j]]-=factor*a[k][cols[j]];
+      b[i]-=factor*b[k];
+    }
+  }
+  for (k=SIZE-1;k>=0;k--){
+    for (j=k+1;j<SIZE;j++)
+      if (a[k][j]!=0) b[k]-=a[k][j]*b[j];
+    b[k]/=a[k][k];
+  }
+  return 1;
+}
+
+void integrator(int kk){
+
+    double s[SIZE];
+    double ds[SIZE];
+    double sumligands[SIZE];
+    double memory[SIZE];
+    double jac[SIZE][SIZE];
+    int index,jndex,g,neig,pas,ncell;
+
+    for (index=0;index<SIZE;index++){
+	s[index] = 0;
+        ds[index]=0;
+        memory[index]=0;
+    }
+
+    /* initialize geometry here, incase cells move  */
+    init_geometry();
+    init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+
+    /* loop over time steps, then over each cell etc */
+    for (pas=0;pas<NSTEP-1;pas++)  {
+	for (ncell=0;ncell<NCELLTOT;ncell++)  {
+            inputs(pas,ncell,kk);
+            history2hist(pas,ncell,NINPUT,trackin);
+            for (index=0;index<SIZE;index++) {
+	        s[index]=HIST(index,pas,ncell);
+            }
+            derivC(s,history,pas,ds,memory,ncell);  //local integration
+            sum_concentration(ncell,pas,sumligands);  //perform sum of ligands concentrations for non external ligands
+	    diffusion(ncell,pas,ds,history,geometry);//computes diffusion of external ligands
+
+            /* ds becomes DT*ds solved by I-DT*J, the Jacobian of derivC and of the diagonal of the diffusion */
+            jacobianC(s,history,pas,jac,ncell);
+            for (g=0;g<NDIFFUSIBLE;g++)
+              for (neig=0;neig<NNEIGHBOR;neig++)
+                if (geometry[ncell][neig]>=0 && geometry[ncell][neig]!=ncell)
+                  jac[trackdiff[g]][trackdiff[g]]-=diff_constant[g];
+            for (index=0;index<NINPUT;index++)  // the inputs keep their explicit step
+              for (jndex=0;jndex<SIZE;jndex++)
+                jac[trackin[index]][jndex]=0;
+            for (index=0;index<SIZE;index++){
+              for (jndex=0;jndex<SIZE;jndex++)
+                jac[index][jndex]*=-DT;
+              jac[index][index]+=1;
+              ds[index]*=DT;
+            }
+            if (!sparse_solve(jac,ds)){  // explicit Euler step
+              derivC(s,history,pas,ds,memory,ncell);
+              diffusion(ncell,pas,ds,history,geometry);
+              for (index=0;index<SIZE;index++) ds[index]*=DT;
+            }
+
+            for (index=0;index<SIZE;index++) {
+	 	 HIST(index,pas+1,ncell) = s[index] + ds[index];
+		 if (HIST(index,pas+1,ncell)<0)//might happen for langevin
+		   HIST(index,pas+1,ncell)=0;
+	    }
+	}
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
+    }
+
+    /* fill in inputs for last time.  */
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      inputs(NSTEP-1,ncell,kk);
+      history2hist(NSTEP-1,ncell,NINPUT,trackin);
+    }
+    stream_step(NSTEP-1,kk);
+    hist2history();
+}
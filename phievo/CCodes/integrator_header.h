@@ -10,28 +10,184 @@
 #include <float.h>
 #include <limits.h>
 
-/* global arrays for history and geometry */
+/* With prmt['openmp_tries'] the tries of main_general.c run in parallel (OpenMP). The
+   global arrays and the scratch arrays of the integrators are then TRY_LOCAL (thread
+   local), history, history_tm and history_ring become pointers to arrays allocated by
+   every thread, and rand() uses the state of the thread, seeded at every try so that
+   the results do not depend on the number of threads (see openmp_try in utilities.c).
+   The project files must do the same with the state they keep during a try (e.g.
+   static TRY_LOCAL double isignal[NSTEP][NCELLTOT] in Examples/adaptation) or index it
+   by the try (result[ntry]). TRY_ATOMIC variables are shared by all the threads. */
 
+#ifdef OPENMP_TRIES
+#include <omp.h>
+#define TRY_LOCAL _Thread_local
+#define TRY_ATOMIC _Atomic
+#ifndef OPENMP_THREADS
+#define OPENMP_THREADS (NTRIES<omp_get_max_threads() ? NTRIES : omp_get_max_threads())
+#endif
+static TRY_LOCAL unsigned int try_rand_state;
+#define rand() rand_r(&try_rand_state)
+#define srand(seed) (try_rand_state=(unsigned int)(seed))
+#else
+#define TRY_LOCAL
+#define TRY_ATOMIC
+#endif
+
+/* With prmt['fast_rng'] rand(), srand() and FRAND() use the xoshiro256** generator of
+   Blackman and Vigna instead of the C library: its state try_rng is seeded from SEED and
+   the try at the beginning of every try (rng_try), so that the tries are reproducible
+   with or without prmt['openmp_tries'], and gaussdev uses the ziggurat method (see
+   utilities.c). */
+
+#ifdef FAST_RNG
+#include <stdint.h>
+typedef struct {uint64_t s[4];} rng_state;
+static TRY_LOCAL rng_state try_rng;
+
+static uint64_t rng_rotl(uint64_t x, int k){
+  return (x<<k)|(x>>(64-k));
+}
+
+static uint64_t rng_next(rng_state *state){
+  uint64_t *s=state->s;
+  uint64_t result=rng_rotl(s[1]*5,7)*9,t=s[1]<<17;
+  s[2]^=s[0];
+  s[3]^=s[1];
+  s[1]^=s[2];
+  s[0]^=s[3];
+  s[2]^=t;
+  s[3]=rng_rotl(s[3],45);
+  return result;
+}
+
+/* the state of the stream of the seed, filled by splitmix64 */
+static void rng_seed(rng_state *state, unsigned int seed, unsigned int stream){
+  uint64_t x=(uint64_t)seed|((uint64_t)stream<<32),z;
+  int i;
+  for (i=0;i<4;i++){
+    z=(x+=0x9E3779B97F4A7C15ULL);
+    z=(z^(z>>30))*0xBF58476D1CE4E5B9ULL;
+    z=(z^(z>>27))*0x94D049BB133111EBULL;
+    state->s[i]=z^(z>>31);
+  }
+}
+
+#undef RAND_MAX
+#define RAND_MAX 2147483647
+#undef rand
+#undef srand
+#define rand() ((int)(rng_next(&try_rng)>>33))
+#define srand(seed) rng_seed(&try_rng,(unsigned int)(seed),0)
+#define rng_try(ntry) rng_seed(&try_rng,(unsigned int)(SEED),(unsigned int)(ntry)+1)
+#endif
+
+/* global arrays for history and geometry, not defined in the file of derivC
+   when it is compiled separately (prmt['precompiled_objects'], see deriv2.write_program) */
+
+#ifndef DERIVC_UNIT
+#ifdef OPENMP_TRIES
+static TRY_LOCAL double (*history)[NSTEP][NCELLTOT];
+#else
 static double history[SIZE][NSTEP][NCELLTOT];
-static int geometry[NCELLTOT][NNEIGHBOR];
+#endif
+static TRY_LOCAL int geometry[NCELLTOT][NNEIGHBOR];
+#endif
+
+/* With prmt['history_layout'] = 'time_major' the integrators and derivC go through
+   HIST(species,step,cell) (see deriv2.all_params2C) to history_tm, where the species of a
+   cell at a given step are contiguous. history keeps the layout used by the init_history,
+   inputs and fitness functions: the values they set are copied to history_tm with
+   history2hist (all the species of the cell around every call of inputs, see
+   inputs2hist) and history_tm is copied back to history at the end of the integrator
+   (see utilities.c). */
+
+#ifdef HISTORY_TIME_MAJOR
+#if defined(DERIVC_UNIT) && defined(OPENMP_TRIES)
+extern TRY_LOCAL double (*history_tm)[NCELLTOT][SIZE];
+#elif defined(DERIVC_UNIT)
+extern double history_tm[NSTEP][NCELLTOT][SIZE];
+#elif defined(OPENMP_TRIES)
+TRY_LOCAL double (*history_tm)[NCELLTOT][SIZE];
+#else
+double history_tm[NSTEP][NCELLTOT][SIZE];
+#endif
+#endif
+
+/* With prmt['streaming_fitness'] HIST goes to history_ring, which only keeps the last
+   NHISTORY steps (see deriv2.streaming_defines). history is filled by init_history and
+   inputs as above, and by stream_step (utilities.c) with the recorded species during the
+   recorded window: the rest of the static array is never written and takes no memory.
+   fitness_step is supplied with the fitness when FITNESS_STEP is defined, it is called
+   once a step is complete and may read HIST(species,step-k,cell) for k < lookback. */
+
+#ifdef STREAMING_FITNESS
+#if defined(DERIVC_UNIT) && defined(OPENMP_TRIES)
+extern TRY_LOCAL double (*history_ring)[NHISTORY][NCELLTOT];
+#elif defined(DERIVC_UNIT)
+extern double history_ring[SIZE][NHISTORY][NCELLTOT];
+#elif defined(OPENMP_TRIES)
+TRY_LOCAL double (*history_ring)[NHISTORY][NCELLTOT];
+#else
+double history_ring[SIZE][NHISTORY][NCELLTOT];
+#endif
+#ifdef FITNESS_STEP
+void fitness_step(int step, int trackout[], int ntry);
+#endif
+#endif
+
+/* With prmt['early_termination']['early_reject'] the fitness file also supplies
+   early_reject, called every EARLY_TERMINATION steps once the step is complete: it may
+   read HIST(species,step,cell) and returns nonzero to abort the integration of the
+   network (see stream_step in utilities.c) */
 
-double MAX(double a,double b){
+#ifdef EARLY_REJECT
+int early_reject(int step, int trackout[], int ntry);
+#endif
+
+/* With prmt['jacobian'] the file of derivC also defines jacobianC, see deriv2.write_jacobianC */
+
+#ifdef JACOBIAN
+void jacobianC(double s[],double history[][NSTEP][NCELLTOT],int step, double jac[][SIZE],int ncell);
+#endif
+
+/* With prmt['gillespie'] it also defines the reactions of the network, their
+   dependency graph and their stoichiometry used by gillespie_integrator.c,
+   next_subvolume_integrator.c, tau_leaping_integrator.c and hybrid_integrator.c,
+   see deriv2.write_gillespieC */
+
+#ifdef GILLESPIE
+double propensity(int reaction,double s[],double history[][NSTEP][NCELLTOT],int step,int ncell);
+void update_state(double s[],int reaction,double increment);
+extern const int gillespie_nreactions,gillespie_nstep_dependent;
+extern const int gillespie_dependents_start[],gillespie_dependents[],gillespie_step_dependent[];
+extern const int gillespie_changes_start[],gillespie_changes_species[],gillespie_changes[],gillespie_order[];
+extern const int gillespie_readers_start[],gillespie_readers[];
+#endif
+
+double compute_noisy_increment(double rate); // see utilities.c
+
+static double MAX(double a,double b){
 	 if (a>b) return a;
  	 return b;
 }
  
-double FRAND()  {
+static double FRAND()  {
+#ifdef FAST_RNG
+	return (rng_next(&try_rng)>>11)*0x1.0p-53;
+#else
 	return (double) rand()/((double)RAND_MAX + 1);
+#endif
 }
  
-double MIN( double a, double b ) {
+static double MIN( double a, double b ) {
 	if (a<b) return a;
 	return b;
 }
 
 
 
-double POW(double x,double n){
+static double POW(double x,double n){
   return exp(n*log(x));
 }
 
@@ -39,16 +195,35 @@ double POW(double x,double n){
 
 
 
-double HillR(double x,double thresh,double n)
+static double HillR(double x,double thresh,double n)
 {
 	double r=exp(n*log(x/thresh));
 	return 1.0/(1+r);
 }
  
  
-double HillA(double x,double thresh,double n)
+static double HillA(double x,double thresh,double n)
 {
 	double r=exp(n*log(x/thresh));
 	return r/(1+r);
  }
 
+/* derivatives with respect to x used by jacobianC */
+
+static double dPOW(double x,double n){
+  if (x<=0) return 0;
+  return n*exp((n-1)*log(x));
+}
+
+static double dHillA(double x,double thresh,double n)
+{
+	if (x<=0) return 0;
+	double r=exp(n*log(x/thresh));
+	return n*r/(x*(1+r)*(1+r));
+}
+
+static double dHillR(double x,double thresh,double n)
+{
+	return -dHillA(x,thresh,n);
+}
+
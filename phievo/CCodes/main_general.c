@@ -7,31 +7,64 @@ int main()  {
     srand( SEED );
     int i,k,l;
     double score = 0;
-    int len_hist = SIZE*NCELLTOT*NSTEP;
-    double *hptr = &history[0][0][0];
-    /* following incase one wants to average history before doing fitness */
-    static double history2[SIZE][NSTEP][NCELLTOT];
-    double *h2ptr = &history2[0][0][0];//table for averaging output (used for multicell problems)
+#ifdef AVERAGE_HISTORY
+    /* following incase one wants to average history before doing fitness (prmt['average_history'], True by default) */
+    static double history2[SIZE][NSTEP][NCELLTOT];//table for averaging output (used for multicell problems), see add_history
+#else
+    double (*history2)[NSTEP][NCELLTOT] = history;//otherwise treatment_fitness receives the history of the last try
+#endif
 
     /* dummy return when no outputs for fitness function */
     if(NOUTPUT <= 0) {
         printf("%s","no output variables? terminating without integration" );
     }
 
-    for(i=0; i<len_hist; i++)  {
-        *(h2ptr + i) = 0;
-    }
-
+    integration_aborted=0;
+    steady_state_skipped=0;
+#ifdef OPENMP_TRIES
+    /* prmt['openmp_tries']: the tries run in parallel, every thread with its own history */
+    double (*last_history)[NSTEP][NCELLTOT] = NULL;
+#pragma omp parallel for ordered schedule(static,1) num_threads(OPENMP_THREADS)
+#endif
     for (k=0; k<NTRIES; k++){
+        if (integration_aborted) continue;  //the remaining tries are skipped
+#if defined(OPENMP_TRIES)
+        openmp_try(k);  //see utilities.c
+#elif defined(FAST_RNG)
+        rng_try(k);  //see integrator_header.h
+#endif
         integrator(k);
+        if (integration_aborted){  //prmt['early_termination'], see stream_step in utilities.c
+            if( PRINT_BUF ) print_history(k);
+            continue;
+        }
         fitness(history, trackout,k);
         if( PRINT_BUF )  {
             print_history(k);
         }
-
-        for(i=0; i<len_hist; i++)  {
-            *(h2ptr+i) += *(hptr +i);
-        }
+#ifdef AVERAGE_HISTORY
+#ifdef OPENMP_TRIES
+#pragma omp ordered
+#endif
+        add_history(history2,k);  //in the order of the tries, as in the sequential loop
+#endif
+#ifdef OPENMP_TRIES
+        if (k==NTRIES-1) last_history=history;
+#endif
     }
-    treatment_fitness(history2,trackout);
+#if defined(OPENMP_TRIES)
+    openmp_last_history(last_history);
+#ifndef AVERAGE_HISTORY
+    history2=history;
+#endif
+#elif defined(FAST_RNG)
+    rng_try(NTRIES);  //treatment_fitness draws the same numbers as with prmt['openmp_tries']
+#endif
+    if (integration_aborted)
+        printf("\n");  //an empty line is read as a None fitness, see deriv2.split_output
+    else
+        treatment_fitness(history2,trackout);
+#ifdef STEADY_STATE
+    printf("\n#steady_state_skipped %li\n",steady_state_skipped);  //see deriv2.split_output
+#endif
 }
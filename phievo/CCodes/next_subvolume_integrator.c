@@ -0,0 +1,200 @@
+/* Stochastic integrator with diffusion between the cells: next subvolume method of
+   Elf and Ehrenberg (Syst. Biol. 1, 230 (2004)). Select it with
+   cfile['integrator'] = 'next_subvolume_integrator.c' and prmt['gillespie'] in the
+   initialization file.
+
+   Every cell is a subvolume of GILLESPIE_VOLUME with the reactions of
+   deriv2.write_gillespieC and, for every diffusible species, the diffusion of one
+   molecule to one of its neighbours (geometry[][], see diffusion in utilities.c) with
+   propensity diff_constant times the number of molecules and of neighbours. Only the
+   cells have a putative time, in an indexed binary heap: the cell at the top of the
+   heap undergoes an event chosen among its own propensities, the propensities of its
+   dependents (gillespie_dependents, or gillespie_readers of the diffusing species in
+   both cells) are recomputed and the time of the cell is drawn again, the time of a
+   cell receiving a molecule is rescaled. An event costs O(reactions+log(cells)), so
+   that the cost of the integration grows linearly with the number of cells.
+
+   As in gillespie_integrator.c, the state is written in HIST at every time step, the
+   inputs are then set and the propensities depending on the inputs or on the delayed
+   values (gillespie_step_dependent) are updated.
+*/
+
+#ifndef GILLESPIE
+#error "next_subvolume_integrator.c requires prmt['gillespie']"
+#endif
+
+static TRY_LOCAL double nsm_s[NCELLTOT][SIZE];
+static TRY_LOCAL double *nsm_a;  // propensity of every reaction of every cell (reaction+gillespie_nreactions*ncell)
+static TRY_LOCAL double nsm_diffusion[NCELLTOT][NDIFFUSIBLE+1];  // propensity of the diffusion out of the cell
+static TRY_LOCAL double nsm_a0[NCELLTOT],nsm_tau[NCELLTOT];  // total propensity and putative time of every cell
+static TRY_LOCAL int nsm_heap[NCELLTOT],nsm_position[NCELLTOT];  // heap of the cells ordered by nsm_tau and its inverse
+static TRY_LOCAL int nsm_nneighbor[NCELLTOT];  // number of neighbours other than the cell itself
+
+static void nsm_swap(int i, int j){
+  int ncell=nsm_heap[i];
+  nsm_heap[i]=nsm_heap[j];
+  nsm_heap[j]=ncell;
+  nsm_position[nsm_heap[i]]=i;
+  nsm_position[nsm_heap[j]]=j;
+}
+
+/* move the cell up or down the heap after a change of its putative time */
+static void nsm_sift(int ncell){
+  int i=nsm_position[ncell],child;
+  while (i>0 && nsm_tau[nsm_heap[(i-1)/2]]>nsm_tau[ncell]){
+    nsm_swap(i,(i-1)/2);
+    i=(i-1)/2;
+  }
+  for (;;){
+    child=2*i+1;
+    if (child>=NCELLTOT) break;
+    if (child+1<NCELLTOT && nsm_tau[nsm_heap[child+1]]<nsm_tau[nsm_heap[child]]) child++;
+    if (!(nsm_tau[nsm_heap[child]]<nsm_tau[ncell])) break;
+    nsm_swap(i,child);
+    i=child;
+  }
+}
+
+static void nsm_propensity(int ncell, int reaction, int step){
+  double a=GILLESPIE_VOLUME*propensity(reaction,nsm_s[ncell],history,step,ncell);
+  nsm_a[reaction+gillespie_nreactions*ncell]=a>0 ? a : 0;  // intercepts nan
+}
+
+static void nsm_diffusion_propensity(int ncell, int g){
+  nsm_diffusion[ncell][g]=diff_constant[g]*nsm_nneighbor[ncell]*nsm_s[ncell][trackdiff[g]]*GILLESPIE_VOLUME;
+}
+
+/* the number of molecules of the species changes in the cell */
+static void nsm_species_changed(int ncell, int index, int step){
+  int k,g;
+  for (k=gillespie_readers_start[index];k<gillespie_readers_start[index+1];k++)
+    nsm_propensity(ncell,gillespie_readers[k],step);
+  for (g=0;g<NDIFFUSIBLE;g++)
+    if (trackdiff[g]==index) nsm_diffusion_propensity(ncell,g);
+}
+
+/* sum the propensities of the cell at time t: a new putative time is drawn for the cell
+   where the event occurred (fired) and when its propensity was 0, the others are rescaled */
+static void nsm_update(int ncell, double t, int fired){
+  double a0=0;
+  int reaction,g;
+  for (reaction=0;reaction<gillespie_nreactions;reaction++)
+    a0+=nsm_a[reaction+gillespie_nreactions*ncell];
+  for (g=0;g<NDIFFUSIBLE;g++)
+    a0+=nsm_diffusion[ncell][g];
+  if (!(a0>0)){
+    a0=0;
+    nsm_tau[ncell]=HUGE_VAL;
+  }
+  else if (fired || nsm_a0[ncell]==0)
+    nsm_tau[ncell]=t-log(1-FRAND())/a0;
+  else
+    nsm_tau[ncell]=t+nsm_a0[ncell]/a0*(nsm_tau[ncell]-t);
+  nsm_a0[ncell]=a0;
+  nsm_sift(ncell);
+}
+
+/* one event in the cell at time t, reaction or diffusion to a neighbour */
+static void nsm_event(int ncell, double t, int step){
+  double threshold=FRAND()*nsm_a0[ncell],increment=1.0/GILLESPIE_VOLUME;
+  int reaction,g,k,neig,index,neighbor=-1,last=-1;
+
+  for (reaction=0;reaction<gillespie_nreactions && threshold>=0;reaction++)
+    if (nsm_a[reaction+gillespie_nreactions*ncell]>0){
+      last=reaction;
+      threshold-=nsm_a[reaction+gillespie_nreactions*ncell];
+    }
+  for (g=0;g<NDIFFUSIBLE && threshold>=0;g++)
+    if (nsm_diffusion[ncell][g]>0){
+      last=gillespie_nreactions+g;
+      threshold-=nsm_diffusion[ncell][g];
+    }  // last absorbs the rounding errors of the sum
+
+  if (last>=0 && last<gillespie_nreactions){
+    update_state(nsm_s[ncell],last,increment);
+    for (k=gillespie_dependents_start[last];k<gillespie_dependents_start[last+1];k++)
+      nsm_propensity(ncell,gillespie_dependents[k],step);
+    for (k=gillespie_changes_start[last];k<gillespie_changes_start[last+1];k++)
+      for (g=0;g<NDIFFUSIBLE;g++)
+        if (trackdiff[g]==gillespie_changes_species[k]) nsm_diffusion_propensity(ncell,g);
+  }
+  else if (last>=0){
+    index=trackdiff[last-gillespie_nreactions];
+    k=(int)(FRAND()*nsm_nneighbor[ncell]);
+    for (neig=0;neig<NNEIGHBOR;neig++){
+      if (geometry[ncell][neig]<0 || geometry[ncell][neig]==ncell) continue;
+      neighbor=geometry[ncell][neig];
+      if (k--==0) break;
+    }
+    nsm_s[ncell][index]=MAX(nsm_s[ncell][index]-increment,0);
+    nsm_s[neighbor][index]+=increment;
+    nsm_species_changed(ncell,index,step);
+    nsm_species_changed(neighbor,index,step);
+    nsm_update(neighbor,t,0);
+  }
+  nsm_update(ncell,t,1);
+}
+
+void integrator(int kk){
+
+  int index,ncell,reaction,g,neig,k,pas=0;
+  double t=0;
+
+  init_geometry();
+  init_history(kk);
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    history2hist(0,ncell,SIZE,NULL);
+    inputs(0,ncell,kk);
+    history2hist(0,ncell,NINPUT,trackin);
+    for (index=0;index<SIZE;index++)
+      nsm_s[ncell][index]=HIST(index,0,ncell);
+  }
+  stream_step(0,kk);  //see utilities.c
+
+  if (!nsm_a)  // once per thread with prmt['openmp_tries']
+    nsm_a=calloc(gillespie_nreactions*NCELLTOT+1,sizeof(double));
+  for (ncell=0;ncell<NCELLTOT;ncell++){
+    nsm_nneighbor[ncell]=0;
+    for (neig=0;neig<NNEIGHBOR;neig++)
+      if (geometry[ncell][neig]>=0 && geometry[ncell][neig]!=ncell) nsm_nneighbor[ncell]++;
+    for (reaction=0;reaction<gillespie_nreactions;reaction++)
+      nsm_propensity(ncell,reaction,pas);
+    for (g=0;g<NDIFFUSIBLE;g++)
+      nsm_diffusion_propensity(ncell,g);
+    nsm_a0[ncell]=0;
+    nsm_tau[ncell]=HUGE_VAL;
+    nsm_heap[ncell]=ncell;
+    nsm_position[ncell]=ncell;
+  }
+  for (ncell=0;ncell<NCELLTOT;ncell++)
+    nsm_update(ncell,t,1);
+
+  while (pas<NSTEP-1){
+    ncell=nsm_heap[0];
+    if (nsm_tau[ncell]>(pas+1)*DT){  // no event before the next step
+      pas++;
+      t=pas*DT;
+      for (ncell=0;ncell<NCELLTOT;ncell++){
+        for (index=0;index<SIZE;index++)
+          HIST(index,pas,ncell)=nsm_s[ncell][index];
+        inputs(pas,ncell,kk);
+        history2hist(pas,ncell,NINPUT,trackin);
+        for (index=0;index<NINPUT;index++)
+          nsm_s[ncell][trackin[index]]=HIST(trackin[index],pas,ncell);
+      }
+      if (stream_step(pas,kk)) break;  //the integration may be aborted
+      for (ncell=0;ncell<NCELLTOT;ncell++){
+        for (k=0;k<gillespie_nstep_dependent;k++)
+          nsm_propensity(ncell,gillespie_step_dependent[k],pas);
+        for (index=0;index<NINPUT;index++)
+          for (g=0;g<NDIFFUSIBLE;g++)
+            if (trackdiff[g]==trackin[index]) nsm_diffusion_propensity(ncell,g);
+        nsm_update(ncell,t,0);
+      }
+      continue;
+    }
+    t=nsm_tau[ncell];
+    nsm_event(ncell,t,pas);
+  }
+  hist2history();
+}
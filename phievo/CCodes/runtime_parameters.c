@@ -0,0 +1,74 @@
+/* Runtime parameters, used when prmt['runtime_parameters'] is set so that one
+   executable serves all the networks with the same topology.
+
+   The executable reads its parameters before main() is called. deriv2 sends on
+   the standard input: SEED GENERATION PRINT_BUF NPARAM followed by the NPARAM
+   values of prm[]
+
+   When compiled as a shared library (PHIEVO_SHARED, see shared_library.c) the
+   parameters are given to integrate() instead, the output of printf is kept in
+   a buffer returned to python and print_history() copies history in an array.
+
+   In a batch program (PHIEVO_BATCH, see batch_main.c) the parameters of every
+   network are written in the program and nothing is read.
+*/
+
+#if !defined(PHIEVO_SHARED) && !defined(PHIEVO_BATCH)
+
+static void load_runtime_parameters(void) __attribute__((constructor));
+
+static void load_runtime_parameters(void){
+
+  int i,nparam;
+
+  if (scanf("%i %i %i %i",&runtime_seed,&runtime_generation,&runtime_print_buf,&nparam)!=4 || nparam!=NPARAM){
+    fprintf(stderr,"runtime parameters: expected a header with %i parameters\n",NPARAM);
+    exit(1);
+  }
+  for (i=0;i<NPARAM;i++){
+    if (scanf("%lf",&prm[i])!=1){
+      fprintf(stderr,"runtime parameters: missing parameter %i\n",i);
+      exit(1);
+    }
+  }
+}
+
+#elif defined(PHIEVO_SHARED)
+
+#include <stdarg.h>
+
+static char *shared_out;
+static int shared_out_len, shared_out_pos;
+static double *shared_history;
+
+/* replaces printf in the following functions (treatment_fitness...) */
+int shared_printf(const char *format, ...){
+
+  va_list args;
+  int n;
+
+  va_start(args,format);
+  if (shared_out_pos<shared_out_len)
+    n=vsnprintf(shared_out+shared_out_pos,shared_out_len-shared_out_pos,format,args);
+  else
+    n=vsnprintf(NULL,0,format,args);
+  va_end(args);
+  if (n>0) shared_out_pos+=n;
+  return n;
+}
+#define printf shared_printf
+
+/* called by print_history(), copy the history of a trial in the python array */
+void store_history(int trial){
+
+  int i,pas,j;
+  double *ptr=shared_history+(long)trial*SIZE*NSTEP*NCELLTOT;
+
+  for (i=0;i<SIZE;i++)
+    for (pas=0;pas<NSTEP;pas++)
+      for (j=0;j<NCELLTOT;j++)
+        *(ptr++)=history[i][pas][j];
+}
+
+#endif
+
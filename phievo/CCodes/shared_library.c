@@ -0,0 +1,38 @@
+/* Entry point of the shared library built when prmt['backend']='shared_library'
+   The file is compiled with -Dmain=phievo_main so that the main of the project
+   is called for every integration, see deriv2.shared_integrate.
+*/
+
+/* give the dimensions of the history array: NTRIES, SIZE, NSTEP, NCELLTOT */
+void history_shape(int shape[]){
+  shape[0]=NTRIES;
+  shape[1]=SIZE;
+  shape[2]=NSTEP;
+  shape[3]=NCELLTOT;
+}
+
+/* integrate the network with the parameters params. The output of treatment_fitness
+   is written in out (at most out_len chars) and, if history_out is not NULL, the
+   history of every try is copied in it (see store_history).
+   Return the number of chars printed by treatment_fitness or -1 on error. */
+int integrate(double params[], int nparam, int seed, int generation, double history_out[], char out[], int out_len){
+
+  int i;
+
+  if (nparam!=NPARAM)
+    return -1;
+  for (i=0;i<NPARAM;i++)
+    prm[i]=params[i];
+  runtime_seed=seed;
+  runtime_generation=generation;
+  runtime_print_buf=(history_out!=NULL);
+  shared_history=history_out;
+  shared_out=out;
+  shared_out_len=out_len;
+  shared_out_pos=0;
+  out[0]='\0';
+
+  phievo_main();
+  return shared_out_pos;
+}
+
@@ -0,0 +1,82 @@
+/* Stochastic Runge-Kutta integrator for the chemical Langevin equation (langevin_noise):
+   Heun predictor-corrector for the drift with the noise of the Euler-Maruyama method,
+   evaluated at the beginning of the step (Ito). Select it with
+   cfile['integrator'] = 'stochastic_heun_integrator.c' in the initialization file.
+
+   With f the drift of derivC (the rates, compute_noisy_increment without noise, see
+   drift_only in utilities.c) and G dW its noise, a step reads
+       Y = s + DT*f(s) + G(s) dW
+       s' = s + DT*(f(s)+f(Y))/2 + G(s) dW
+   so that the deterministic part is of second order: for a linear network the error of
+   the stationary variance is O(DT^2) instead of O(DT) with euler_integrator.c, and a
+   coarser prmt['dt'] gives the same statistics. It costs three calls of derivC per step
+   (two without langevin_noise). Y and s' are clamped at 0, the concentrations stay
+   positive. Y is written in HIST at the next step, where derivC reads the transcription
+   factors, with the inputs of the beginning of the step (they are constant during a
+   step as with euler_integrator.c). The diffusion between the cells is explicit (Euler).
+*/
+
+void integrator(int kk){
+
+    double s[SIZE];
+    double ds[SIZE];
+    double drift[SIZE];
+    double drift_predicted[SIZE];
+    double memory[SIZE];
+    int index,pas,ncell;
+
+    for (index=0;index<SIZE;index++){
+	s[index] = 0;
+        ds[index]=0;
+        memory[index]=0;
+    }
+
+    /* initialize geometry here, incase cells move  */
+    init_geometry();
+    init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+
+    /* loop over time steps, then over each cell etc */
+    for (pas=0;pas<NSTEP-1;pas++)  {
+	for (ncell=0;ncell<NCELLTOT;ncell++)  {
+            inputs(pas,ncell,kk);
+            history2hist(pas,ncell,NINPUT,trackin);
+            for (index=0;index<SIZE;index++)
+	        s[index]=HIST(index,pas,ncell);
+            derivC(s,history,pas,ds,memory,ncell);  //drift and noise
+            drift_only=1;
+#ifdef LANGEVIN_NOISE
+            derivC(s,history,pas,drift,memory,ncell);
+#else
+            for (index=0;index<SIZE;index++)
+                drift[index]=ds[index];
+#endif
+	    diffusion(ncell,pas,ds,history,geometry);//computes diffusion of external ligands
+
+            /* predictor, written in HIST for the transcriptions */
+            for (index=0;index<SIZE;index++)
+                HIST(index,pas+1,ncell)=MAX(s[index]+DT*ds[index],0);
+            for (index=0;index<NINPUT;index++)  //the inputs are constant during the step
+                HIST(trackin[index],pas+1,ncell)=s[trackin[index]];
+            for (index=0;index<SIZE;index++)
+                s[index]=HIST(index,pas+1,ncell);
+            derivC(s,history,pas+1,drift_predicted,memory,ncell);
+            drift_only=0;
+
+            /* corrector */
+            for (index=0;index<SIZE;index++)
+                HIST(index,pas+1,ncell)=MAX(HIST(index,pas,ncell)+DT*(ds[index]+0.5*(drift_predicted[index]-drift[index])),0);
+	}
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
+    }
+
+    /* fill in inputs for last time.  */
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      inputs(NSTEP-1,ncell,kk);
+      history2hist(NSTEP-1,ncell,NINPUT,trackin);
+    }
+    stream_step(NSTEP-1,kk);
+    hist2history();
+}
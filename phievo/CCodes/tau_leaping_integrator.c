@@ -0,0 +1,207 @@
+/* Stochastic integrator: adaptive tau-leaping of Cao, Gillespie and Petzold (J. Chem.
+   Phys. 124, 044109 (2006)) for networks with high numbers of molecules, where the
+   exact gillespie_integrator.c spends its time on individual reactions. Select it
+   with cfile['integrator'] = 'tau_leaping_integrator.c' and prmt['gillespie'] in
+   the initialization file.
+
+   During a leap of length tau every reaction fires a Poisson number of times with
+   mean tau times its propensity (see deriv2.write_gillespieC, the stoichiometry is
+   gillespie_changes). tau is the largest step for which the expected relative change
+   of the propensities stays below TAU_EPSILON (prmt['tau_epsilon'], 0.03 by default),
+   estimated from the mean and variance of the change of every species read by a rate.
+   The critical reactions, which would exhaust one of their reactants in less than
+   TAU_CRITICAL firings, fire one at a time as in the Gillespie algorithm. A leap
+   leading to a negative number of molecules is rejected and tau halved, and exact
+   reactions are used when tau is below TAU_SSA/a0 (a0 the total propensity).
+
+   The cells are integrated one after the other on every interval DT, the leaps stop
+   at the time steps where the state is written in HIST and the inputs are set.
+   No diffusion between the cells.
+*/
+
+#ifndef GILLESPIE
+#error "tau_leaping_integrator.c requires prmt['gillespie']"
+#endif
+#ifndef TAU_EPSILON
+#define TAU_EPSILON 0.03
+#endif
+#ifndef TAU_CRITICAL
+#define TAU_CRITICAL 10
+#endif
+#ifndef TAU_SSA
+#define TAU_SSA 10
+#endif
+
+static TRY_LOCAL double *tau_a;     // propensities of the reactions
+static TRY_LOCAL int *tau_critical;
+
+/* Poisson deviate of mean mu: inversion for small means, transformed rejection
+   with squeeze of Hormann (PTRS, Insurance Math. Econom. 12, 39 (1993)) otherwise */
+static double tau_poisson(double mu){
+  double p,cumulative,u,v,us,k,a,b,inv_alpha,vr;
+  if (mu<10){
+    k=0;
+    p=cumulative=exp(-mu);
+    u=FRAND();
+    while (u>cumulative && k<1000){
+      k++;
+      p*=mu/k;
+      cumulative+=p;
+    }
+    return k;
+  }
+  b=0.931+2.53*sqrt(mu);
+  a=-0.059+0.02483*b;
+  inv_alpha=1.1239+1.1328/(b-3.4);
+  vr=0.9277-3.6224/(b-2);
+  for (;;){
+    u=FRAND()-0.5;
+    v=FRAND();
+    us=0.5-fabs(u);
+    k=floor((2*a/us+b)*u+mu+0.43);
+    if (us>=0.07 && v<=vr) return k;
+    if (k<0 || (us<0.013 && v>us)) continue;
+    if (log(v*inv_alpha/(a/(us*us)+b))<=-mu+k*log(mu)-lgamma(k+1)) return k;
+  }
+}
+
+/* the reaction fires k times */
+static void tau_fire(double s[], int reaction, double k){
+  int j;
+  for (j=gillespie_changes_start[reaction];j<gillespie_changes_start[reaction+1];j++)
+    s[gillespie_changes_species[j]]+=k*gillespie_changes[j]/GILLESPIE_VOLUME;
+}
+
+/* index of the reaction drawn with the probabilities tau_a[]/a0 among the reactions
+   with tau_critical[] equal to critical (all of them if critical<0) */
+static int tau_draw(double a0, int critical){
+  double threshold=FRAND()*a0;
+  int reaction,last=-1;
+  for (reaction=0;reaction<gillespie_nreactions;reaction++){
+    if (critical>=0 && tau_critical[reaction]!=critical) continue;
+    if (tau_a[reaction]>0) last=reaction;
+    threshold-=tau_a[reaction];
+    if (threshold<0 && tau_a[reaction]>0) return reaction;
+  }
+  return last;  // rounding errors
+}
+
+/* integrate the state s[] of the cell ncell from the step to the next one */
+static void tau_leap(double s[], int step, int ncell){
+
+  double saved[SIZE],mu[SIZE],sigma[SIZE];
+  double t=0,a0,a0_critical,tau,tau1,tau2,bound,k;
+  int index,reaction,j,fired,negative;
+
+  while (t<DT){
+    a0=0;
+    for (reaction=0;reaction<gillespie_nreactions;reaction++){
+      tau_a[reaction]=GILLESPIE_VOLUME*propensity(reaction,s,history,step,ncell);
+      if (!(tau_a[reaction]>0)) tau_a[reaction]=0;  // intercepts nan
+      a0+=tau_a[reaction];
+      tau_critical[reaction]=0;
+      if (tau_a[reaction]>0)
+        for (j=gillespie_changes_start[reaction];j<gillespie_changes_start[reaction+1];j++)
+          if (gillespie_changes[j]<0 && s[gillespie_changes_species[j]]*GILLESPIE_VOLUME<-TAU_CRITICAL*gillespie_changes[j])
+            tau_critical[reaction]=1;
+    }
+    if (a0==0) return;
+
+    /* largest leap of the non critical reactions */
+    for (index=0;index<SIZE;index++)
+      mu[index]=sigma[index]=0;
+    a0_critical=0;
+    for (reaction=0;reaction<gillespie_nreactions;reaction++){
+      if (tau_critical[reaction]){
+        a0_critical+=tau_a[reaction];
+        continue;
+      }
+      for (j=gillespie_changes_start[reaction];j<gillespie_changes_start[reaction+1];j++){
+        mu[gillespie_changes_species[j]]+=gillespie_changes[j]*tau_a[reaction];
+        sigma[gillespie_changes_species[j]]+=gillespie_changes[j]*gillespie_changes[j]*tau_a[reaction];
+      }
+    }
+    tau1=HUGE_VAL;
+    for (index=0;index<SIZE;index++){
+      if (!gillespie_order[index]) continue;
+      bound=MAX(TAU_EPSILON*s[index]*GILLESPIE_VOLUME/gillespie_order[index],1);
+      if (mu[index]!=0) tau1=MIN(tau1,bound/fabs(mu[index]));
+      if (sigma[index]>0) tau1=MIN(tau1,bound*bound/sigma[index]);
+    }
+
+    if (tau1<TAU_SSA/a0){  // a leap is not worth it: exact reaction
+      t+=-log(1-FRAND())/a0;
+      if (t>=DT) return;  // no reaction before the next step
+      tau_fire(s,tau_draw(a0,-1),1);
+      continue;
+    }
+
+    /* leap, halved until no species becomes negative */
+    tau2=a0_critical>0 ? -log(1-FRAND())/a0_critical : HUGE_VAL;
+    for (index=0;index<SIZE;index++)
+      saved[index]=s[index];
+    for (;;){
+      tau=MIN(tau1,DT-t);
+      fired=-1;
+      if (tau2<=tau){  // one critical reaction during the leap
+        tau=tau2;
+        fired=tau_draw(a0_critical,1);
+      }
+      for (reaction=0;reaction<gillespie_nreactions;reaction++)
+        if (!tau_critical[reaction] && tau_a[reaction]>0){
+          k=tau_poisson(tau_a[reaction]*tau);
+          if (k>0) tau_fire(s,reaction,k);
+        }
+      if (fired>=0) tau_fire(s,fired,1);
+      negative=0;
+      for (index=0;index<SIZE;index++){
+        if (s[index]<-1e-9/GILLESPIE_VOLUME) negative=1;
+        else if (s[index]<0) s[index]=0;  // rounding errors
+      }
+      if (!negative) break;
+      for (index=0;index<SIZE;index++)
+        s[index]=saved[index];
+      tau1/=2;
+    }
+    t+=tau;
+  }
+}
+
+void integrator(int kk){
+
+    double s[SIZE];
+    int index,pas,ncell;
+
+    /* initialize geometry here, incase cells move  */
+    init_geometry();
+    init_history(kk);
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      history2hist(0,ncell,SIZE,NULL);
+    }
+    if (!tau_a){  // once per thread with prmt['openmp_tries']
+      tau_a=calloc(gillespie_nreactions+1,sizeof(double));
+      tau_critical=calloc(gillespie_nreactions+1,sizeof(int));
+    }
+
+    /* loop over time steps, then over each cell etc */
+    for (pas=0;pas<NSTEP-1;pas++)  {
+	for (ncell=0;ncell<NCELLTOT;ncell++)  {
+            inputs(pas,ncell,kk);
+            history2hist(pas,ncell,NINPUT,trackin);
+            for (index=0;index<SIZE;index++)
+                s[index]=HIST(index,pas,ncell);
+            tau_leap(s,pas,ncell);
+            for (index=0;index<SIZE;index++)
+                HIST(index,pas+1,ncell)=s[index];
+	}
+        if (stream_step(pas,kk)) break;  //see utilities.c, the integration may be aborted
+    }
+
+    /* fill in inputs for last time.  */
+    for (ncell=0;ncell<NCELLTOT;ncell++)  {
+      inputs(NSTEP-1,ncell,kk);
+      history2hist(NSTEP-1,ncell,NINPUT,trackin);
+    }
+    stream_step(NSTEP-1,kk);
+    hist2history();
+}
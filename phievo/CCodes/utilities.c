@@ -18,11 +18,11 @@ void diffusion(int ncell, int step, double ds[],double history[][NSTEP][NCELLTOT
       for (neig=0;neig<NNEIGHBOR;neig++){
 	index=geometry[ncell][neig];//takes the neighoubring cell
 	if (index>=0){
-	  diffusion+=history[index_diff][step][index];//concentration of the ligand in the neighbouring cell
+	  diffusion+=HIST(index_diff,step,index);//concentration of the ligand in the neighbouring cell
 	  n_localneig+=1;
 	}
       }
-      diffusion-=n_localneig*history[index_diff][step][ncell];//minus number of local neighbours times concentration of the ligand in the local cell
+      diffusion-=n_localneig*HIST(index_diff,step,ncell);//minus number of local neighbours times concentration of the ligand in the local cell
       diffusion*=diff;// times diffusion constant
       ds[index_diff]+=diffusion;
     }
@@ -43,7 +43,7 @@ void sum_concentration(int ncell, int step, double concentrations[]) {
   for (l=0;l<NLIGAND;l++){
     
   if (externallig[l]==1){
-      concentrations[tracklig[l]]=history[tracklig[l]][step][ncell];   // For external ligands, we simply take the local external value as local ligand concentration
+      concentrations[tracklig[l]]=HIST(tracklig[l],step,ncell);   // For external ligands, we simply take the local external value as local ligand concentration
   }
   else
     {//in that case, we sum ligand concentration over all neighbouring cells
@@ -52,7 +52,7 @@ void sum_concentration(int ncell, int step, double concentrations[]) {
       for (neig=0;neig<NNEIGHBOR;neig++){
 	index=geometry[ncell][neig];
 	if ((index>=0) && (index!=ncell) ) {//note that we exclude the local concentration of ligand from the sum
-	  concentrations[g]+=history[g][step][index];  
+	  concentrations[g]+=HIST(g,step,index);  
 	}
       }
 
@@ -70,15 +70,192 @@ void sum_concentration(int ncell, int step, double concentrations[]) {
 
 
 
+/* copy the values of species[] (all the species if NULL) set in history by init_history
+   or inputs to the layout of HIST, and history_tm back to history at the end of the
+   integration (nothing to do when HIST is history, see integrator_header.h) */
+
+void history2hist(int step, int ncell, int nspecies, const int species[]){
+#if defined(HISTORY_TIME_MAJOR) || defined(STREAMING_FITNESS)
+  int i,index;
+  for (i=0;i<nspecies;i++){
+    index = species ? species[i] : i;
+    HIST(index,step,ncell)=history[index][step][ncell];
+  }
+#endif
+}
+
+/* with HISTORY_TIME_MAJOR an input function may read and write any species of history
+   at its step: the state of the cell is copied to history before inputs is called
+   (hist2history_cell) and all the species are copied back after it (inputs2hist), only
+   the inputs otherwise */
+
+void hist2history_cell(int step, int ncell){
+#ifdef HISTORY_TIME_MAJOR
+  int index;
+  for (index=0;index<SIZE;index++)
+    history[index][step][ncell]=HIST(index,step,ncell);
+#endif
+}
+
+void inputs2hist(int step, int ncell){
+#ifdef HISTORY_TIME_MAJOR
+  history2hist(step,ncell,SIZE,NULL);
+#else
+  history2hist(step,ncell,NINPUT,trackin);
+#endif
+}
+
+void hist2history(){
+#ifdef HISTORY_TIME_MAJOR
+  int index,pas,ncell;
+  for (index=0;index<SIZE;index++)
+    for (pas=0;pas<NSTEP;pas++)
+      for (ncell=0;ncell<NCELLTOT;ncell++)
+        history[index][pas][ncell]=history_tm[pas][ncell][index];
+#endif
+}
+
+/* With prmt['early_termination'] the integration of the network is aborted when a
+   concentration is nan or above DIVERGENCE_BOUND, or when early_reject (see
+   integrator_header.h) returns nonzero. It is checked by stream_step every
+   EARLY_TERMINATION steps, the remaining steps and tries are skipped (see main_general.c).
+   The threads of prmt['openmp_tries'] only set it, main_general.c resets it before the tries */
+
+static TRY_ATOMIC int integration_aborted = 0;
+
+#ifdef EARLY_TERMINATION
+static int diverged(int step){
+  int index,ncell;
+  for (index=0;index<SIZE;index++)
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      if (!(HIST(index,step,ncell)<DIVERGENCE_BOUND)) //intercepts nan
+        return 1;
+  return 0;
+}
+#endif
+
+/* called by the integrators once the step is complete for all the cells: with
+   prmt['streaming_fitness'] copy the recorded species in history (all of them
+   with PRINT_BUF, for print_history) and call fitness_step (see integrator_header.h).
+   Return integration_aborted, the integrators stop when it is set */
+
+int stream_step(int step, int ntry){
+  if (integration_aborted)
+    return 1;
+#ifdef EARLY_TERMINATION
+  if (step%EARLY_TERMINATION==0 || step==NSTEP-1){
+    int aborted=diverged(step);
+#ifdef EARLY_REJECT
+    if (!aborted)
+      aborted=early_reject(step,trackout,ntry);
+#endif
+    if (aborted){
+      integration_aborted=1;
+      return 1;
+    }
+  }
+#endif
+#ifdef STREAMING_FITNESS
+  int i,index,ncell;
+  if (PRINT_BUF || (step>=RECORD_FIRST && step<RECORD_LAST)){
+    for (i=0;i<(PRINT_BUF ? SIZE : NRECORD);i++){
+      index = PRINT_BUF ? i : trackrecord[i];
+      for (ncell=0;ncell<NCELLTOT;ncell++)
+        history[index][step][ncell]=HIST(index,step,ncell);
+    }
+  }
+#ifdef FITNESS_STEP
+  fitness_step(step,trackout,ntry);
+#endif
+#endif
+  return 0;
+}
+
+/* With prmt['steady_state'] the Euler integrators count the consecutive steps where
+   |ds| <= STEADY_STATE_TOL*(|s|+STEADY_STATE_ATOL) for all the species and cells
+   (steady_state_quiet). After STEADY_STATE_WINDOW such steps, the state is copied to
+   the next steps without calling derivC as long as the inputs do not change.
+   steady_state_skipped counts the steps skipped by all the tries, it is printed by
+   main_general.c */
+
+static long steady_state_skipped = 0;
+
+#ifdef STEADY_STATE
+static TRY_LOCAL int steady_state_quiet;        // consecutive steps without change
+static TRY_LOCAL int steady_state_input[SIZE];  // 1 for the inputs, set by inputs and not tested
+
+static void steady_state_init(void){
+  int index;
+  for (index=0;index<SIZE;index++) steady_state_input[index]=0;
+  for (index=0;index<NINPUT;index++) steady_state_input[trackin[index]]=1;
+  steady_state_quiet=0;
+}
+
+/* 1 if the derivative ds of the species index is negligible compared with its value s */
+static int steady_state_still(int index, double s, double ds){
+  return steady_state_input[index] || fabs(ds)<=STEADY_STATE_TOL*(fabs(s)+STEADY_STATE_ATOL);
+}
+
+/* called once the inputs of the step are set for all the cells, return 1 and copy
+   the state to step+1 if the network is at steady state and the inputs did not change */
+static int steady_state_skip(int step){
+  int index,ncell;
+  if (step==0 || steady_state_quiet<STEADY_STATE_WINDOW)
+    return 0;
+  for (index=0;index<NINPUT;index++)
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      if (HIST(trackin[index],step,ncell)!=HIST(trackin[index],step-1,ncell)){
+        steady_state_quiet=0;
+        return 0;
+      }
+  for (index=0;index<SIZE;index++)
+    for (ncell=0;ncell<NCELLTOT;ncell++)
+      HIST(index,step+1,ncell)=HIST(index,step,ncell);
+#pragma omp atomic
+  steady_state_skipped++;
+  return 1;
+}
+#endif
+
+/* add history to history2 for treatment_fitness (see main_general.c), history2 is
+   overwritten at the first try. Only the recorded part with prmt['streaming_fitness'] */
+
+void add_history(double history2[][NSTEP][NCELLTOT], int ntry){
+  int index,pas,ncell;
+#ifdef STREAMING_FITNESS
+  int i;
+  for (i=0;i<(PRINT_BUF ? SIZE : NRECORD);i++){
+    index = PRINT_BUF ? i : trackrecord[i];
+    for (pas=(PRINT_BUF ? 0 : RECORD_FIRST);pas<(PRINT_BUF ? NSTEP : RECORD_LAST);pas++)
+#else
+  for (index=0;index<SIZE;index++){
+    for (pas=0;pas<NSTEP;pas++)
+#endif
+      for (ncell=0;ncell<NCELLTOT;ncell++)
+        history2[index][pas][ncell] = (ntry ? history2[index][pas][ncell] : 0) + history[index][pas][ncell];
+  }
+}
+
 /* print history array to file= BUFFER, where int trial is 0,1,..NTRIES-1 */
 
 void print_history( int trial )  {
 
+#ifdef PHIEVO_SHARED
+    store_history(trial);  // see runtime_parameters.c
+#else
     int pas, i, j;
     char titre[50];
     FILE *fileptr;
 
     sprintf(titre, "Buffer%i", trial);
+#ifdef BINARY_BUFFER
+    /* header SIZE NSTEP NCELLTOT trial followed by the raw doubles of history, see deriv2.load_history */
+    int header[4] = {SIZE, NSTEP, NCELLTOT, trial};
+    fileptr=fopen(titre, "wb");
+    fwrite(header, sizeof(int), 4, fileptr);
+    fwrite(history, sizeof(double), (size_t)SIZE*NSTEP*NCELLTOT, fileptr);
+    fclose(fileptr);
+#else
     fileptr=fopen(titre, "w");
 
     for(pas=0; pas<NSTEP; pas++)  {
@@ -92,6 +269,8 @@ void print_history( int trial )  {
     }
     fprintf(fileptr,"\n");
     fclose(fileptr);
+#endif
+#endif
 }
 
 
@@ -147,11 +326,72 @@ double std_dev(double score[]){
 
 
 
+#ifdef FAST_RNG
+/* prmt['fast_rng']: ziggurat method of Marsaglia and Tsang (J. Stat. Softw. 5, 8 (2000))
+   with 128 layers, on the 53 high bits of xoshiro256** (sign and abscissa) and its
+   7 low bits (layer). The tables are computed once per thread. */
+
+static TRY_LOCAL double zig_k[128],zig_w[128],zig_f[128];
+static TRY_LOCAL int zig_ready=0;
+
+static void zig_setup(){
+  const double m=4503599627370496.0;  // 2^52
+  double d=3.442619855899,t=d,v=9.91256303526217e-3,q;
+  int i;
+  q=v/exp(-0.5*d*d);
+  zig_k[0]=(d/q)*m;
+  zig_k[1]=0;
+  zig_w[0]=q/m;
+  zig_w[127]=d/m;
+  zig_f[0]=1;
+  zig_f[127]=exp(-0.5*d*d);
+  for (i=126;i>=1;i--){
+    d=sqrt(-2*log(v/d+exp(-0.5*d*d)));
+    zig_k[i+1]=(d/t)*m;
+    t=d;
+    zig_f[i]=exp(-0.5*d*d);
+    zig_w[i]=d/m;
+  }
+  zig_ready=1;
+}
+
+/* uniform deviate in (0,1) */
+static double zig_uniform(){
+  return ((rng_next(&try_rng)>>11)+0.5)*0x1.0p-53;
+}
+
+double gaussdev()
+{/*computes a normally distributed deviate with zero mean and unit variance*/
+  const double r=3.442619855899;
+  uint64_t u;
+  double hz,x,y;
+  int i;
+
+  if (!zig_ready) zig_setup();
+  for (;;){
+    u=rng_next(&try_rng);
+    i=u&127;
+    hz=(double)((int64_t)u>>11);
+    x=hz*zig_w[i];
+    if (fabs(hz)<zig_k[i]) return x;  // inside the layer, most of the time
+    if (i==0){  // tail beyond r
+      do {
+        x=-log(zig_uniform())/r;
+        y=-log(zig_uniform());
+      } while (y+y<x*x);
+      return hz>0 ? r+x : -r-x;
+    }
+    if (zig_f[i]+zig_uniform()*(zig_f[i-1]-zig_f[i])<exp(-0.5*x*x)) return x;
+  }
+}
+
+#else
+static TRY_LOCAL int iset=0;  // state of gaussdev, reset by openmp_try
+static TRY_LOCAL double gset;
+
 double gaussdev()
 {/*computes a normally distributed deviate with zero mean and unit variance
    using  Box-Muller method, Numerical Recipes C++ p293 */
-	static int iset=0;
-	static double gset;
 	double fac,rsq,v1,v2;
 
 	if (iset == 0) {
@@ -170,15 +410,75 @@ double gaussdev()
 	  return gset;
 	}
 }
+#endif
+
 
 
 
 
+static TRY_LOCAL int drift_only=0;  // set by stochastic_heun_integrator.c to evaluate derivC without noise
 
 double compute_noisy_increment(double rate)
 {/*computes the increment to add to a ds*/
 
+if (drift_only) return rate;
 return rate+gaussdev()*sqrt(rate/(DT*CONCENTRATION_SCALE));
 
 
 }
+
+#ifdef OPENMP_TRIES
+/* seed the random generator of the thread from SEED and the try */
+
+static void openmp_seed(int ntry){
+#ifdef FAST_RNG
+  rng_try(ntry);
+#else
+  srand(SEED+104729*ntry);
+  iset=0;
+#endif
+}
+
+/* called by main_general.c at the beginning of the try ntry with prmt['openmp_tries']:
+   allocate the arrays of the thread the first time (they are kept for the next tries
+   like the static arrays) and seed its random generator (openmp_seed) */
+
+void openmp_try(int ntry){
+  if (!history) history=calloc((size_t)SIZE*NSTEP*NCELLTOT,sizeof(double));
+#ifdef HISTORY_TIME_MAJOR
+  if (!history_tm) history_tm=calloc((size_t)NSTEP*NCELLTOT*SIZE,sizeof(double));
+#endif
+#ifdef STREAMING_FITNESS
+  if (!history_ring) history_ring=calloc((size_t)SIZE*NHISTORY*NCELLTOT,sizeof(double));
+#endif
+  if (!history){
+    fprintf(stderr,"openmp_try: cannot allocate the history\n");
+    exit(1);
+  }
+  openmp_seed(ntry);
+}
+
+/* copy the history of the last try, integrated by the thread that owns last, in the
+   history of the calling thread as after the sequential loop over the tries. The
+   random numbers of treatment_fitness are those of a try NTRIES, whatever the thread
+   that ran the last try */
+
+void openmp_last_history(double (*last)[NSTEP][NCELLTOT]){
+  int index,pas,ncell;
+  if (!history) openmp_try(0);
+  openmp_seed(NTRIES);
+  if (!last || last==history) return;
+#ifdef STREAMING_FITNESS
+  int i;
+  for (i=0;i<(PRINT_BUF ? SIZE : NRECORD);i++){
+    index = PRINT_BUF ? i : trackrecord[i];
+    for (pas=(PRINT_BUF ? 0 : RECORD_FIRST);pas<(PRINT_BUF ? NSTEP : RECORD_LAST);pas++)
+#else
+  for (index=0;index<SIZE;index++){
+    for (pas=0;pas<NSTEP;pas++)
+#endif
+      for (ncell=0;ncell<NCELLTOT;ncell++)
+        history[index][pas][ncell] = last[index][pas][ncell];
+  }
+}
+#endif
@@ -11,6 +11,7 @@ from . import classes_eds2
 from . import mutation
 import copy
 from . import deriv2
+from . import deriv_numpy
 
 #default range
 mutation.dictionary_ranges['Degradation.rate'] = 0.0/mutation.T
@@ -186,12 +187,60 @@ def Degradation_deriv_inC(net):
             Input1 = net.graph.list_predecessors(reaction)[0]
             Input2 = net.graph.list_successors(reaction)[0]
             #defines interaction rate
-            rate = str(reaction.rate)+' * '+Input1.id+' * '+Input2.id
+            rate = deriv2.param_inC(reaction.rate,"%s")+' * '+Input1.id+' * '+Input2.id
             #writes down the equation in C
             func += deriv2.compute_leap([Input2.id],[],rate)
         return func
     else:
         return '' #Empty string if no degradation in net
 
+def Degradation_jacobian_inC(net):
+    """gives the string corresponding to the Jacobian of the degradations
+    (see deriv2.write_jacobianC)
+
+    Return:A single string for all degradation in the network
+    """
+    func="\n/**************Degradation interactions*****************/\n"
+    for reaction in net.dict_types.get('Degradation',[]):
+        Input1 = net.graph.list_predecessors(reaction)[0]
+        Input2 = net.graph.list_successors(reaction)[0]
+        rate = deriv2.param_inC(reaction.rate,"%s")
+        partials = [[Input1.id,rate+' * '+Input2.id],[Input2.id,rate+' * '+Input1.id]]
+        func += deriv2.compute_jacobian_leap([Input2.id],[],partials)
+    return func
+
+def Degradation_gillespie_inC(net):
+    """gives the reactions of the degradations for the Gillespie algorithm
+    (see deriv2.write_gillespieC)
+
+    Return:list of [list_input_id, list_output_id, rate] as in deriv2.compute_leap
+    """
+    reactions=[]
+    for reaction in net.dict_types.get('Degradation',[]):
+        Input1 = net.graph.list_predecessors(reaction)[0]
+        Input2 = net.graph.list_successors(reaction)[0]
+        reactions.append([[Input2.id],[],deriv2.param_inC(reaction.rate,"%s")+' * '+Input1.id+' * '+Input2.id])
+    return reactions
+
 #update deriv2
 deriv2.interactions_deriv_inC["Degradation"] = Degradation_deriv_inC
+deriv2.interactions_jacobian_inC["Degradation"] = Degradation_jacobian_inC
+deriv2.interactions_gillespie_inC["Degradation"] = Degradation_gillespie_inC
+
+########## Integration NumPy Tools ##########
+
+def Degradation_deriv_numpy(net):
+    """gives the python lines corresponding to degradations for integration
+    with the numpy backend (see deriv_numpy)
+
+    Return:A single string for all degradation in the network
+    """
+    func="    # Degradation interactions\n"
+    for reaction in net.dict_types.get('Degradation',[]):
+        Input1 = net.graph.list_predecessors(reaction)[0]
+        Input2 = net.graph.list_successors(reaction)[0]
+        rate = deriv2.param_inC(reaction.rate)+' * '+Input1.id+' * '+Input2.id
+        func += deriv_numpy.compute_leap([Input2.id],[],rate)
+    return func
+
+deriv_numpy.interactions_deriv_numpy["Degradation"] = Degradation_deriv_numpy
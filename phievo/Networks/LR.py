@@ -9,6 +9,7 @@ if __verbose__:
 
 from . import classes_eds2
 from . import deriv2
+from . import deriv_numpy
 from . import mutation
 import copy
 
@@ -160,7 +161,7 @@ def compute_LR(net):
             C=net.graph.list_successors(index)[0]#finds the product of LR interaction
             [P1,P2]=net.graph.list_predecessors(index) #find the components
             L,R = (P1,P2) if P1.isinstance('Ligand') else (P2,P1) #determine the ligand and the receptor
-            arate="%f*"%index.association+"ligand"+L.id+"*"+R.id+"/("+R.id+"+"+str(index.threshold)+")"
+            arate="%s*"%deriv2.param_inC(index.association)+"ligand"+L.id+"*"+R.id+"/("+R.id+"+"+deriv2.param_inC(index.threshold,"%s")+")"
             func=func+deriv2.compute_leap([R.id],[C.id],arate)
     func=func+"}\n \n"
 
@@ -168,3 +169,28 @@ def compute_LR(net):
 
 #update deriv2
 deriv2.interactions_deriv_inC["LR"] = compute_LR
+
+########## Integration NumPy Tools ##########
+
+def LR_deriv_numpy(net):
+    """gives the python lines corresponding to LR for integration with the
+    numpy backend (see deriv_numpy)
+
+    As LRinC, the rates are only used when ligands are computed, i.e. with
+    variation_integrator.c.
+
+    Return:
+        str: a single string for all LR in the network
+    """
+    func="    # LR interactions\n"
+    func+="    if ligands is not None:\n"
+    for index in net.dict_types.get('LR',[]):
+        C=net.graph.list_successors(index)[0]#finds the product of LR interaction
+        [P1,P2]=net.graph.list_predecessors(index) #find the components
+        L,R = (P1,P2) if P1.isinstance('Ligand') else (P2,P1) #determine the ligand and the receptor
+        arate="%s*"%deriv2.param_inC(index.association)+"ligands"+L.id[1:]+"*"+R.id+"/("+R.id+"+"+deriv2.param_inC(index.threshold)+")"
+        func=func+deriv_numpy.compute_leap([R.id],[C.id],arate,"        ")
+    func+="        pass\n"
+    return func
+
+deriv_numpy.interactions_deriv_numpy["LR"] = LR_deriv_numpy
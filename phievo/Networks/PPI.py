@@ -10,6 +10,7 @@ if __verbose__:
 from . import classes_eds2
 from . import mutation
 from . import deriv2
+from . import deriv_numpy
 import copy
 
 #default range
@@ -232,11 +233,72 @@ def PPI_deriv_inC(net):
                 P2=P1
             else:
                 P2=list_Pi[1]
-            arate="%f * %s * %s"%(index.association,P1.id,P2.id)
-            drate="%f * %s"%(index.disassociation,C.id)
+            arate="%s * %s * %s"%(deriv2.param_inC(index.association),P1.id,P2.id)
+            drate="%s * %s"%(deriv2.param_inC(index.disassociation),C.id)
             func=func+deriv2.compute_leap([P1.id,P2.id],[C.id],arate)
             func=func+deriv2.compute_leap([C.id],[P1.id,P2.id],drate)
     return func
 
+def PPI_jacobian_inC(net):
+    """gives the string corresponding to the Jacobian of :class:`Networks.PPI.PPI`
+    (see deriv2.write_jacobianC)
+
+    Return:
+        str a single string for all :class:`Networks.PPI.PPI` in the network
+    """
+    func="\n/**************Protein protein interactions*****************/\n"
+    for index in net.dict_types.get('PPI',[]):
+        C=net.graph.list_successors(index)[0]#finds the complex
+        list_Pi=net.graph.list_predecessors(index) #find the components
+        P1=list_Pi[0]
+        P2=P1 if len(list_Pi)==1 else list_Pi[1]
+        association=deriv2.param_inC(index.association)
+        apartials=[[P1.id,"%s * %s"%(association,P2.id)],[P2.id,"%s * %s"%(association,P1.id)]]
+        func=func+deriv2.compute_jacobian_leap([P1.id,P2.id],[C.id],apartials)
+        func=func+deriv2.compute_jacobian_leap([C.id],[P1.id,P2.id],[[C.id,deriv2.param_inC(index.disassociation)]])
+    return func
+
+def PPI_gillespie_inC(net):
+    """gives the reactions of :class:`Networks.PPI.PPI` for the Gillespie algorithm
+    (see deriv2.write_gillespieC)
+
+    Return:
+        list of [list_input_id, list_output_id, rate] as in deriv2.compute_leap
+    """
+    reactions=[]
+    for index in net.dict_types.get('PPI',[]):
+        C=net.graph.list_successors(index)[0]#finds the complex
+        list_Pi=net.graph.list_predecessors(index) #find the components
+        P1=list_Pi[0]
+        P2=P1 if len(list_Pi)==1 else list_Pi[1]
+        reactions.append([[P1.id,P2.id],[C.id],"%s * %s * %s"%(deriv2.param_inC(index.association),P1.id,P2.id)])
+        reactions.append([[C.id],[P1.id,P2.id],"%s * %s"%(deriv2.param_inC(index.disassociation),C.id)])
+    return reactions
+
 #update deriv2
 deriv2.interactions_deriv_inC["PPI"] = PPI_deriv_inC
+deriv2.interactions_jacobian_inC["PPI"] = PPI_jacobian_inC
+deriv2.interactions_gillespie_inC["PPI"] = PPI_gillespie_inC
+
+########## Integration NumPy Tools ##########
+
+def PPI_deriv_numpy(net):
+    """gives the python lines corresponding to :class:`Networks.PPI.PPI` for
+    integration with the numpy backend (see deriv_numpy)
+
+    Return:
+        str a single string for all :class:`Networks.PPI.PPI` in the network
+    """
+    func="    # Protein protein interactions\n"
+    for index in net.dict_types.get('PPI',[]):
+        C=net.graph.list_successors(index)[0]#finds the complex
+        list_Pi=net.graph.list_predecessors(index) #find the components
+        P1=list_Pi[0]
+        P2=P1 if len(list_Pi)==1 else list_Pi[1]
+        arate="%s * %s * %s"%(deriv2.param_inC(index.association),P1.id,P2.id)
+        drate="%s * %s"%(deriv2.param_inC(index.disassociation),C.id)
+        func=func+deriv_numpy.compute_leap([P1.id,P2.id],[C.id],arate)
+        func=func+deriv_numpy.compute_leap([C.id],[P1.id,P2.id],drate)
+    return func
+
+deriv_numpy.interactions_deriv_numpy["PPI"] = PPI_deriv_numpy
@@ -12,6 +12,7 @@ if __verbose__:
 from . import classes_eds2
 from . import mutation
 from . import deriv2
+from . import deriv_numpy
 import copy
 
 #default range
@@ -214,11 +215,11 @@ def Phospho_deriv_inC(net):
             kinase = cataList[0]
             species=species[0]
             species_P=species_P[0]
-            term="POW(%s/%f,%f)"%(species.id , reaction.threshold , reaction.hill) #computes the numerator corresponding to this specific phophorylation
+            term="POW(%s/%s,%s)"%(species.id , deriv2.param_inC(reaction.threshold) , deriv2.param_inC(reaction.hill)) #computes the numerator corresponding to this specific phophorylation
             dict_kinase[kinase][0]+="+"+term#adds to denominator
 
-            prate="%f*%s*(%s/total)"%(reaction.rate , kinase.id , term) #writes the rate
-            dephosphorate="%f*%s"%(reaction.dephosphorylation , species_P.id)
+            prate="%s*%s*(%s/total)"%(deriv2.param_inC(reaction.rate) , kinase.id , term) #writes the rate
+            dephosphorate="%s*%s"%(deriv2.param_inC(reaction.dephosphorylation) , species_P.id)
             dict_kinase[kinase][1]=dict_kinase[kinase][1]+"\t \t/*Phosphorylation*/\n"
             dict_kinase[kinase][1]=dict_kinase[kinase][1]+deriv2.compute_leap([species.id],[species_P.id],prate)
             dict_kinase[kinase][1]=dict_kinase[kinase][1]+"\t \t /*Dehosphorylation*/\n"
@@ -230,5 +231,100 @@ def Phospho_deriv_inC(net):
                 func=func+"\ntotal="+dict_kinase[kinase][0]+";\n"+dict_kinase[kinase][1]#writes the rates for each kinase
     return func
 
+def Phospho_jacobian_inC(net):
+    """gives the string corresponding to the Jacobian of the Phosphorylations
+    (see deriv2.write_jacobianC)
+
+    The rate rate*kinase*term/total of Phospho_deriv_inC depends on the kinase
+    and, through total, on all the substrates of the kinase.
+
+    Return:
+        A single string for all Phosphorylations in the network
+    """
+    func="\n/**************Phosphorylation*****************/\n double total;\n"
+    dict_kinase={node:[] for node in net.dict_types.get('Kinase',[])}
+    for reaction in net.dict_types.get('Phosphorylation',[]):
+        [cataList,species,species_P]=net.catal_data(reaction)
+        dict_kinase[cataList[0]].append([reaction,species[0],species_P[0]])
+    for kinase,reactions in dict_kinase.items():
+        if not reactions:
+            continue
+        terms=[]
+        for reaction,species,species_P in reactions:
+            threshold=deriv2.param_inC(reaction.threshold)
+            hill=deriv2.param_inC(reaction.hill)
+            # the term of Phospho_deriv_inC and its derivative with respect to the substrate
+            terms.append(["POW(%s/%s,%s)"%(species.id,threshold,hill),"dPOW(%s/%s,%s)/%s"%(species.id,threshold,hill,threshold)])
+        func=func+"\ntotal=1+"+"+".join(term for term,_ in terms)+";\n"
+        for [reaction,species,species_P],[term,dterm] in zip(reactions,terms):
+            rate=deriv2.param_inC(reaction.rate)
+            partials=[[kinase.id,"%s*%s/total"%(rate,term)]]
+            for [_,other,_],[other_term,other_dterm] in zip(reactions,terms):
+                numerator="%s*total-%s*%s"%(dterm,term,other_dterm) if other is species else "-%s*%s"%(term,other_dterm)
+                partials.append([other.id,"%s*%s*(%s)/(total*total)"%(rate,kinase.id,numerator)])
+            func=func+"\t \t/*Phosphorylation*/\n"
+            func=func+deriv2.compute_jacobian_leap([species.id],[species_P.id],partials)
+            func=func+"\t \t /*Dehosphorylation*/\n"
+            func=func+deriv2.compute_jacobian_leap([species_P.id],[species.id],[[species_P.id,deriv2.param_inC(reaction.dephosphorylation)]])
+    return func
+
+def Phospho_gillespie_inC(net):
+    """gives the reactions of the Phosphorylations for the Gillespie algorithm
+    (see deriv2.write_gillespieC)
+
+    The total of Phospho_deriv_inC is written in every rate of the kinase.
+
+    Return:
+        list of [list_input_id, list_output_id, rate] as in deriv2.compute_leap
+    """
+    reactions=[]
+    dict_kinase={node:[] for node in net.dict_types.get('Kinase',[])}
+    for reaction in net.dict_types.get('Phosphorylation',[]):
+        [cataList,species,species_P]=net.catal_data(reaction)
+        dict_kinase[cataList[0]].append([reaction,species[0],species_P[0]])
+    for kinase,kinase_reactions in dict_kinase.items():
+        terms=["POW(%s/%s,%s)"%(species.id,deriv2.param_inC(reaction.threshold),deriv2.param_inC(reaction.hill)) for reaction,species,_ in kinase_reactions]
+        total="+".join(["1"]+terms)
+        for [reaction,species,species_P],term in zip(kinase_reactions,terms):
+            reactions.append([[species.id],[species_P.id],"%s*%s*(%s/(%s))"%(deriv2.param_inC(reaction.rate),kinase.id,term,total)])
+            reactions.append([[species_P.id],[species.id],"%s*%s"%(deriv2.param_inC(reaction.dephosphorylation),species_P.id)])
+    return reactions
+
 #update deriv2
 deriv2.interactions_deriv_inC["Phospho"] = Phospho_deriv_inC
+deriv2.interactions_jacobian_inC["Phospho"] = Phospho_jacobian_inC
+deriv2.interactions_gillespie_inC["Phospho"] = Phospho_gillespie_inC
+
+########## Integration NumPy Tools ##########
+
+def Phospho_deriv_numpy(net):
+    """gives the python lines corresponding to Phosphorylation for integration
+    with the numpy backend (see deriv_numpy)
+
+    total is rounded to single precision as the float total of Phospho_deriv_inC.
+
+    Return:
+        A single string for all Phosphorylations in the network
+    """
+    func="    # Phosphorylation\n"
+    if ('Phosphorylation' in net.dict_types):
+        dict_kinase={node:["1",""] for node in net.dict_types['Kinase']}#denominator and equations of every kinase
+        for reaction in net.dict_types['Phosphorylation']:
+            [cataList,species,species_P]=net.catal_data(reaction)
+            kinase = cataList[0]
+            species=species[0]
+            species_P=species_P[0]
+            term="POW(%s/%s,%s)"%(species.id , deriv2.param_inC(reaction.threshold) , deriv2.param_inC(reaction.hill))
+            dict_kinase[kinase][0]+="+"+term#adds to denominator
+
+            prate="%s*%s*(%s/total)"%(deriv2.param_inC(reaction.rate) , kinase.id , term)
+            dephosphorate="%s*%s"%(deriv2.param_inC(reaction.dephosphorylation) , species_P.id)
+            dict_kinase[kinase][1]+=deriv_numpy.compute_leap([species.id],[species_P.id],prate)
+            dict_kinase[kinase][1]+=deriv_numpy.compute_leap([species_P.id],[species.id],dephosphorate)
+
+        for kinase in net.dict_types['Kinase']:
+            if not (dict_kinase[kinase][0]=="1"):
+                func=func+"    total = numpy.float32("+dict_kinase[kinase][0]+")\n"+dict_kinase[kinase][1]
+    return func
+
+deriv_numpy.interactions_deriv_numpy["Phospho"] = Phospho_deriv_numpy
@@ -13,7 +13,9 @@ from phievo.initialization_code import * #is it necessary ?
 from . import classes_eds2
 from . import mutation
 from . import deriv2
+from . import deriv_numpy
 import copy
+import re
 
 #default range
 mutation.dictionary_ranges['TFHill.hill'] = 0.0
@@ -228,21 +230,20 @@ def compute_transcription(net,module):
             reg=index[0] #detect the corresponding regulations
             current_activity=reg.activity
             if (current_activity==0):
-                listrepressor.append("HillR(history[%i][memory][ncell],%f,%f)"%(net.graph.list_predecessors(reg)[0].int_id(),reg.threshold,reg.hill))
+                listrepressor.append("HillR(HIST(%i,memory,ncell),%s,%s)"%(net.graph.list_predecessors(reg)[0].int_id(),deriv2.param_inC(reg.threshold),deriv2.param_inC(reg.hill)))
             else:
-                listactivator.append("HillA(history[%i][memory][ncell],%f,%f)"%(net.graph.list_predecessors(reg)[0].int_id(),reg.threshold,reg.hill))
+                listactivator.append("HillA(HIST(%i,memory,ncell),%s,%s)"%(net.graph.list_predecessors(reg)[0].int_id(),deriv2.param_inC(reg.threshold),deriv2.param_inC(reg.hill)))
         l=len(listactivator)
         term = ""
         if(l==0):
-            term="%f"%module.rate
-            if hasattr(net,"activator_required"): #tests if we want to turn one genes by default from version 1.4.2
-                if (net.activator_required==1):
-                    term="0.00"
+            term="0.00"
+            if not (hasattr(net,"activator_required") and net.activator_required==1): #tests if we want to turn one genes by default from version 1.4.2
+                term=deriv2.param_inC(module.rate)
 
         if (l==1):
-            term="%f*"%module.rate+listactivator[0]
+            term="%s*"%deriv2.param_inC(module.rate)+listactivator[0]
         if (l>1):
-            term="%f*"%module.rate
+            term="%s*"%deriv2.param_inC(module.rate)
             for index in range(l-1):
                 term=term+"MAX("
             term=term+listactivator[0]
@@ -250,7 +251,7 @@ def compute_transcription(net,module):
                 term=term+","+listactivator[index+1]+")"
 
         if hasattr(module, "basal"): #tests on the existenc of a basal rate from version 1.3
-            term="MAX("+term+",%f)"%module.basal
+            term="MAX("+term+",%s)"%deriv2.param_inC(module.basal)
 
         if (len(listrepressor)>0):
             term=term+"*"+"*".join(listrepressor)
@@ -271,12 +272,122 @@ def transcription_deriv_inC(net):
             if isinstance(index,classes_eds2.TModule):
                 trans=net.graph.list_successors(index)    #find the CorePromoter
                 output=net.graph.list_successors(trans[0])    #find the transcribed protein
-                func=func+"\t memory=step-%i;\n"%trans[0].delay #trans[0].delay must be an integer
+                func=func+"\t memory=step-%s;\n"%deriv2.param_inC(trans[0].delay,"%i") #trans[0].delay must be an integer
                 func=func+"\t if(memory>=0){\n"
                 func=func+deriv2.compute_leap([],[output[0].id],compute_transcription(net,index))
                 func=func+"\t}\n"
     return func
 
+def transcription_jacobian_inC(net):
+    """gives the string corresponding to the Jacobian of the transcriptions
+    (see deriv2.write_jacobianC)
+
+    The rate of compute_transcription only depends on the current state when
+    the delay of the CorePromoter is 0, its derivative follows the activator
+    selected by the MAX of the activators.
+
+    Return: A single string for all transcriptions in the network
+    """
+    func="\n/**************Transcription rates*****************/\n"
+    func=func+" \t int memory=-1,best;\n \t double activation,repression,amax,hill;\n"
+    net.write_id()
+    for module in net.dict_types.get('TModule',[]):
+        if not isinstance(module,classes_eds2.TModule):
+            continue
+        trans=net.graph.list_successors(module)    #find the CorePromoter
+        output=net.graph.list_successors(trans[0])    #find the transcribed protein
+        activators,repressors=[],[]
+        for index in net.graph.in_edges(module):
+            reg=index[0]
+            hill=[net.graph.list_predecessors(reg)[0].id,deriv2.param_inC(reg.threshold),deriv2.param_inC(reg.hill)]
+            (repressors if reg.activity==0 else activators).append(hill)
+        if not activators and not repressors:
+            continue
+        rate=deriv2.param_inC(module.rate)
+        func=func+"\t memory=step-%s;\n"%deriv2.param_inC(trans[0].delay,"%i")
+        func=func+"\t if(memory==step){\n"
+        if activators:
+            func=func+"\t \t best=0;\n\t \t amax=HillA(%s,%s,%s);\n"%tuple(activators[0])
+            for ii,activator in enumerate(activators[1:]):
+                func=func+"\t \t hill=HillA(%s,%s,%s);\n"%tuple(activator)
+                func=func+"\t \t if(!(amax>hill)){best=%i;amax=hill;}\n"%(ii+1)  # MAX of integrator_header.h
+            func=func+"\t \t activation=%s*amax;\n"%rate
+        elif hasattr(net,"activator_required") and net.activator_required==1:
+            func=func+"\t \t activation=0.00;\n"
+        else:
+            func=func+"\t \t activation=%s;\n"%rate
+        active="1"
+        if hasattr(module, "basal"):
+            basal=deriv2.param_inC(module.basal)
+            active="(activation>%s)"%basal
+            func=func+"\t \t activation=MAX(activation,%s);\n"%basal
+        func=func+"\t \t repression=%s;\n"%"*".join(["1"]+["HillR(%s,%s,%s)"%tuple(repressor) for repressor in repressors])
+        for ii,activator in enumerate(activators):
+            partial="%s*%s*(best==%i)*dHillA(%s,%s,%s)*repression"%(active,rate,ii,*activator)
+            func=func+deriv2.compute_jacobian_leap([],[output[0].id],[[activator[0],partial]])
+        for ii,repressor in enumerate(repressors):
+            others=["HillR(%s,%s,%s)"%tuple(other) for jj,other in enumerate(repressors) if jj!=ii]
+            partial="*".join(["activation","dHillR(%s,%s,%s)"%tuple(repressor)]+others)
+            func=func+deriv2.compute_jacobian_leap([],[output[0].id],[[repressor[0],partial]])
+        func=func+"\t}\n"
+    return func
+
+def transcription_gillespie_inC(net):
+    """gives the reactions of the transcriptions for the Gillespie algorithm
+    (see deriv2.write_gillespieC)
+
+    The rate is the one of compute_transcription, the regulators are read in the
+    current state s when the CorePromoter has no delay.
+
+    Return: list of [list_input_id, list_output_id, rate] as in deriv2.compute_leap
+    """
+    reactions=[]
+    net.write_id()
+    for module in net.dict_types.get('TModule',[]):
+        if not isinstance(module,classes_eds2.TModule):
+            continue
+        trans=net.graph.list_successors(module)    #find the CorePromoter
+        output=net.graph.list_successors(trans[0])    #find the transcribed protein
+        delay=deriv2.param_inC(trans[0].delay,"%i")
+        rate=compute_transcription(net,module)
+        if delay=="0":
+            rate=re.sub(r"HIST\((\d+),memory,ncell\)",r"s[\1]",rate)
+        else:
+            if delay.isdigit():
+                rate=re.sub(r"HIST\((\d+),memory,ncell\)",r"HIST(\1,step-%s,ncell)"%delay,rate)
+            else: # runtime parameter
+                rate=re.sub(r"HIST\((\d+),memory,ncell\)",r"(%s==0 ? s[\1] : HIST(\1,step-%s,ncell))"%(delay,delay),rate)
+            rate="(step>=%s ? %s : 0)"%(delay,rate)
+        reactions.append([[],[output[0].id],rate])
+    return reactions
+
 #update deriv2
 deriv2.compute_transcription=compute_transcription
 deriv2.interactions_deriv_inC["TFHill"] = transcription_deriv_inC
+deriv2.interactions_jacobian_inC["TFHill"] = transcription_jacobian_inC
+deriv2.interactions_gillespie_inC["TFHill"] = transcription_gillespie_inC
+
+########## Integration NumPy Tools ##########
+
+def transcription_deriv_numpy(net):
+    """gives the python lines corresponding to transcription for integration
+    with the numpy backend (see deriv_numpy)
+
+    The rate is the one of compute_transcription, written with numpy
+    functions of the same names.
+
+    Return: A single string for all transcriptions in the network
+    """
+    func="    # Transcription rates\n"
+    net.write_id()
+    for index in net.dict_types.get('TModule',[]):
+        if isinstance(index,classes_eds2.TModule):
+            trans=net.graph.list_successors(index)    #find the CorePromoter
+            output=net.graph.list_successors(trans[0])    #find the transcribed protein
+            func=func+"    memory = step-int(%s)\n"%deriv2.param_inC(trans[0].delay)
+            func=func+"    if memory>=0:\n"
+            rate=re.sub(r"HIST\((\d+),memory,ncell\)",r"history[\1][memory]",compute_transcription(net,index))
+            func=func+deriv_numpy.compute_leap([],[output[0].id],rate,"        ")
+    return func
+
+deriv_numpy.interactions_deriv_numpy["TFHill"] = transcription_deriv_numpy
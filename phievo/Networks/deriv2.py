@@ -13,11 +13,63 @@ compile_and_integrate().
 The c-code files passed only once in form of dictionary cfile.  The numerical parameters
 need to find dimensions of arrays, integration steps, input as argments to functions
 
+When prmt['runtime_parameters'] is set, the numerical parameters of the
+interactions are not written in the C-file but replaced by prm[i] (see param_inC)
+and read at run time by the executable. The executable then only depends on the
+topology of the network and is reused for all the networks sharing the same
+C-file (see compiled_integrators).
+
+With prmt['backend'] = 'shared_library', the C-file is compiled as a shared
+object loaded with ctypes and integrate() (see CCodes/shared_library.c) is
+called directly from python instead of running an executable.
+
+With prmt['precompiled_objects'], the pieces of the C-file that do not depend
+on the interactions (header, utilities, fitness, integrator, ...) are compiled
+once in an object file (see compiled_objects) and only derivC is compiled for
+every new topology.
+
+With prmt['compiler_cache_dir'], the compiled files are also stored in this
+directory, keyed by the hash of the C-file and of the compiler command, and
+shared by all the processes using it (see compile_program).
+
+With prmt['compile_in_memory'], the C code is piped to the compiler and the
+compiled files go to a scratch directory in tmpfs, nothing is written in
+workplace_dir (see compile_source).
+
+With prmt['cell_batched'], derivC integrates all the cells at once (see
+derivC2cells) and is used with CCodes/euler_integrator_cells.c.
+
+With prmt['jacobian'], the analytic Jacobian of derivC is also written (see
+write_jacobianC) for the implicit integrator CCodes/implicit_euler_integrator.c.
+
+With prmt['gillespie'], the reactions of the network, their propensities and
+the graph of the reactions whose propensity changes when a reaction occurs are
+also written (see write_gillespieC) for the stochastic integrator
+CCodes/gillespie_integrator.c.
+
+With prmt['stiffness_routing'], every network is integrated by the Euler
+method, dopri5_integrator.c or implicit_euler_integrator.c depending on its
+fastest rate (see route_integrator) and the name of the integrator is appended
+to the output of treatment_fitness.
+
+With prmt['backend'] = 'numpy', nothing is compiled: the network is integrated
+by NumPy with the python fitness of the project (see deriv_numpy).
+
+write_batch_program writes a single program integrating all the networks of
+a population with the same shape, see batch_integrate.
+
 Attributes:
     workplace_dir (str): the directory where build_integrator*.c will go
     Ccompiler (str): 'gcc' by default
     cfile (dict): where the generic c-code are found (can be reset to fit problem)
     noise_flag (bool): flag to know if we integrate or not with noise
+    interactions_jacobian_inC (dict): writers of the Jacobian of the interactions, see degrad_jacobian_inC
+    interactions_gillespie_inC (dict): writers of the reactions of the interactions for the Gillespie algorithm, see degrad_gillespie_inC
+    compiled_integrators (OrderedDict): executables already compiled in runtime_parameters mode, keyed by the hash of their C-file
+    compiled_objects (OrderedDict): object files of the pieces common to the networks with the same shape (see write_program)
+    compiler_cache_stats (dict): number of hits and misses of the compiler cache (see compile_program)
+    fitness_cache (OrderedDict): outputs of treatment_fitness of deterministic networks (see fitness_cache_key)
+    scratch_directory (str): where the compiled files go with prmt['compile_in_memory'] (see build_directory)
 
 TODO:  it would be nice to include in header.h declaration of all C functions used
 so that they can then be loaded in any order, currently order constrained by declare
@@ -27,22 +79,76 @@ from phievo import __silent__,__verbose__
 if __verbose__:
     print("Execute deriv2")
 
-from phievo.initialization_code import display_error
+from phievo.initialization_code import display_error,ccode_dir
 from phievo.Networks.classes_eds2 import *
 from math import sqrt
+from collections import OrderedDict
 import numpy
 import os, sys, select, random
+import io, re, hashlib, threading
+import shutil, tempfile, atexit
 import subprocess
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
 
 # Parameters
 workplace_dir = './Workplace/'
 cCompiler = 'gcc'
 cfile = {}  # see initialization_code.init_deriv2 for the whole definition
 interactions_deriv_inC = {}
+interactions_jacobian_inC = {}
+interactions_gillespie_inC = {}
 noise_flag = False
+compiled_integrators = OrderedDict()
+compiled_objects = OrderedDict()
+evicted_entries = {}  # entries removed from a cache while still in use, see release_cache_entry
+compiled_integrators_lock = threading.Lock()
+compiler_cache_stats = dict(hit=0, miss=0)
+fitness_cache = OrderedDict()
+scratch_directory = None
+
+class CodeContext(threading.local):
+    """State of the C-file being written by the current thread
+
+    Attributes:
+        parameters (list): values replaced by prm[i] in the C-file, None to write the values
+        delays (list): C expressions of the integer parameters (the delays), see min_delay2C
+    """
+    parameters = None
+    delays = None
+
+code_context = CodeContext()
 
 ########## Routine Functions ##########
 
+def runtime_parameters_mode(prmt):
+    """Return True if the numerical parameters are read at run time"""
+    return prmt.get('runtime_parameters',False) or prmt.get('backend') == 'shared_library' or prmt.get('precompiled_objects',False)
+
+def param_inC(value, fmt="%f"):
+    """Return the C string of a numerical parameter of an interaction
+
+    In runtime_parameters mode the value is stored in code_context.parameters
+    and replaced by a reference to the prm[] array read by the executable.
+
+    Args:
+        value (float): the numerical value of the parameter
+        fmt (str): the format used when the value is written in the C-file,
+                   '%i' for integer parameters such as delays
+
+    Return:
+        a C-formatted string
+    """
+    parameters = code_context.parameters
+    if parameters is None:
+        code = fmt % value
+    else:
+        parameters.append(value)
+        code = "((int)prm[%i])" % (len(parameters)-1) if fmt == "%i" else "prm[%i]" % (len(parameters)-1)
+    if fmt == "%i" and code_context.delays is not None:
+        code_context.delays.append(code)
+    return code
+
 def compute_leap(list_input_id, list_output_id, rate):
     """Routine to compute strings for derivative in C associated to an interaction
 
@@ -63,6 +169,26 @@ def compute_leap(list_input_id, list_output_id, rate):
 
     return func
 
+def compute_jacobian_leap(list_input_id, list_output_id, partials):
+    """Routine to compute strings for the Jacobian in C associated to an interaction,
+    the counterpart of compute_leap in jacobianC (see write_jacobianC)
+
+    Args:
+        list_input_id (list): contains id of the input, i.e. the depleted species
+        list_output_id (list): contains id of the created species
+        partials (list): [species id, derivative of the rate with respect to the species]
+                         pairs for the species the rate depends on
+
+    Return:
+        a C-formatted string
+    """
+    func = ""
+    for species_id,drate in partials:
+        func += "\t \t drate=" + drate + ";\n"
+        func += ''.join("\t \t jac" + id[1:] + species_id[1:] + "-=drate;\n" for id in list_input_id)
+        func += ''.join("\t \t jac" + id[1:] + species_id[1:] + "+=drate;\n" for id in list_output_id)
+    return func
+
 def track_variable(net, name):
     """Return a list of the indices of the species with type name
 
@@ -119,13 +245,225 @@ def degrad_deriv_inC(net):
     if 'Degradable' in net.dict_types:
         func = "\n/**************degradation rates*****************/\n"
         for species in net.dict_types['Degradable']:
-            rate = '{0}*{1}'.format(species.degradation,species.id)
+            rate = '{0}*{1}'.format(param_inC(species.degradation,"%s"),species.id)
             func += compute_leap([species.id], [], rate)
         return func
     else:
         return "\n"
 interactions_deriv_inC["degrad"] = degrad_deriv_inC
 
+def degrad_jacobian_inC(net):
+    """gives the string corresponding to the Jacobian of the degradations
+
+    Return:
+        A single string for all degradations in the network
+    """
+    func = "\n/**************degradation rates*****************/\n"
+    for species in net.dict_types.get('Degradable',[]):
+        func += compute_jacobian_leap([species.id], [], [[species.id,param_inC(species.degradation,"%s")]])
+    return func
+interactions_jacobian_inC["degrad"] = degrad_jacobian_inC
+
+def check_interactions(net, writers, name):
+    """Check that every interaction of the network written in derivC is also written
+    by writers
+
+    The interactions are identified by their key in interactions_deriv_inC, the
+    name of their type in net.dict_types.
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        writers (dict): interactions_jacobian_inC or interactions_gillespie_inC
+        name (str): what writers write, for the error message
+
+    Raise:
+        ValueError: if the network has interactions without a writer
+    """
+    missing = [interaction for interaction in interactions_deriv_inC if interaction not in writers and net.dict_types.get(interaction)]
+    if missing:
+        raise ValueError("No %s for the interactions %s of the network" % (name, ", ".join(missing)))
+
+def write_jacobianC(net):
+    """Return the C code of jacobianC, the Jacobian of derivC
+
+    jacobianC(s,history,step,jac,ncell) sets jac[i][j] to the derivative of ds[i]
+    with respect to s[j] in the cell ncell, without the diffusion. It is written by
+    the functions of interactions_jacobian_inC. The delayed values (CorePromoter
+    delay > 0) do not depend on the current state.
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+
+    Return:
+        str: the C code
+
+    Raise:
+        ValueError: if the network has interactions without an entry in
+        interactions_jacobian_inC (see check_interactions)
+    """
+    net.write_id()
+    check_interactions(net, interactions_jacobian_inC, "Jacobian (interactions_jacobian_inC)")
+    code = "void jacobianC(double s[],double history[][NSTEP][NCELLTOT],int step, double jac[][SIZE],int ncell){\n int index,jndex;\n"
+    code += "\t for (index=0;index<SIZE;index++) for (jndex=0;jndex<SIZE;jndex++) jac[index][jndex]=0;//initialization\n"
+    code += "\t double drate=0;\n"
+    for jacobian_inC in interactions_jacobian_inC.values():
+        code += jacobian_inC(net)
+    code += "}\n\n"
+    return code
+
+def degrad_gillespie_inC(net):
+    """gives the reactions of the degradations for the Gillespie algorithm (see write_gillespieC)
+
+    Return:
+        list of [list_input_id, list_output_id, rate] as in compute_leap
+    """
+    return [[[species.id], [], '{0}*{1}'.format(param_inC(species.degradation,"%s"),species.id)] for species in net.dict_types.get('Degradable',[])]
+interactions_gillespie_inC["degrad"] = degrad_gillespie_inC
+
+state_pattern = re.compile(r"(?<![\w\]])s\[(\d+)\]") # s[i] in the rates, see derivC2cells
+
+def gillespie_stoichiometry(reactions):
+    """Return the net change of the number of molecules of the species in every reaction
+
+    Args:
+        reactions (list): [list_input_id, list_output_id, rate] (see write_gillespieC)
+
+    Return:
+        list of dict {species index: change} without the species left unchanged
+    """
+    stoichiometry = []
+    for list_input_id,list_output_id,_ in reactions:
+        changes = {}
+        for id,change in [(id,-1) for id in list_input_id]+[(id,1) for id in list_output_id]:
+            index = int(state_pattern.match(id).group(1))
+            changes[index] = changes.get(index,0)+change
+        stoichiometry.append({index:change for index,change in changes.items() if change})
+    return stoichiometry
+
+def gillespie_dependency_graph(reactions, trackin=()):
+    """Return the reactions to update after every reaction of the Gillespie algorithm
+
+    The propensity of a reaction has to be recomputed after another reaction
+    when its rate reads s[i] of a species whose number changes in the other
+    reaction. The rates reading HIST (the delayed transcriptions) or the inputs
+    (reset by inputs at every step) also depend on the time step.
+
+    Args:
+        reactions (list): [list_input_id, list_output_id, rate] (see write_gillespieC)
+        trackin (list): the indices of the input species
+
+    Return:
+        list: [dependents, step_dependent] with dependents[r] the reactions
+        whose propensity depends on the reaction r and step_dependent the
+        reactions to update at every time step
+    """
+    read = [set(int(index) for index in state_pattern.findall(rate)) for _,_,rate in reactions]
+    dependents = [[other for other,species in enumerate(read) if species & set(changes)] for changes in gillespie_stoichiometry(reactions)]
+    step_dependent = [reaction for reaction,(_,_,rate) in enumerate(reactions) if 'HIST(' in rate or read[reaction] & set(trackin)]
+    return [dependents, step_dependent]
+
+def gillespie_volume(prmt):
+    """Return the number of molecules per unit of concentration of the Gillespie
+    integrators: prmt['gillespie'], or with True prmt['langevin_noise'] when it is
+    positive and 1 otherwise
+
+    Args:
+        prmt (dict): dictionary from initialization file
+
+    Return:
+        float: the volume
+
+    Raise:
+        ValueError: if the volume is not positive
+    """
+    volume = prmt['gillespie']
+    if volume is True:
+        volume = prmt.get('langevin_noise',0) if prmt.get('langevin_noise',0) > 0 else 1
+    if not volume > 0:
+        raise ValueError("prmt['gillespie'] must be True or a positive volume, got %r" % (volume,))
+    return volume
+
+def write_gillespieC(net):
+    """Return the C code of the reactions of the network for the Gillespie algorithm
+    (see CCodes/gillespie_integrator.c)
+
+    The reactions are given by the functions of interactions_gillespie_inC.
+    propensity(reaction,s,history,step,ncell)
+    returns the rate of a reaction in the cell ncell (in concentration per unit of
+    time, as in derivC) and update_state(s,reaction,increment) changes s by increment
+    per molecule consumed or produced. The dependency graph of gillespie_dependency_graph
+    is written in gillespie_dependents[gillespie_dependents_start[r]...gillespie_dependents_start[r+1]-1]
+    and gillespie_step_dependent[], the stoichiometry (gillespie_stoichiometry) in
+    gillespie_changes[] and gillespie_changes_species[] (same layout) for the
+    leaps of tau_leaping_integrator.c and hybrid_integrator.c, with
+    gillespie_order[species], the highest number of molecules of the species
+    consumed by a reaction (at least 1 if a rate reads the species, 0 otherwise).
+    The reactions whose rate reads s[i] are in gillespie_readers[] from
+    gillespie_readers_start[i], to update after the diffusion of the species i
+    between two cells (see next_subvolume_integrator.c).
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+
+    Return:
+        str: the C code
+
+    Raise:
+        ValueError: if the network has interactions without an entry in
+        interactions_gillespie_inC, e.g. LR (see check_interactions)
+    """
+    net.write_id()
+    check_interactions(net, interactions_gillespie_inC, "Gillespie reactions (interactions_gillespie_inC)")
+    reactions = []
+    for gillespie_inC in interactions_gillespie_inC.values():
+        reactions += gillespie_inC(net)
+    dependents,step_dependent = gillespie_dependency_graph(reactions, track_variable(net, 'Input'))
+    code = "\n/**************Gillespie reactions*****************/\n"
+    code += "const int gillespie_nreactions=%i;\n\n" % len(reactions)
+    code += "double propensity(int reaction,double s[],double history[][NSTEP][NCELLTOT],int step,int ncell){\n"
+    code += "  switch (reaction){\n"
+    for reaction,(_,_,rate) in enumerate(reactions):
+        code += "  case %i: return %s;\n" % (reaction,rate)
+    code += "  }\n  return 0;\n}\n\n"
+    code += "void update_state(double s[],int reaction,double increment){\n"
+    code += "  switch (reaction){\n"
+    for reaction,(list_input_id,list_output_id,_) in enumerate(reactions):
+        code += "  case %i:\n" % reaction
+        code += ''.join("    %s=MAX(%s-increment,0);\n" % (id,id) for id in list_input_id)
+        code += ''.join("    %s+=increment;\n" % id for id in list_output_id)
+        code += "    break;\n"
+    code += "  }\n}\n\n"
+    start = [0]
+    for reaction_dependents in dependents:
+        start.append(start[-1]+len(reaction_dependents))
+    code += "const int gillespie_dependents_start[]={%s};\n" % ', '.join(str(nn) for nn in start)
+    code += "const int gillespie_dependents[]={%s};\n" % ', '.join(str(nn) for nn in sum(dependents,[])+[0]) # +1 to avoid empty array
+    code += "const int gillespie_nstep_dependent=%i;\n" % len(step_dependent)
+    code += "const int gillespie_step_dependent[]={%s};\n" % ', '.join(str(nn) for nn in step_dependent+[0])
+    stoichiometry = gillespie_stoichiometry(reactions)
+    start = [0]
+    for changes in stoichiometry:
+        start.append(start[-1]+len(changes))
+    code += "const int gillespie_changes_start[]={%s};\n" % ', '.join(str(nn) for nn in start)
+    code += "const int gillespie_changes_species[]={%s};\n" % ', '.join(str(nn) for nn in sum([list(changes) for changes in stoichiometry],[])+[0])
+    code += "const int gillespie_changes[]={%s};\n" % ', '.join(str(nn) for nn in sum([list(changes.values()) for changes in stoichiometry],[])+[0])
+    order = [0]*len(net.dict_types['Species'])
+    for index in set(int(index) for _,_,rate in reactions for index in state_pattern.findall(rate)):
+        order[index] = 1
+    for list_input_id,_,_ in reactions:
+        for id in list_input_id:
+            index = int(state_pattern.match(id).group(1))
+            order[index] = max(order[index],list_input_id.count(id))
+    code += "const int gillespie_order[]={%s};\n" % ', '.join(str(nn) for nn in order)
+    read = [set(int(index) for index in state_pattern.findall(rate)) for _,_,rate in reactions]
+    readers = [[reaction for reaction,species in enumerate(read) if index in species] for index in range(len(order))]
+    start = [0]
+    for species_readers in readers:
+        start.append(start[-1]+len(species_readers))
+    code += "const int gillespie_readers_start[]={%s};\n" % ', '.join(str(nn) for nn in start)
+    code += "const int gillespie_readers[]={%s};\n\n" % ', '.join(str(nn) for nn in sum(readers,[])+[0])
+    return code
+
 def write_deriv_inC(net,programm_file):
     """Write the integration equations in the C-file
 
@@ -144,7 +482,61 @@ def write_deriv_inC(net,programm_file):
     add(deriv2.degrad_deriv_inC(net))#add degradation rates
     add("}\n\n")
 
-def all_params2C(net, prmt, print_buf, Cseed=0):
+def ring_size(nsteps):
+    """Return the number of steps kept by the history ring of prmt['streaming_fitness']
+
+    A power of two (at least 2) so that the modulo of HIST is a mask.
+
+    Args:
+        nsteps (int): the number of steps that must be kept
+
+    Return:
+        int
+    """
+    size = 2
+    while size < nsteps:
+        size *= 2
+    return size
+
+def streaming_defines(net, prmt):
+    """Return the C lines of prmt['streaming_fitness'] (see integrator_header.h)
+
+    The integration runs in the ring history_ring and only the recorded species
+    are copied in history during the recorded window (all of them with
+    PRINT_BUF, see stream_step in utilities.c). The ring keeps the steps
+    needed by the delays of the CorePromoters and by fitness_step.
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file, prmt['streaming_fitness'] is a
+                     dict with the optional keys record (types of the recorded species,
+                     ['Output'] by default), window ([first, last) recorded steps, the
+                     whole integration by default), fitness_step (bool, call fitness_step
+                     after every step) and lookback (steps fitness_step reads with HIST, 1 by default)
+
+    Return:
+        list of str
+    """
+    streaming = prmt['streaming_fitness']
+    first,last = streaming.get('window',[0,prmt['nstep']])
+    if not 0 <= first < last <= prmt['nstep']:
+        raise ValueError("streaming_fitness: invalid window [%i,%i) for %i steps" % (first,last,prmt['nstep']))
+    trackrecord = []
+    for name in streaming.get('record',['Output']):
+        trackrecord += [index for index in track_changing_variable(net, name) if index not in trackrecord]
+    delay = max([int(promoter.delay) for promoter in net.dict_types.get('CorePromoter',[])]+[0])
+    hdr = ["#define STREAMING_FITNESS"]
+    hdr.append("#define NHISTORY %i" % ring_size(max(delay,streaming.get('lookback',1))+1))
+    hdr.append("#define HIST(species,step,cell) history_ring[species][(step)%NHISTORY][cell]")
+    hdr.append("#define RECORD_FIRST %i" % first)
+    hdr.append("#define RECORD_LAST %i" % last)
+    hdr.append("#define NRECORD %i" % len(trackrecord))
+    hdr.append("static int trackrecord[] = {%s};" % ', '.join([str(nn) for nn in trackrecord]))
+    if streaming.get('fitness_step',False):
+        hdr.append("#define FITNESS_STEP")
+    return hdr
+
+def all_params2C(net, prmt, print_buf, Cseed=0, nparam=None, split=False):
     """ Collect all the numerical constants and format them to C like
 
     neelocalneig,diff,index_ligand,ded
@@ -154,6 +546,11 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
         prmt (dict): dictionary from initialization file
         print_buf (bool): control printing of time history by C codes
         Cseed (int): seed for the integrator random number generator
+        nparam (int): number of runtime parameters, if not None SEED, GENERATION,
+                      PRINT_BUF and prm[] are read at run time (see runtime_parameters.c)
+        split (bool): with nparam, declare prm[] and the runtime variables extern
+                      and omit NINTER so that the output only depends on the shape
+                      of the network (see write_program)
 
     Return:
         A C formated string of parameters
@@ -162,7 +559,8 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
 
     # various sizes/lengths mostly from prmt dict
     hdr.append("#define SIZE %i" % len(net.dict_types['Species']))
-    hdr.append("#define NINTER %i" % len(net.dict_types["Interaction"]))
+    if not split:
+        hdr.append("#define NINTER %i" % len(net.dict_types["Interaction"]))
     hdr.append("#define NSTEP %i" % prmt['nstep'])
     hdr.append("#define NCELLTOT %i" % prmt['ncelltot'])
     hdr.append("#define NNEIGHBOR %i" % prmt['nneighbor'])
@@ -171,7 +569,19 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
         hdr.append("#define  CONCENTRATION_SCALE %f" % prmt['langevin_noise'])
     else:
         hdr.append("#define  CONCENTRATION_SCALE 1.0")
-    hdr.append("#define GENERATION %i" % prmt.get('generation',-1) )
+    if nparam is None:
+        hdr.append("#define GENERATION %i" % prmt.get('generation',-1) )
+    elif split: # defined with the derivC function, see write_program
+        hdr.append("#define NPARAM runtime_nparam")
+        hdr.append("extern int runtime_nparam;")
+        hdr.append("extern double *prm;")
+        hdr.append("extern int runtime_seed, runtime_generation, runtime_print_buf;")
+        hdr.append("#define GENERATION runtime_generation")
+    else:
+        hdr.append("#define NPARAM %i" % nparam)
+        hdr.append("static double prm[NPARAM+1];")  # +1 to avoid empty array
+        hdr.append("static int runtime_seed, runtime_generation, runtime_print_buf;")
+        hdr.append("#define GENERATION runtime_generation")
     
     # optional generic parameters for specific C subroutines as dict or list.
     # define NFREE_PRMT is flag in Ccode that free_prmt as list is being used
@@ -201,13 +611,67 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
     hdr.append("#define	NLIGAND %i" % len(tracklig))
     hdr.append("#define	NDIFFUSIBLE %i" % len(trackdiff))
     # misc other numbers
-    if (Cseed == 0):
+    if nparam is not None:
+        hdr.append("#define SEED runtime_seed")
+    elif (Cseed == 0):
         hdr.append("#define SEED %i" % (int(random.random() * 1000000)))  #seed for the C rand
     else:
         hdr.append("#define SEED %i" % Cseed)
 
-    hdr.append("#define PRINT_BUF %i" % print_buf)
+    if nparam is None:
+        hdr.append("#define PRINT_BUF %i" % print_buf)
+    else:
+        hdr.append("#define PRINT_BUF runtime_print_buf")
+    if prmt.get('binary_buffer',False):
+        hdr.append("#define BINARY_BUFFER") # see print_history in utilities.c
+    if prmt.get('average_history',True):
+        hdr.append("#define AVERAGE_HISTORY") # see main_general.c
+    if prmt.get('jacobian',False):
+        hdr.append("#define JACOBIAN") # see write_jacobianC
+    if prmt.get('gillespie',False): # see write_gillespieC and gillespie_integrator.c
+        hdr.append("#define GILLESPIE")
+        hdr.append("#define GILLESPIE_VOLUME %.17g" % gillespie_volume(prmt))
+    if noise_flag:
+        hdr.append("#define LANGEVIN_NOISE") # see stochastic_heun_integrator.c
+    if prmt.get('fast_rng',False): # see integrator_header.h
+        hdr.append("#define FAST_RNG")
+    if prmt.get('openmp_tries',False): # see main_general.c, compiled with -fopenmp
+        hdr.append("#define OPENMP_TRIES")
+        if prmt['openmp_tries'] is not True:
+            hdr.append("#define OPENMP_THREADS %i" % prmt['openmp_tries'])
+    if prmt.get('steady_state'): # see steady_state_skip in utilities.c
+        steady_state = prmt['steady_state']
+        if steady_state is True:
+            steady_state = {}
+        # the state must be still during the delays of the CorePromoters
+        delay = max([int(promoter.delay) for promoter in net.dict_types.get('CorePromoter',[])]+[0])
+        hdr.append("#define STEADY_STATE")
+        hdr.append("#define STEADY_STATE_TOL %g" % steady_state.get('tol',1e-9))
+        hdr.append("#define STEADY_STATE_ATOL %g" % steady_state.get('atol',1e-9))
+        hdr.append("#define STEADY_STATE_WINDOW %i" % max(steady_state.get('window',100),delay+1))
+    if prmt.get('early_termination'): # see stream_step in utilities.c
+        early_termination = prmt['early_termination']
+        if early_termination is True:
+            early_termination = {}
+        hdr.append("#define EARLY_TERMINATION %i" % max(1,early_termination.get('check_every',100)))
+        hdr.append("#define DIVERGENCE_BOUND %g" % early_termination.get('bound',1e10))
+        if early_termination.get('early_reject',False):
+            hdr.append("#define EARLY_REJECT")
     hdr.append("#define DT %f" % prmt['dt'])
+    for key in ['rtol','atol','tau_epsilon','hybrid_threshold']: # see dopri5_integrator.c, tau_leaping_integrator.c and hybrid_integrator.c
+        if key in prmt:
+            hdr.append("#define %s %g" % (key.upper(),prmt[key]))
+    # accessor of the history used during the integration, see integrator_header.h
+    streaming = prmt.get('streaming_fitness')
+    if prmt.get('history_layout','species_major') == 'time_major':
+        if streaming:
+            raise ValueError("all_params2C: streaming_fitness requires the species_major history_layout")
+        hdr.append("#define HISTORY_TIME_MAJOR")
+        hdr.append("#define HIST(species,step,cell) history_tm[step][cell][species]")
+    elif streaming:
+        hdr += streaming_defines(net, prmt)
+    else:
+        hdr.append("#define HIST(species,step,cell) history[species][step][cell]")
 
     # the mapping of input/output indices
     str_in = ', '.join([str(nn) for nn in trackin])
@@ -219,9 +683,14 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
 
     str_diff = ', '.join([str(nn) for nn in trackdiff])
     hdr.append("static int trackdiff[] = {%s};" % str_diff)
-    str_diff_constant = ', '.join([str(net.dict_types['Species'][nn].diffusion) for nn in trackdiff])
-    hdr.append(
-        "static double diff_constant[] = {%s};" % str_diff_constant)  #table containing diffusion constants of ligands
+    if nparam is None:
+        str_diff_constant = ', '.join([str(net.dict_types['Species'][nn].diffusion) for nn in trackdiff])
+        hdr.append(
+            "static double diff_constant[] = {%s};" % str_diff_constant)  #table containing diffusion constants of ligands
+    elif split: # the diffusion constants are the last runtime parameters, see write_program
+        hdr.append("#define diff_constant (prm+NPARAM-NDIFFUSIBLE)")
+    else:
+        hdr.append("static double *const diff_constant = prm+%i;" % (nparam-len(trackdiff)))
     list_ext = []
     if 'Ligand' in net.dict_types:
         for nn in net.dict_types['Ligand']:
@@ -236,41 +705,712 @@ def all_params2C(net, prmt, print_buf, Cseed=0):
 
     return '\n'.join(hdr)  # note added the \n here between all elements of hdr
 
-def write_program(programm_file,net, prmt, print_buf, Cseed=0):
+derivC_signature = "void derivC(double s[],double history[][NSTEP][NCELLTOT],int step, double ds[],double memories[],int ncell){"
+
+def derivC2cells(deriv_code):
+    """Rewrite derivC to compute the derivatives of all the cells at once (prmt['cell_batched'])
+
+    The body of derivC becomes the body of a loop over the cells, s[i] is read
+    directly in HIST(i,step,ncell) and ds[i] is ds[i][ncell], so that
+    consecutive cells are contiguous in memory and the loop can be vectorized by
+    the compiler. The cells are computed in the same order as with
+    euler_integrator.c, with the same random numbers.
+
+    Args:
+        deriv_code (str): derivC written by write_deriv_inC
+
+    Return:
+        str: derivC(double history[][NSTEP][NCELLTOT],int step, double ds[][NCELLTOT])
+    """
+    if not deriv_code.startswith(derivC_signature):
+        raise ValueError("cell_batched requires the derivC of Networks/interaction.py, found:\n"+deriv_code[:deriv_code.find('{')+1])
+    body = deriv_code[len(derivC_signature):deriv_code.rindex('}')]
+    body = body.replace("for (index=0;index<SIZE;index++) ds[index]=0;//initialization","")
+    body = re.sub(r"\bds\[(\d+)\]",r"ds[\1][ncell]",body)
+    body = re.sub(r"(?<![\w\]])s\[(\d+)\]",r"HIST(\1,step,ncell)",body)
+    code = "void derivC(double history[][NSTEP][NCELLTOT],int step, double ds[][NCELLTOT]){\n int index,ncell;\n"
+    code += " for (index=0;index<SIZE;index++) for (ncell=0;ncell<NCELLTOT;ncell++) ds[index][ncell]=0;//initialization\n"
+    code += " for (ncell=0;ncell<NCELLTOT;ncell++){\n"
+    code += body
+    code += " }\n}\n\n"
+    return code
+
+def write_derivC(net, prmt):
+    """Return the C code of the derivC function of the network (see write_deriv_inC)
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+
+    With prmt['jacobian'] the code is followed by jacobianC (see write_jacobianC),
+    with prmt['gillespie'] by the reactions of write_gillespieC.
+
+    Return:
+        [code, parameters, delays] where parameters is the list of the runtime parameters
+        (see param_inC) followed by the diffusion constants if runtime_parameters_mode(prmt),
+        None otherwise, and delays the C expressions of the delays (see min_delay2C)
+    """
+    if prmt.get('jacobian',False) and prmt.get('cell_batched',False):
+        raise ValueError("write_derivC: jacobian requires the derivC of a single cell (no cell_batched)")
+    if prmt.get('gillespie',False) and prmt.get('cell_batched',False):
+        raise ValueError("write_derivC: gillespie_integrator.c does not use the derivC of cell_batched")
+    deriv_file = io.StringIO()
+    code_context.parameters = [] if runtime_parameters_mode(prmt) else None
+    code_context.delays = []
+    try:
+        write_deriv_inC(net,deriv_file) #define in Networks/interaction.py
+        if prmt.get('jacobian',False):
+            deriv_file.write(write_jacobianC(net))
+        if prmt.get('gillespie',False):
+            deriv_file.write(write_gillespieC(net))
+        parameters = code_context.parameters
+        delays = code_context.delays
+        if parameters is not None:
+            parameters += [net.dict_types['Species'][nn].diffusion for nn in track_changing_variable(net, 'Diffusible')]
+    finally:
+        code_context.parameters = None
+        code_context.delays = None
+    if prmt.get('cell_batched',False):
+        return [derivC2cells(deriv_file.getvalue()), parameters, delays]
+    return [deriv_file.getvalue(), parameters, delays]
+
+def min_delay2C(delays):
+    """Return the C code of min_delay(), the smallest positive delay of derivC in
+    time steps (0 without delays), used by the adaptive integrators to keep their
+    steps shorter than the delays (see CCodes/dopri5_integrator.c)
+
+    Args:
+        delays (list): C expressions of the delays returned by write_derivC,
+                       prm references in runtime parameters mode
+
+    Return:
+        str: the C code
+    """
+    code = "int min_delay(void){\n"
+    code += "  int delays[] = {%s};\n" % ', '.join(delays+['0']) # +1 to avoid empty array
+    code += "  int i,delay=0;\n"
+    code += "  for (i=0;i<%i;i++)\n" % len(delays)
+    code += "    if (delays[i]>0 && (delay==0 || delays[i]<delay)) delay=delays[i];\n"
+    code += "  return delay;\n}\n\n"
+    return code
+
+def write_program(programm_file,net, prmt, print_buf, Cseed=0, deriv_program=None):
     """Write the built_integrator of the network in the C file
 
     Collect python encoded C and the stored files selected via cfile
     dictionary and write them in the correct order.
 
+    When deriv_program is given (prmt['precompiled_objects']), derivC and the
+    runtime parameters are written in it and programm_file only receives the
+    pieces that depend on the shape of the network: it is compiled once in an
+    object file shared by all the networks with the same shape (see get_compiled_object).
+
     Args:
         programm_file (TextIOWrapper): the built_integrator file
         net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
         prmt (dict): passed to all_params2C
         print_buf (bool): passed to all_params2C
         Cseed (int): passed to all_params2C
+        deriv_program (TextIOWrapper): the file of derivC, requires runtime parameters
 
     Return:
-        The C programm as a python string
+        list of the runtime parameters if runtime_parameters_mode(prmt), None otherwise
     """
     # these have to be loaded in this order due to implicit type def's
     required_files2 = ['fitness', 'geometry', 'init_history', 'input', 'integrator', 'main']
-    programm_file.write(all_params2C(net, prmt, print_buf, Cseed))
+    # derivC is written first to know the number of runtime parameters
+    deriv_code,parameters,delays = write_derivC(net, prmt)
+    nparam = None if parameters is None else len(parameters)
+    split = deriv_program is not None
+    if split and parameters is None:
+        raise ValueError("write_program: a separate derivC file requires runtime parameters")
+    defines = all_params2C(net, prmt, print_buf, Cseed, nparam, split)
+    programm_file.write(defines)
     programm_file.write(open(cfile['header']).read())
+    if parameters is not None:
+        programm_file.write(open(cfile.get('runtime_parameters',os.path.join(ccode_dir,'runtime_parameters.c'))).read())
     programm_file.write(open(cfile['utilities']).read())
     programm_file.write('/***** end of header, begining of python computed functions ***/\n\n')
-    write_deriv_inC(net,programm_file) #define in Networks/interaction.py
+    if split:
+        programm_file.write(deriv_code[:deriv_code.index('{')].strip()+';\n\n') # prototype of derivC
+        deriv_program.write(defines)
+        deriv_program.write("#define NINTER %i\n" % len(net.dict_types["Interaction"]))
+        deriv_program.write("int runtime_nparam = %i;\n" % nparam)
+        deriv_program.write("static double prm_values[%i];\n" % (nparam+1))
+        deriv_program.write("double *prm = prm_values;\n")
+        deriv_program.write("int runtime_seed, runtime_generation, runtime_print_buf;\n")
+        deriv_program.write("#define DERIVC_UNIT\n")
+        deriv_program.write(open(cfile['header']).read())
+        deriv_program.write(deriv_code)
+    else:
+        programm_file.write(deriv_code)
+    programm_file.write(min_delay2C(delays))
     programm_file.write('/***** end of python computed functions, beginning problem specific fns ***/\n\n')
+    if prmt.get('cell_batched',False):
+        required_files2[required_files2.index('integrator')] = 'integrator_cells'
     for file_name in required_files2:
-        if file_name in cfile and cfile[file_name].endswith('.c'):  # omit files = ' ' etc
+        if file_name == 'integrator_cells':
+            programm_file.write(open(cfile.get('integrator_cells',os.path.join(ccode_dir,'euler_integrator_cells.c'))).read())
+        elif file_name == 'integrator' and 'integrator' in prmt: # replaces cfile['integrator'], see route_integrator
+            programm_file.write(open(prmt['integrator']).read())
+        elif file_name in cfile and cfile[file_name].endswith('.c'):  # omit files = ' ' etc
             programm_file.write(open(cfile[file_name]).read())
+    if prmt.get('backend') == 'shared_library':
+        programm_file.write(open(cfile.get('shared_library',os.path.join(ccode_dir,'shared_library.c'))).read())
+    return parameters
+
+def program_modifier():
+    """Return the name of the module replacing write_program or write_deriv_inC
+    (a pfile['deriv2'] modifier, see initialization_code.init_networks), None
+    when they are the ones of this module and of Networks/interaction.py
+
+    A modifier (e.g. Examples/immune/Immune/deriv2_pMHC_modifier.py) writes the
+    whole C-file, without separate derivC, runtime parameters or shared_library.c.
+    """
+    for function in [write_program, write_deriv_inC]:
+        if function.__module__ not in [__name__, 'phievo.Networks.interaction']:
+            return function.__module__
+    return None
 
 ########## Program Functions ##########
 
-def compile_and_integrate(network, prmt, nnetwork, print_buf=False, Cseed=0):
-    """Compile and integrate a network
+def compile_program(cfile_directory, prmt, shared=False, objects=(), object_only=False, source=None):
+    """Compile the C-file cfile_directory+'.c' in the executable cfile_directory
 
-    Wait for process completion before launching another integration
-    See https://www.python.org/dev/peps/pep-0324/ for interface to run C code
+    Exit the program if the compiler complains.
+
+    Args:
+        cfile_directory (str): path of the C-file without the .c extension
+        prmt (dict): dictionary from initialization file
+        shared (bool): build the shared library cfile_directory+'.so' instead
+        objects (list): object files linked with the C-file (see get_compiled_object)
+        object_only (bool): only build the object file cfile_directory+'.o'
+        source (str): if not None, the C code is sent to the standard input of
+                      the compiler and cfile_directory+'.c' is not read
+
+    Return:
+        str: path of the executable, library or object file
+    """
+    # cmd contains the command in the same order as they would be on a full bash commans
+    # ex: cmd = ["gcc", "-o", "run",  "test.c"] for "gcc -o run test.c"
+    cCompiler = prmt.get("compiler","gcc")
+    flags = prmt.get("compiler_flags","").split()
+    flags += ["-fPIC", "-DPHIEVO_SHARED", "-Dmain=phievo_main"] if shared else []
+    flags += ["-fopenmp"] if prmt.get('openmp_tries',False) else [] # see all_params2C
+    inputs = [cfile_directory+".c"] if source is None else ["-x", "c", "-", "-x", "none"]
+    if object_only:
+        output = cfile_directory+".o"
+        flags = flags + ["-c"]
+        cmd = [cCompiler] + flags + inputs + ["-o" , output]
+    else:
+        output = cfile_directory+".so" if shared else cfile_directory
+        flags = ["-shared"] + flags if shared else flags
+        cmd = [cCompiler] + flags + inputs + list(objects) + ["-lm" , "-o" , output]
+
+    cache_dir = prmt.get('compiler_cache_dir')
+    if cache_dir:
+        files = list(objects) if source is not None else [cfile_directory+".c"]+list(objects)
+        key = compiler_cache_key([cCompiler]+flags, files, source)
+        if fetch_compiled(cache_dir, key, output):
+            return output
+    if source is None:
+        out = subprocess.Popen(cmd,stderr=subprocess.PIPE).communicate()
+    else:
+        out = subprocess.Popen(cmd,stdin=subprocess.PIPE,stderr=subprocess.PIPE).communicate(source.encode())
+
+    if out[1]:
+        print('bug in Ccompile for', cfile_directory, 'err=', out[1], 'BYE')
+        sys.exit(1)
+    if cache_dir:
+        publish_compiled(cache_dir, key, output, prmt)
+    return output
+
+def compile_source(source, cfile_directory, prmt, shared=False, objects=(), object_only=False):
+    """Compile the C code source, see compile_program for the other arguments
+
+    With prmt['compile_in_memory'] the code is sent to the compiler on its
+    standard input, otherwise it is first written in cfile_directory+'.c'.
+
+    Return:
+        str: path of the executable, library or object file
+    """
+    if prmt.get('compile_in_memory',False):
+        return compile_program(cfile_directory, prmt, shared, objects, object_only, source)
+    with open(cfile_directory+'.c','w') as programm_file:
+        programm_file.write(source)
+    return compile_program(cfile_directory, prmt, shared, objects, object_only)
+
+def allows_executables(directory):
+    """Return True if programs can be written and run from directory (it is
+    writable and not mounted noexec, as /dev/shm often is)
+    """
+    if not os.access(directory,os.W_OK):
+        return False
+    try:
+        return not os.statvfs(directory).f_flag & getattr(os,'ST_NOEXEC',0)
+    except (OSError,AttributeError):
+        return os.name != 'posix' # no statvfs on Windows
+
+def build_directory(prmt, work_dir):
+    """Return the directory of the compiled files: work_dir or, with
+    prmt['compile_in_memory'], a scratch directory removed at exit, in /dev/shm
+    (tmpfs) when it allows executables, else in the temporary directory (or in
+    work_dir when neither does).
+    """
+    global scratch_directory
+    if not prmt.get('compile_in_memory',False):
+        return work_dir
+    with compiled_integrators_lock:
+        if scratch_directory is None:
+            parents = [parent for parent in ['/dev/shm',tempfile.gettempdir(),work_dir] if allows_executables(parent)]
+            scratch_directory = tempfile.mkdtemp(prefix='phievo_',dir=parents[0] if parents else work_dir)
+            atexit.register(shutil.rmtree,scratch_directory,True)
+    return scratch_directory
+
+def compiler_cache_key(command, files, source=None):
+    """Return the key of a compilation in the compiler cache
+
+    Args:
+        command (list): the compiler and its flags, without the file names
+        files (list): the C-file and the object files it is linked with
+        source (str): the C code when it is not in a file (see compile_program)
+
+    Return:
+        str: the sha1 of the command and of the content of the files
+    """
+    digest = hashlib.sha1(' '.join(command).encode())
+    if source is not None:
+        digest.update(source.encode())
+    for path in files:
+        with open(path,'rb') as input_file:
+            digest.update(input_file.read())
+    return digest.hexdigest()
+
+def fetch_compiled(cache_dir, key, output):
+    """Copy the file compiled for key from the compiler cache to output
+
+    Args:
+        cache_dir (str): the directory of the compiler cache (prmt['compiler_cache_dir'])
+        key (str): see compiler_cache_key
+        output (str): the path of the compiled file
+
+    Return:
+        bool: True if the file was in the cache
+    """
+    cached = os.path.join(cache_dir,key)
+    try:
+        shutil.copy(cached,output)
+        os.utime(cached) # the least recently used files are removed first
+        hit = True
+    except (FileNotFoundError, PermissionError):
+        hit = False
+    with compiled_integrators_lock:
+        compiler_cache_stats['hit' if hit else 'miss'] += 1
+    return hit
+
+def publish_compiled(cache_dir, key, output, prmt):
+    """Add a compiled file to the compiler cache and remove the least recently used ones
+
+    The file is first copied in a temporary file and then renamed so that
+    several processes (e.g. several seeds) can share the cache. At most
+    prmt['compiler_cache_size'] MB (500 by default) are kept in the cache.
+
+    Args:
+        cache_dir (str): the directory of the compiler cache (prmt['compiler_cache_dir'])
+        key (str): see compiler_cache_key
+        output (str): the path of the compiled file
+        prmt (dict): dictionary from initialization file
+    """
+    os.makedirs(cache_dir,exist_ok=True)
+    descriptor,temporary = tempfile.mkstemp(dir=cache_dir,prefix='.tmp_')
+    os.close(descriptor)
+    shutil.copy(output,temporary)
+    os.replace(temporary,os.path.join(cache_dir,key))
+
+    cached_files = []
+    for cached in os.scandir(cache_dir):
+        if cached.name.startswith('.'): continue
+        try:
+            info = cached.stat()
+        except FileNotFoundError: # removed by another process
+            continue
+        cached_files.append((info.st_mtime,info.st_size,cached.path))
+    cached_files.sort()
+    size = sum(cached[1] for cached in cached_files)
+    for mtime,file_size,path in cached_files:
+        if size <= prmt.get('compiler_cache_size',500)*2**20: break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size -= file_size
+
+def run_program(executable, stdin_data=None):
+    """Execute a compiled integrator and collect the output of treatment_fitness
+
+    Args:
+        executable (str): path of the executable
+        stdin_data (str): sent to the standard input of the executable
+
+    Return:
+        list of the lines printed by treatment_fitness or None if one is empty
+    """
+    stdin = None if stdin_data is None else subprocess.PIPE
+    process = subprocess.Popen(executable, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out = process.communicate(None if stdin_data is None else stdin_data.encode())
+
+    if out[1] or len(out[0]) < 1:  # some floating exceptions do not get to stderr, but loose stdout
+        print('bug during run (or no stdout) for', executable, out[1], 'BYE')
+        sys.exit(1)
+    else:
+        return split_output(out[0].decode())
+
+def split_output(out_str):
+    """Split the output of a program in the lines printed by treatment_fitness
+
+    With prmt['steady_state'], the main also prints the number of steps skipped
+    at steady state on a last line "#steady_state_skipped n" (see main_general.c),
+    n is then appended to the lines.
+
+    Args:
+        out_str (str): the output of the program
+
+    Return:
+        list of str or None if a line of treatment_fitness is empty
+    """
+    out_list = out_str.strip().split('\n')
+    report = []
+    if out_list[-1].startswith('#steady_state_skipped '):
+        report = [out_list.pop().split()[1]]
+        out_list = '\n'.join(out_list).strip().split('\n')
+    for arg in out_list:
+        if not arg: return None
+    return out_list+report
+
+def load_history(filename, size, nstep, ncelltot):
+    """Load a Buffer file written by print_history (see utilities.c)
+
+    The binary files (prmt['binary_buffer']) are mapped in memory without
+    being read, the text files are parsed.
+
+    Args:
+        filename (str): the Buffer file
+        size (int): number of species
+        nstep (int): number of time steps
+        ncelltot (int): number of cells
+
+    Return:
+        numpy array of shape (size,nstep,ncelltot), a numpy.memmap for binary files
+    """
+    header = numpy.fromfile(filename, dtype=numpy.intc, count=4)
+    if len(header) == 4 and tuple(header[:3]) == (size,nstep,ncelltot):
+        return numpy.memmap(filename, dtype=numpy.float64, mode='r', offset=header.nbytes, shape=(size,nstep,ncelltot))
+    history = numpy.genfromtxt(filename, delimiter='\t')[:,1:]
+    return history.reshape(nstep,ncelltot,size).transpose(2,0,1)
+
+def runtime_seed(Cseed=0):
+    """Return the seed of the C rand, drawn at random when Cseed is 0 (see all_params2C)"""
+    return Cseed if Cseed else int(random.random() * 1000000)
+
+def runtime_parameters2str(parameters, prmt, print_buf=False, Cseed=0):
+    """Format the values read by runtime_parameters.c on the standard input
+
+    Args:
+        parameters (list): the values of prm[], see param_inC
+        prmt (dict): dictionary from initialization file
+        print_buf (bool): control printing of time history by C codes to a file
+        Cseed (int): seed for the integrator random number generator
+
+    Return:
+        str: 'SEED GENERATION PRINT_BUF NPARAM' followed by the parameters
+    """
+    header = "%i %i %i %i\n" % (runtime_seed(Cseed), prmt.get('generation',-1), print_buf, len(parameters))
+    return header + "\n".join("%.17g" % value for value in parameters) + "\n"
+
+def get_cache_entry(cache, key, prmt):
+    """Return the entry of key in cache (compiled_integrators or compiled_objects)
+
+    The entry is created if needed and moved at the end of the cache. At most
+    prmt['integrator_cache_size'] (200 by default) entries are kept, the files of
+    the least recently used ones being removed from the disk. The caller holds the
+    entry until release_cache_entry: the files of an entry evicted while held are
+    only removed (and its shared library unloaded) at its last release, and an
+    entry requested again before that is put back in the cache.
+
+    Args:
+        cache (OrderedDict): the cache
+        key (str): hash of the C-file
+        prmt (dict): dictionary from initialization file
+
+    Return:
+        dict: the cache entry, 'path' is the compiled file (None if not compiled
+        yet) and 'lock' must be held to compile it
+    """
+    with compiled_integrators_lock:
+        entry = cache.get(key)
+        if entry is None:
+            entry = evicted_entries.pop(key,None)
+            if entry is None:
+                entry = dict(lock=threading.Lock(),path=None,library=None,key=key,users=0)
+            cache[key] = entry
+        entry['users'] += 1
+        cache.move_to_end(key)
+        while len(cache) > prmt.get('integrator_cache_size',200):
+            old_key,old_entry = cache.popitem(last=False)
+            if old_entry['users'] > 0:
+                evicted_entries[old_key] = old_entry
+            else:
+                remove_cache_files(old_entry)
+    return entry
+
+def release_cache_entry(entry):
+    """Release an entry obtained with get_cache_entry
+
+    The files of the entry are removed if it was evicted from its cache and no
+    other run holds it.
+
+    Args:
+        entry (dict): the cache entry
+    """
+    with compiled_integrators_lock:
+        entry['users'] -= 1
+        if entry['users'] == 0 and evicted_entries.get(entry['key']) is entry:
+            del evicted_entries[entry['key']]
+            remove_cache_files(entry)
+
+def remove_cache_files(entry):
+    """Unload the shared library of an evicted cache entry and remove its files
+
+    Args:
+        entry (dict): the cache entry (see get_cache_entry)
+    """
+    if entry['library'] is not None:
+        with entry['library'].lock:
+            ctypes_dlclose(entry['library']._handle)
+        entry['library'] = None
+    if entry['path']:
+        for path in [entry['path'],os.path.splitext(entry['path'])[0]+'.c']:
+            if os.path.exists(path): os.remove(path)
+        entry['path'] = None
+
+def ctypes_dlclose(handle):
+    """Unload a library loaded by ctypes.CDLL (see load_shared_library)
+
+    Args:
+        handle (int): the _handle of the library
+    """
+    import _ctypes
+    if os.name == 'posix':
+        _ctypes.dlclose(handle)
+    else:
+        _ctypes.FreeLibrary(handle)
+
+def get_compiled_object(source, workplace_dir, prmt, shared=False):
+    """Return the object file compiled from source, compiling it only if needed
+
+    The object files are cached in compiled_objects by the hash of their C-file,
+    see write_program for the content of source.
+
+    Args:
+        source (str): the C-file without derivC
+        workplace_dir (str): where to write the C-file and object
+        prmt (dict): dictionary from initialization file
+        shared (bool): compile for a shared library (see compile_program)
+
+    Return:
+        dict: the cache entry, 'path' is the path of the object file. It must be
+        released (see release_cache_entry) once linked.
+    """
+    key = hashlib.sha1(source.encode()).hexdigest()
+    entry = get_cache_entry(compiled_objects, key, prmt)
+    try:
+        with entry['lock']: # other threads needing the same object wait for its compilation
+            if entry['path'] is None or not os.path.exists(entry['path']):
+                cfile_directory = os.path.join(build_directory(prmt,workplace_dir),'built_object_'+key[:16])
+                entry['path'] = compile_source(source, cfile_directory, prmt, shared, object_only=True)
+    except BaseException:
+        release_cache_entry(entry)
+        raise
+    return entry
+
+def get_compiled_integrator(source, workplace_dir, prmt, shared=False, objects=()):
+    """Return the executable compiled from source, compiling it only if needed
+
+    The executables are cached in compiled_integrators by the hash of their
+    C-file and of the objects they are linked with.
+
+    Args:
+        source (str): the complete C-file
+        workplace_dir (str): where to write the C-file and executable
+        prmt (dict): dictionary from initialization file
+        shared (bool): build a shared library (see compile_program)
+        objects (list): object files linked with the C-file
+
+    Return:
+        dict: the cache entry, 'path' is the path to the executable and
+        'library' the loaded shared library (if shared). It must be released
+        (see release_cache_entry) after the run.
+    """
+    key = hashlib.sha1((source+''.join(objects)).encode()).hexdigest()
+    entry = get_cache_entry(compiled_integrators, key, prmt)
+    try:
+        with entry['lock']: # other threads needing the same executable wait for its compilation
+            if entry['library'] is None and (entry['path'] is None or not os.path.exists(entry['path'])):
+                cfile_directory = os.path.join(build_directory(prmt,workplace_dir),'built_integrator_'+key[:16])
+                entry['path'] = compile_source(source, cfile_directory, prmt, shared, objects)
+                if shared:
+                    entry['library'] = load_shared_library(entry['path'])
+    except BaseException:
+        release_cache_entry(entry)
+        raise
+    return entry
+
+def build_integrator(network, prmt, print_buf, Cseed, work_dir, shared=False):
+    """Write the integrator of a network and get it from the cache of compiled integrators
+
+    With prmt['precompiled_objects'], only derivC is compiled for every new
+    topology and linked with the object file of the other pieces (see write_program),
+    unless write_program is replaced by a pfile['deriv2'] modifier (see
+    program_modifier): the whole C-file is then compiled.
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+        print_buf (bool): passed to write_program
+        Cseed (int): passed to write_program
+        work_dir (str): the workplace directory
+        shared (bool): build a shared library (see compile_program)
+
+    Return:
+        [entry, parameters] the cache entry (see get_compiled_integrator, to be
+        released after the run) and the runtime parameters (see write_program)
+
+    Raise:
+        ValueError: for a shared library with the write_program of a pfile['deriv2']
+        modifier (see program_modifier)
+    """
+    modifier = program_modifier()
+    if shared and modifier is not None:
+        raise ValueError("The shared_library backend requires the write_program of phievo.Networks.deriv2, replaced by %s" % modifier)
+    source = io.StringIO()
+    if prmt.get('precompiled_objects',False) and modifier is None:
+        deriv_source = io.StringIO()
+        parameters = write_program(source,network, prmt, print_buf, Cseed, deriv_source)
+        object_entry = get_compiled_object(source.getvalue(), work_dir, prmt, shared)
+        try:
+            entry = get_compiled_integrator(deriv_source.getvalue(), work_dir, prmt, shared, [object_entry['path']])
+        finally:
+            release_cache_entry(object_entry) # the object is not needed once linked
+    else:
+        parameters = write_program(source,network, prmt, print_buf, Cseed)
+        entry = get_compiled_integrator(source.getvalue(), work_dir, prmt, shared)
+    return [entry, parameters]
+
+def releasing_run(entry, run):
+    """Wrap the run of a cached integrator to release its entry when it ends
+
+    Args:
+        entry (dict): the cache entry held by the run (see get_cache_entry)
+        run: a function without argument that runs the integration
+
+    Return:
+        a function without argument, calling run and releasing entry after the
+        first call
+    """
+    held = [True]
+    def run_and_release():
+        try:
+            return run()
+        finally:
+            with compiled_integrators_lock:
+                release = held[0]
+                held[0] = False
+            if release: release_cache_entry(entry)
+    return run_and_release
+
+def load_shared_library(path):
+    """Load a library built with compile_program(shared=True) and declare integrate()
+
+    Args:
+        path (str): path of the .so file
+
+    Return:
+        ctypes.CDLL: the library
+    """
+    library = ctypes.CDLL(os.path.abspath(path))
+    library.integrate.restype = ctypes.c_int
+    library.integrate.argtypes = [ctypes.POINTER(ctypes.c_double), ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                  ctypes.POINTER(ctypes.c_double), ctypes.c_char_p, ctypes.c_int]
+    library.history_shape.restype = None
+    library.history_shape.argtypes = [ctypes.POINTER(ctypes.c_int)]
+    library.lock = threading.Lock() # the C globals (history...) are shared by all the calls
+    return library
+
+def run_shared_library(library, parameters, prmt, print_buf=False, Cseed=0):
+    """Call integrate() of a library built by build_integrator(shared=True)
+
+    Args:
+        library (ctypes.CDLL): the library (see load_shared_library)
+        parameters (list): the runtime parameters (see write_program)
+        prmt (dict): dictionary from initialization file
+        print_buf (bool): return the time history of every try
+        Cseed (int): seed for the integrator random number generator
+
+    Return:
+        [out_list, history] see shared_integrate
+    """
+    shape = (ctypes.c_int*4)()
+    library.history_shape(shape)
+    history = numpy.zeros(tuple(shape)) if print_buf else None
+    history_ptr = history.ctypes.data_as(ctypes.POINTER(ctypes.c_double)) if print_buf else None
+    c_parameters = (ctypes.c_double*max(1,len(parameters)))(*parameters)
+    seed = runtime_seed(Cseed)
+    out_len = 1<<16
+    while True:
+        out = ctypes.create_string_buffer(out_len)
+        with library.lock:
+            n_char = library.integrate(c_parameters, len(parameters), seed, prmt.get('generation',-1), history_ptr, out, out_len)
+        if n_char < 0:
+            print('bug during run of shared library', library._name, 'BYE')
+            sys.exit(1)
+        if n_char < out_len: break
+        out_len = n_char+1 # the output was truncated, run again with a larger buffer
+    return [split_output(out.value.decode()), history]
+
+def shared_integrate(network, prmt, print_buf=False, Cseed=0):
+    """Integrate a network in the python process with a shared library
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+        print_buf (bool): return the time history of every try
+        Cseed (int): seed for the integrator random number generator
+
+    Return:
+        [out_list, history] where out_list is the output of treatment_fitness
+        (see compile_and_integrate) and history a numpy array of shape
+        (NTRIES,SIZE,NSTEP,NCELLTOT) or None if not print_buf
+    """
+    work_dir = prmt.get("workplace_dir",workplace_dir)
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+    entry,parameters = build_integrator(network, prmt, print_buf, Cseed, work_dir, shared=True)
+    try:
+        if parameters is None:
+            raise NotImplementedError("The shared_library backend requires a write_program that supports runtime parameters.")
+        return run_shared_library(entry['library'], parameters, prmt, print_buf, Cseed)
+    finally:
+        release_cache_entry(entry)
+
+def compile_integrator(network, prmt, nnetwork, print_buf=False, Cseed=0):
+    """Write and compile the integrator of a network, first half of compile_and_integrate
+
+    Splitting the compilation from the execution allows to pipeline them
+    (see Populations_Types/asyncio_population.py). With prmt['deterministic'],
+    the networks already integrated are not compiled again, their fitness is
+    taken from fitness_cache (see fitness_cache_key). The compiled integrator is
+    kept on the disk until the function is called, even if it is evicted from
+    compiled_integrators meanwhile (see release_cache_entry).
 
     Args:
         network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
@@ -280,46 +1420,383 @@ def compile_and_integrate(network, prmt, nnetwork, print_buf=False, Cseed=0):
         Cseed (int): seed for the integrator random number generator
 
     Return:
-        list of corresponding to the different line of the output of treatment_fitness
-        (see your fitness.c file) or None if an error occured
+        a function without argument that runs the integration and returns the
+        output of treatment_fitness (see compile_and_integrate) or None if the
+        network has no Output
     """
-
     network.write_id()
-    if "workplace_dir" in prmt:
-        workplace_dir = prmt["workplace_dir"]
-    if not os.path.exists(workplace_dir):
-        os.makedirs(workplace_dir)
-    cfile_directory = os.path.join(workplace_dir,'built_integrator'+str(nnetwork))
-    #import pdb;pdb.set_trace()
+    work_dir = prmt.get("workplace_dir",workplace_dir)
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
     # check for outputs
     if 'Output' not in network.dict_types:
         print("No Output for network %i" % nnetwork)
         return None
-    # Write the program in a c file
-    with open(cfile_directory+'.c','w') as cfile:
-        write_program(cfile,network, prmt, print_buf, Cseed)
+
+    key = None if print_buf else fitness_cache_key(network, prmt)
+    if key is not None:
+        with compiled_integrators_lock:
+            cached = key in fitness_cache
+            if cached:
+                fitness_cache.move_to_end(key)
+                result = fitness_cache[key]
+        if cached:
+            return lambda: None if result is None else list(result)
+    routed_prmt,integrator_name = route_integrator(network, prmt)
+    run = integrator_runner(network, routed_prmt, nnetwork, print_buf, Cseed, work_dir)
+    if integrator_name is not None:
+        run = tag_integrator(run, integrator_name)
+    if key is None:
+        return run
+    return lambda: store_fitness(key, run(), prmt)
+
+def fastest_rate(net, concentration=1.0, nneighbor=2):
+    """Estimate the fastest first order rate of the equations of a network
+
+    Every species is consumed at least at the rate of its degradation, of its
+    complexations with a partner at the given concentration, of its
+    phosphorylation by a kinase at this concentration (the largest slope of the
+    Hill function is about hill/(4*threshold)), of its degradation by a protein at
+    this concentration and of its diffusion to its nneighbor neighbours.
+    The rate of the fastest species bounds the time step of the Euler method: it
+    diverges when dt*rate > 2.
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        concentration (float): typical concentration of the partners
+        nneighbor (int): number of neighbours of a cell (prmt['nneighbor'])
+
+    Return:
+        float: the largest rate (in 1/time), 0 for a network without reaction
+    """
+    rates = {}
+    def add_rate(species, rate):
+        rates[species] = rates.get(species,0)+abs(rate)
+    for species in net.dict_types.get('Degradable',[]):
+        add_rate(species, species.degradation)
+    for species in net.dict_types.get('Diffusible',[]):
+        add_rate(species, 2*nneighbor*species.diffusion)
+    for reaction in net.dict_types.get('PPI',[]):
+        for partner in net.graph.list_predecessors(reaction):
+            add_rate(partner, reaction.association*concentration)
+        add_rate(net.graph.list_successors(reaction)[0], reaction.disassociation)
+    for reaction in net.dict_types.get('Phosphorylation',[]):
+        [cataList,species,species_P] = net.catal_data(reaction)
+        add_rate(species[0], reaction.rate*concentration*max(reaction.hill,1)/(4*max(reaction.threshold,1e-10)))
+        add_rate(species_P[0], reaction.dephosphorylation)
+    for reaction in net.dict_types.get('Degradation',[]):
+        add_rate(net.graph.list_successors(reaction)[0], reaction.rate*concentration)
+    return max(rates.values(),default=0)
+
+def is_stock_euler(integrator_file):
+    """Return True if integrator_file is euler_integrator.c or euler_integrator_cells.c
+    of phievo/CCodes (a bare file name stands for the stock file)
+    """
+    if not os.path.dirname(integrator_file):
+        integrator_file = os.path.join(ccode_dir,integrator_file)
+    return os.path.abspath(integrator_file) in [os.path.join(os.path.abspath(ccode_dir),name) for name in ['euler_integrator.c','euler_integrator_cells.c']]
+
+def route_integrator(network, prmt):
+    """Choose the integrator of a network from its stiffness, see prmt['stiffness_routing']
+
+    dt*fastest_rate(network) is compared with the thresholds 'adaptive' (1 by
+    default) and 'implicit' (10 by default) of prmt['stiffness_routing']: below
+    'adaptive' the network keeps the integrator of cfile (the Euler method), up to
+    'implicit' it is integrated by dopri5_integrator.c and beyond by
+    implicit_euler_integrator.c. Deterministic integrations with the stock Euler
+    integrators only: the prmt is unchanged with langevin_noise, gillespie, the
+    numpy backend or a project integrator (e.g. integrator_pMHC_improved.c of
+    Examples/immune).
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+
+    Return:
+        list: [prmt, name] with the prmt selecting the integrator (prmt['integrator'])
+        and the name of its file recorded in data_evolution (see tag_integrator),
+        None without routing
+    """
+    routing = prmt.get('stiffness_routing')
+    if routing is None or routing is False or prmt.get('langevin_noise',0) > 0 or prmt.get('gillespie',False) or prmt.get('backend') == 'numpy':
+        return [prmt, None]
+    if not is_stock_euler(prmt.get('integrator',cfile.get('integrator',''))):
+        return [prmt, None]
+    if routing is True: # default thresholds
+        routing = {}
+    stiffness = prmt['dt']*fastest_rate(network, routing.get('concentration',1.0), prmt.get('nneighbor',2))
+    if stiffness < routing.get('adaptive',1.0):
+        if prmt.get('cell_batched',False):
+            return [prmt, os.path.basename(cfile.get('integrator_cells','euler_integrator_cells.c'))]
+        return [prmt, os.path.basename(prmt.get('integrator',cfile['integrator']))]
+    if stiffness < routing.get('implicit',10.0):
+        integrator_file = os.path.join(ccode_dir,'dopri5_integrator.c')
+        return [dict(prmt,integrator=integrator_file,cell_batched=False), os.path.basename(integrator_file)]
+    integrator_file = os.path.join(ccode_dir,'implicit_euler_integrator.c')
+    return [dict(prmt,integrator=integrator_file,jacobian=True,cell_batched=False), os.path.basename(integrator_file)]
+
+def tag_integrator(run, integrator_name):
+    """Append the name of the integrator to the output of run (see route_integrator)"""
+    def tagged_run():
+        result = run()
+        return None if result is None else list(result)+[integrator_name]
+    return tagged_run
+
+def fitness_cache_key(network, prmt):
+    """Return the key of a network in fitness_cache, None if its fitness should not be cached
+
+    The fitness is only cached when prmt['deterministic'] states that it
+    depends neither on the seed nor on the generation, without Langevin noise
+    or Gillespie algorithm.
+    The C-file written in runtime parameters mode (see write_program) contains
+    the topology, the prmt values and the C pieces the result depends on, it is
+    hashed with the values of the parameters.
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+
+    Return:
+        str: the key or None
+    """
+    if not prmt.get('deterministic',False) or prmt.get('langevin_noise',0) > 0 or prmt.get('gillespie',False) or prmt.get('fitness_cache_size',1000) <= 0:
+        return None
+    source = io.StringIO()
+    parameters = write_program(source,network, dict(prmt,runtime_parameters=True,backend='executable',precompiled_objects=False), False)
+    if parameters is None:
+        return None
+    digest = hashlib.sha1(source.getvalue().encode())
+    digest.update(' '.join('%.17g' % value for value in parameters).encode())
+    if prmt.get('backend') == 'numpy': # the fitness is computed by python
+        digest.update(b'numpy')
+    return digest.hexdigest()
+
+def store_fitness(key, result, prmt):
+    """Store the result of an integration in fitness_cache (see compile_integrator)
+
+    At most prmt['fitness_cache_size'] (1000 by default) results are kept, the
+    least recently used being removed first.
+
+    Args:
+        key (str): see fitness_cache_key
+        result (list): output of treatment_fitness
+        prmt (dict): dictionary from initialization file
+
+    Return:
+        result
+    """
+    with compiled_integrators_lock:
+        fitness_cache[key] = None if result is None else list(result)
+        fitness_cache.move_to_end(key)
+        while len(fitness_cache) > prmt.get('fitness_cache_size',1000):
+            fitness_cache.popitem(last=False)
+    return result
+
+def integrator_runner(network, prmt, nnetwork, print_buf, Cseed, work_dir):
+    """Write and compile the integrator of a network with the backend selected by prmt
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+        nnetwork (int): an id to separate the different C-file
+        print_buf (bool): control printing of time history by C codes to a file
+        Cseed (int): seed for the integrator random number generator
+        work_dir (str): the workplace directory
+
+    Return:
+        a function without argument that runs the integration (see compile_integrator)
+    """
+    if prmt.get('backend') == 'numpy':
+        from phievo.Networks import deriv_numpy
+        return lambda: deriv_numpy.numpy_integrate(network, prmt, print_buf, Cseed)[0]
+
+    cfile_directory = os.path.join(build_directory(prmt,work_dir),'built_integrator'+str(nnetwork))
+    if prmt.get('backend') == 'shared_library':
+        entry,parameters = build_integrator(network, prmt, print_buf, Cseed, work_dir, shared=True)
+        if parameters is None:
+            release_cache_entry(entry)
+            raise NotImplementedError("The shared_library backend requires a write_program that supports runtime parameters.")
+        return releasing_run(entry, lambda: run_shared_library(entry['library'], parameters, prmt, print_buf, Cseed)[0])
+
+    if runtime_parameters_mode(prmt):
+        entry,parameters = build_integrator(network, prmt, print_buf, Cseed, work_dir)
+        stdin_data = None if parameters is None else runtime_parameters2str(parameters, prmt, print_buf, Cseed)
+        return releasing_run(entry, lambda: run_program(entry['path'], stdin_data))
+
+    # Write the program
+    source = io.StringIO()
+    write_program(source,network, prmt, print_buf, Cseed)
 
     # Compile the program
-    # cmd contains the command in the same order as they would be on a full bash commans
-    # ex: cmd = ["gcc", "-o", "run",  "test.c"] for "gcc -o run test.c"
-    cCompiler = prmt.get("compiler","gcc")
-    cmd = [cCompiler , cfile_directory+".c" , "-lm" , "-o" , cfile_directory]
-    out = subprocess.Popen(cmd,stderr=subprocess.PIPE).communicate()
+    compile_source(source.getvalue(), cfile_directory, prmt)
+    return lambda: run_program(cfile_directory)
 
+def compile_and_integrate(network, prmt, nnetwork, print_buf=False, Cseed=0):
+    """Compile and integrate a network
 
-    if out[1]:
-        print('bug in Ccompile for', cfile_directory, 'err=', out[1], 'BYE')
-        sys.exit(1)
+    Wait for process completion before launching another integration
+    See https://www.python.org/dev/peps/pep-0324/ for interface to run C code
+
+    With prmt['runtime_parameters'], the executable is shared by all the networks
+    with the same topology (see get_compiled_integrator) and the parameters are
+    sent to its standard input. With prmt['backend'] = 'shared_library' the
+    integration is done in the python process (see shared_integrate).
 
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+        nnetwork (int): an id to separate the different C-file
+        print_buf (bool): control printing of time history by C codes to a file
+        Cseed (int): seed for the integrator random number generator
+
+    Return:
+        list of corresponding to the different line of the output of treatment_fitness
+        (see your fitness.c file) or None if an error occured
+    """
+    run = compile_integrator(network, prmt, nnetwork, print_buf, Cseed)
+    if run is None:
+        return None
     # Execute the programm
-    out = subprocess.Popen(cfile_directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+    return run()
 
-    if out[1] or len(out[0]) < 1:  # some floating exceptions do not get to stderr, but loose stdout
-        print('bug during run (or no stdout) for', cfile_directory, out[1], 'BYE')
-        sys.exit(1)
-    else:
-        out_str = out[0].strip().decode()
-        out_list = out_str.split('\n')
-        for arg in out_list:
-            if not arg: return None
-        return out_list
+########## Batch Functions ##########
+# Integrate several networks with a single program (see CCodes/batch_main.c)
+
+def write_batch_program(programm_file, networks, prmt, Cseeds, nnetworks):
+    """Write a program integrating several networks with the same shape
+
+    The pieces of write_program that do not depend on the interactions are
+    written once, followed by a derivC_k function and the parameters of every
+    network. derivC is a pointer set to derivC_k before calling the main of the
+    project (renamed phievo_main) for the network k, see batch_main.c.
+
+    Args:
+        programm_file (TextIOWrapper): the batch file
+        networks (list): the networks, write_program must give the same
+                         C-file without derivC for all of them
+        prmt (dict): dictionary from initialization file
+        Cseeds (list): seeds for the integrator random number generator
+        nnetworks (list): the ids of the networks printed before their outputs
+    """
+    batch_prmt = dict(prmt,runtime_parameters=True,backend='executable')
+    jacobian = prmt.get('jacobian',False)
+    programm_file.write("#define PHIEVO_BATCH\n#define main phievo_main\n#define derivC (*batch_derivC)\n")
+    if jacobian:
+        programm_file.write("#define jacobianC (*batch_jacobianC)\n")
+    write_program(programm_file,networks[0], batch_prmt, False, 0, io.StringIO())
+    programm_file.write("#undef derivC\n#undef jacobianC\n#undef main\n\n")
+    nparams = []
+    for index,network in enumerate(networks):
+        deriv_code,parameters,_ = write_derivC(network, batch_prmt)
+        nparams.append(len(parameters))
+        programm_file.write("#define derivC derivC_%i\n#define jacobianC jacobianC_%i\n" % (index,index))
+        programm_file.write(deriv_code)
+        programm_file.write("#undef derivC\n#undef jacobianC\n")
+        str_prm = ', '.join("%.17g" % value for value in parameters+[0]) # +1 to avoid empty array
+        programm_file.write("static double prm_%i[] = {%s};\n\n" % (index,str_prm))
+    programm_file.write("#define NBATCH %i\n" % len(networks))
+    programm_file.write("#define BATCH_GENERATION %i\n" % prmt.get('generation',-1))
+    str_deriv = ', '.join("derivC_%i" % index for index in range(len(networks)))
+    programm_file.write("static __typeof__(batch_derivC) const batch_derivCs[NBATCH] = {%s};\n" % str_deriv)
+    if jacobian:
+        str_jacobian = ', '.join("jacobianC_%i" % index for index in range(len(networks)))
+        programm_file.write("static __typeof__(batch_jacobianC) const batch_jacobianCs[NBATCH] = {%s};\n" % str_jacobian)
+    str_prm = ', '.join("prm_%i" % index for index in range(len(networks)))
+    programm_file.write("static double *const batch_prm[NBATCH] = {%s};\n" % str_prm)
+    programm_file.write("static const int batch_nparam[NBATCH] = {%s};\n" % ', '.join(str(nn) for nn in nparams))
+    programm_file.write("static const int batch_seed[NBATCH] = {%s};\n" % ', '.join(str(runtime_seed(Cseed)) for Cseed in Cseeds))
+    programm_file.write("static const int batch_id[NBATCH] = {%s};\n\n" % ', '.join(str(nn) for nn in nnetworks))
+    programm_file.write(open(cfile.get('batch_main',os.path.join(ccode_dir,'batch_main.c'))).read())
+
+def run_batch(executable):
+    """Execute a batch program and split its output (see batch_main.c)
+
+    Args:
+        executable (str): path of the executable
+
+    Return:
+        dict: the output of treatment_fitness (see run_program) of every network
+        completed, indexed by the network ids
+    """
+    process = subprocess.Popen(executable, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out = process.communicate()
+    results = {}
+    for chunk in out[0].decode().split('\n#network ')[1:]:
+        nnetwork,_,output = chunk.partition('\n')
+        results[int(nnetwork)] = split_output(output)
+    if (out[1] or process.returncode) and results:
+        results.popitem() # the output of the last network may be incomplete
+    return results
+
+def batch_integrate(networks, prmt, nnetworks, Cseeds):
+    """Compile and integrate several networks with one program per shape of network
+
+    The networks are grouped by the C-file written by write_program without
+    derivC (with the integrator chosen by route_integrator), every group is
+    integrated by a batch program (see write_batch_program),
+    at most prmt['run_slots'] (number of cores by default) at a time. The networks
+    not completed by a batch program are integrated by compile_and_integrate,
+    as all the networks with the numpy backend, prmt['gillespie'] (the
+    reactions of write_gillespieC are not batched) or a write_program replaced
+    by a pfile['deriv2'] modifier (see program_modifier).
+
+    Args:
+        networks (list): the networks
+        prmt (dict): dictionary from initialization file
+        nnetworks (list): ids of the networks
+        Cseeds (list): seeds for the integrator random number generator
+
+    Return:
+        list of the outputs of treatment_fitness (see compile_and_integrate)
+    """
+    if prmt.get('backend') == 'numpy' or prmt.get('gillespie',False) or program_modifier() is not None:
+        return [compile_and_integrate(network, prmt, nnetwork, False, Cseed) for network,nnetwork,Cseed in zip(networks,nnetworks,Cseeds)]
+    work_dir = prmt.get("workplace_dir",workplace_dir)
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+    results = {}
+    keys = {}
+    groups = OrderedDict()
+    routes = {} # [prmt, integrator name] of every group, see route_integrator
+    for network,nnetwork in zip(networks,nnetworks):
+        network.write_id()
+        if 'Output' not in network.dict_types:
+            print("No Output for network %i" % nnetwork)
+            results[nnetwork] = None
+            continue
+        keys[nnetwork] = fitness_cache_key(network, prmt)
+        with compiled_integrators_lock:
+            if keys[nnetwork] in fitness_cache:
+                fitness_cache.move_to_end(keys[nnetwork])
+                cached = fitness_cache[keys[nnetwork]]
+                results[nnetwork] = None if cached is None else list(cached)
+                continue
+        route = route_integrator(network, prmt)
+        static_part = io.StringIO()
+        write_program(static_part,network, dict(route[0],runtime_parameters=True,backend='executable'), False, 0, io.StringIO())
+        groups.setdefault(static_part.getvalue(),[]).append(nnetwork)
+        routes[static_part.getvalue()] = route
+
+    index_network = dict(zip(nnetworks,range(len(networks))))
+    def integrate_group(group_index, group, route):
+        source = io.StringIO()
+        write_batch_program(source, [networks[index_network[nn]] for nn in group], route[0],
+                            [Cseeds[index_network[nn]] for nn in group], group)
+        cfile_directory = os.path.join(build_directory(prmt,work_dir),'built_batch%i' % group_index)
+        return run_batch(compile_source(source.getvalue(), cfile_directory, route[0]))
+
+    with ThreadPoolExecutor(prmt.get('run_slots',os.cpu_count() or 1)) as pool:
+        batch_results = list(pool.map(integrate_group, range(len(groups)), groups.values(), [routes[static] for static in groups]))
+    for static,batch_result in zip(groups,batch_results):
+        integrator_name = routes[static][1]
+        for nnetwork in groups[static]:
+            index = index_network[nnetwork]
+            if nnetwork in batch_result:
+                results[nnetwork] = batch_result[nnetwork]
+                if integrator_name is not None and results[nnetwork] is not None:
+                    results[nnetwork] = results[nnetwork]+[integrator_name]
+            else:
+                results[nnetwork] = compile_and_integrate(networks[index], prmt, nnetwork, False, Cseeds[index])
+            if keys[nnetwork] is not None:
+                store_fitness(keys[nnetwork], results[nnetwork], prmt)
+    return [results[nnetwork] for nnetwork in nnetworks]
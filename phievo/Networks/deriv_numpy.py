@@ -0,0 +1,229 @@
+"""Tools to integrate a Network with NumPy instead of a compiled C-file,
+selected with prmt['backend'] = 'numpy'.
+
+The equations of the network are written as a python function derivNumpy,
+the way deriv2 writes derivC: every interaction module registers a writer
+in interactions_deriv_numpy. The concentrations s[i] are arrays of shape
+(NCELLTOT,NTRIES) so that all the cells and all the tries are integrated at
+once with the Euler scheme of CCodes/euler_integrator.c (see numpy_integrate).
+
+The C pieces specific to a project (init_history, input and fitness) are
+replaced by the functions of the python module pfile['numpy_fitness'] of the
+project (see fitness_module):
+
+    - init_history(history, trackin, trackout, prmt, rng) (optional): set the
+      initial concentrations history[:,0], zero by default
+    - inputs(trackin, prmt, rng) (optional): return the values of the inputs, an
+      array of shape (NINPUT,NSTEP,NCELLTOT,NTRIES) written in history at every step
+    - fitness(history, trackin, trackout, prmt): return the list of values
+      printed by treatment_fitness in the C version
+
+where history is an array of shape (SIZE,NSTEP,NCELLTOT,NTRIES) and rng a
+numpy.random.Generator seeded with Cseed.
+
+Attributes:
+    interactions_deriv_numpy (dict): the writers of the interactions, see degrad_deriv_numpy
+    fitness_module (module): the python module of the project, see initialization_code.init_networks
+    numpy_functions (OrderedDict): derivNumpy functions already compiled, keyed by their source
+"""
+from phievo import __silent__,__verbose__
+if __verbose__:
+    print("Execute deriv_numpy")
+
+from phievo.Networks import deriv2
+from collections import OrderedDict
+import numpy
+import os
+
+interactions_deriv_numpy = {}
+fitness_module = None
+numpy_functions = OrderedDict()
+
+########## Routine Functions ##########
+# numpy versions of the functions of CCodes/integrator_header.h
+
+def HillR(x,thresh,n):
+    r = numpy.exp(n*numpy.log(x/thresh))
+    return 1.0/(1+r)
+
+def HillA(x,thresh,n):
+    r = numpy.exp(n*numpy.log(x/thresh))
+    return r/(1+r)
+
+def POW(x,n):
+    return numpy.exp(n*numpy.log(x))
+
+MAX = numpy.maximum
+
+def compute_leap(list_input_id, list_output_id, rate, indent="    "):
+    """Routine to compute the python lines of derivNumpy associated to an interaction
+    (see deriv2.compute_leap)
+
+    Args:
+        list_input_id (list): contains id of the input, i.e. the depleted species
+        list_output_id (list): contains id of the created species
+        rate (str): the rate, should be positive
+        indent (str): indentation of the lines
+
+    Return:
+        a python-formatted string
+    """
+    func = indent + "rate = " + rate + "\n"
+    func += indent + ("increment = noisy_increment(rate)\n" if deriv2.noise_flag else "increment = rate\n")
+    func += ''.join(indent + "d" + id + " -= increment\n" for id in list_input_id)
+    func += ''.join(indent + "d" + id + " += increment\n" for id in list_output_id)
+    return func
+
+########## Writing Functions ##########
+
+def degrad_deriv_numpy(net):
+    """gives the python lines corresponding to the degradation integration
+
+    Return:
+        A single string for all degradations in the network
+    """
+    func = "    # degradation rates\n"
+    for species in net.dict_types.get('Degradable',[]):
+        rate = '{0}*{1}'.format(deriv2.param_inC(species.degradation),species.id)
+        func += compute_leap([species.id], [], rate)
+    return func
+interactions_deriv_numpy["degrad"] = degrad_deriv_numpy
+
+def write_deriv_numpy(net):
+    """Return the source of the derivNumpy function of the network
+
+    The numerical parameters are stored in a list and replaced by prm[i],
+    as in runtime parameters mode (see deriv2.param_inC), so that the
+    function is compiled once per topology.
+
+    Args:
+        net (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+
+    Return:
+        [source, parameters]
+    """
+    net.write_id()
+    deriv2.code_context.parameters = []
+    try:
+        source = "def derivNumpy(s, history, step, ds, prm, ligands, noisy_increment):\n"
+        source += "    ds[:] = 0\n"
+        for deriv_numpy in interactions_deriv_numpy.values():
+            source += deriv_numpy(net)
+        parameters = deriv2.code_context.parameters
+    finally:
+        deriv2.code_context.parameters = None
+    return [source, parameters]
+
+def get_derivNumpy(source, prmt):
+    """Compile the source of derivNumpy, the functions are cached in numpy_functions
+
+    Args:
+        source (str): see write_deriv_numpy
+        prmt (dict): dictionary from initialization file, at most
+                     prmt['integrator_cache_size'] functions are kept
+
+    Return:
+        the derivNumpy function
+    """
+    with deriv2.compiled_integrators_lock:
+        function = numpy_functions.get(source)
+        if function is None:
+            namespace = dict(HillR=HillR,HillA=HillA,POW=POW,MAX=MAX,numpy=numpy)
+            exec(compile(source,'<derivNumpy>','exec'),namespace)
+            function = numpy_functions[source] = namespace['derivNumpy']
+        numpy_functions.move_to_end(source)
+        while len(numpy_functions) > prmt.get('integrator_cache_size',200):
+            numpy_functions.popitem(last=False)
+    return function
+
+########## Integration Functions ##########
+
+def init_geometry(prmt):
+    """Return the geometry array of CCodes/linear_geometry.c or circular_geometry.c
+
+    Return:
+        numpy array of shape (NCELLTOT,NNEIGHBOR), -1 for no neighbour
+    """
+    ncelltot,nneighbor = prmt['ncelltot'],prmt['nneighbor']
+    geometry = -numpy.ones((ncelltot,max(nneighbor,3)),dtype=int)
+    geometry[:,0] = numpy.arange(ncelltot)-1
+    geometry[:,1] = numpy.arange(ncelltot)
+    geometry[:,2] = numpy.arange(ncelltot)+1
+    geometry[-1,2] = -1
+    if os.path.basename(deriv2.cfile.get('geometry','')) == 'circular_geometry.c':
+        geometry[0,0] = ncelltot-1
+        geometry[-1,2] = 0
+    return geometry[:,:nneighbor]
+
+def numpy_integrate(network, prmt, print_buf=False, Cseed=0):
+    """Integrate a network with NumPy (prmt['backend'] = 'numpy')
+
+    Same scheme as the C-file written by deriv2.write_program with
+    euler_integrator.c (or variation_integrator.c for the LR interactions)
+    and main_general.c, all the tries being integrated at once.
+
+    Args:
+        network (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): -
+        prmt (dict): dictionary from initialization file
+        print_buf (bool): return the time history of every try
+        Cseed (int): seed of the random number generator
+
+    Return:
+        [out_list, history] where out_list is the output of the fitness function
+        of fitness_module (see compile_and_integrate) and history a numpy array of
+        shape (NTRIES,SIZE,NSTEP,NCELLTOT) or None if not print_buf
+    """
+    if fitness_module is None or not hasattr(fitness_module,'fitness'):
+        raise ImportError("The numpy backend requires a python fitness function, see pfile['numpy_fitness']")
+    source,parameters = write_deriv_numpy(network)
+    derivNumpy = get_derivNumpy(source, prmt)
+    prm = numpy.array(parameters+[0.])
+    rng = numpy.random.default_rng(deriv2.runtime_seed(Cseed))
+
+    size = len(network.dict_types['Species'])
+    nstep,ncelltot,ntries,dt = prmt['nstep'],prmt['ncelltot'],prmt['ntries'],prmt['dt']
+    concentration_scale = prmt.get('langevin_noise',1.0)
+    trackin = deriv2.track_variable(network, 'Input')
+    trackout = deriv2.track_changing_variable(network, 'Output')
+    tracklig = deriv2.track_changing_variable(network, 'Ligand')
+    trackdiff = deriv2.track_changing_variable(network, 'Diffusible')
+    diff_constant = numpy.array([network.dict_types['Species'][nn].diffusion for nn in trackdiff]).reshape(-1,1,1)
+    externallig = [species.isinstance('Diffusible') for species in network.dict_types.get('Ligand',[])]
+    variation = os.path.basename(deriv2.cfile.get('integrator','')) == 'variation_integrator.c'
+
+    # neighbours as index arrays: the local cell is excluded from the ligands sums
+    geometry = init_geometry(prmt)
+    neighbors = numpy.where(geometry>=0,geometry,0)
+    valid = (geometry>=0)[:,:,None]
+    n_localneig = valid.sum(axis=1)
+    distant = valid & (geometry!=numpy.arange(ncelltot)[:,None])[:,:,None]
+
+    def noisy_increment(rate):
+        return rate+rng.standard_normal((ncelltot,ntries))*numpy.sqrt(rate/(dt*concentration_scale))
+
+    history = numpy.zeros((size,nstep,ncelltot,ntries))
+    if hasattr(fitness_module,'init_history'):
+        fitness_module.init_history(history, trackin, trackout, prmt, rng)
+    signal = fitness_module.inputs(trackin, prmt, rng) if hasattr(fitness_module,'inputs') else None
+    ds = numpy.zeros((size,ncelltot,ntries))
+    ligands = numpy.zeros((size,ncelltot,ntries)) if variation else None
+    with numpy.errstate(all='ignore'):
+        for step in range(nstep-1):
+            if signal is not None:
+                history[trackin,step] = signal[:,step]
+            s = history[:,step]
+            derivNumpy(s, history, step, ds, prm, ligands, noisy_increment)
+            if variation:
+                for lig,external in zip(tracklig,externallig):
+                    ligands[lig] = s[lig] if external else (s[lig][neighbors]*distant).sum(axis=1)
+            if trackdiff:
+                sdiff = s[trackdiff]
+                ds[trackdiff] += diff_constant*((sdiff[:,neighbors]*valid).sum(axis=2)-n_localneig*sdiff)
+            history[:,step+1] = s+dt*ds
+            if not variation:
+                numpy.maximum(history[:,step+1],0,out=history[:,step+1])
+        if signal is not None:
+            history[trackin,nstep-1] = signal[:,nstep-1]
+        out_list = fitness_module.fitness(history, trackin, trackout, prmt)
+    out_list = [value if isinstance(value,str) else "%f" % value for value in out_list]
+    return [out_list, numpy.moveaxis(history,3,0) if print_buf else None]
@@ -142,6 +142,8 @@ list_types_output=['TF']
 # =0 serial processing, only one C job running at a time
 # =1 threaded, multiple C jobs started on one machine to use multi-core capabilities
 # =2 multiple computers, cluster, using mpirun See HowTo in /Doc
+# =3 like 1 but at most prmt['compile_slots'] compilations and prmt['run_slots'] C jobs at a time (asyncio)
+# =4 integrate the networks with the same shape with a single C program (batch)
 prmt['multipro_level'] = 1
 
 # turns on the pareto module in run_evolution.py
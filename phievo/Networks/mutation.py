@@ -478,6 +478,31 @@ class Mutable_Network(classes_eds2.Network):
 
 ################## mutation/integration tools for one network #####################
 
+    def mutate(self,tgeneration):
+        """ function to perform the mutations occuring during tgeneration
+
+        Args:
+            tgeneration (float): the time before the next gen.
+
+        Returns:
+            int: the number of mutations performed
+        """
+        n_mutations,age = 0,0
+        self.last_mutation = []
+        backup = self.last_mutation
+        while True:
+            tau,next_mutation = self.compute_next_mutation()
+            age += tau
+            if age > tgeneration: break #exit the loop when enough time has passed
+            exec("self."+next_mutation)
+            self.last_mutation.append(next_mutation)
+            n_mutations+=1
+        if n_mutations==0:
+            self.last_mutation=backup
+        age -= tgeneration
+        self.data_next_mutation[0:2] = [age,next_mutation]  #keeps track of the time and type of the next mutation
+        return n_mutations
+
     def mutate_and_integrate(self,prmt,nnetwork,tgeneration,mutation=True):
         """ function to mutate, integrate and update the fitness
 
@@ -496,21 +521,7 @@ class Mutable_Network(classes_eds2.Network):
                 - self (:class:`Mutable_Network <phievo.Networks.mutation.Mutable_Network>`): the Mutable_Network object itself
                 - result (list): output of treatment_fitness (see compile_and_integrate)
         """
-        n_mutations,age = 0,0
-        if mutation:
-            self.last_mutation = []
-            backup = self.last_mutation
-            while True:
-                tau,next_mutation = self.compute_next_mutation()
-                age += tau
-                if age > tgeneration: break #exit the loop when enough time has passed
-                exec("self."+next_mutation)
-                self.last_mutation.append(next_mutation)
-                n_mutations+=1
-            if n_mutations==0:
-                self.last_mutation=backup
-            age -= tgeneration
-            self.data_next_mutation[0:2] = [age,next_mutation]  #keeps track of the time and type of the next mutation
+        n_mutations = self.mutate(tgeneration) if mutation else 0
         self.Cseed = self.compute_Cseed()
         result = compile_and_integrate(self,prmt,nnetwork,0,self.Cseed)
         return [n_mutations,nnetwork,self,result]
@@ -0,0 +1,97 @@
+"""
+Expand the population class of evolution_gillespie to pipeline the
+compilation and the execution of the integrators with asyncio
+"""
+from .evolution_gillespie import Population
+from phievo.Networks import deriv2
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+
+class asyncio_Population(Population):
+    """Update the Population class to evaluate the networks with asyncio
+
+    Unlike thread_Population, which starts one thread per network, the
+    compilations and the executions are run in two pools of bounded size:
+    prmt['compile_slots'] and prmt['run_slots'] (number of cores by default).
+    A network is executed as soon as it is compiled while the next ones are
+    compiling, and its fitness is updated as soon as its execution is over.
+    A failed compilation or execution stops the generation with a RuntimeError
+    once the compilations and executions in progress are over.
+    """
+    def __init__(self,namefolder):
+        Population.__init__(self,namefolder)
+
+    def pop_mutate_and_integrate(self,initial,first_mutated,last_mutated,prmt,net_stat):
+        """ Recompute the fitness for half the population and mutate/compute the fitness for the rest.
+        Save all the data in net_stat
+
+        Args:
+            initial (int): index of the first individual in population
+            first_mutated (int): index of the first mutated individual in population
+            last_mutated (int): index of the last mutated individual in population
+            prmt (dict): the inits parameters for integration
+            net_stat (NetworkStat): to store the population data
+
+        Returns:
+            None: in place modification
+        """
+        self.n_mutations=0
+        asyncio.run(self.async_mutate_and_integrate(initial,first_mutated,last_mutated,prmt))
+        for individual in self.genus:
+            net_stat.add_net(individual)
+
+    async def async_mutate_and_integrate(self,initial,first_mutated,last_mutated,prmt):
+        """Schedule the evaluation of the networks between initial and last_mutated
+
+        Args:
+            initial (int): index of the first individual in population
+            first_mutated (int): index of the first mutated individual in population
+            last_mutated (int): index of the last mutated individual in population
+            prmt (dict): the inits parameters for integration
+
+        Returns:
+            None: in place modification
+        """
+        ncores = os.cpu_count() or 1
+        with ThreadPoolExecutor(prmt.get('compile_slots',ncores)) as compile_pool, ThreadPoolExecutor(prmt.get('run_slots',ncores)) as run_pool:
+            tasks = [self.async_genus_mutate_and_integrate(prmt,nnetwork,nnetwork>=first_mutated,compile_pool,run_pool)
+                     for nnetwork in range(initial,last_mutated)]
+            await asyncio.gather(*tasks)
+
+    async def async_genus_mutate_and_integrate(self,prmt,nnetwork,mutation,compile_pool,run_pool):
+        """mutate, and update the fitness of one individual (see genus_mutate_and_integrate)
+
+        The mutations are done in the event loop, so in the same order as
+        in the serial version, the code generation and the compilation in
+        compile_pool and the execution in run_pool.
+
+        Args:
+            prmt (dict): the inits parameters for integration
+            nnetwork (int): the index of the network in the population
+            mutation (bool): a flag to activate mutation
+            compile_pool (ThreadPoolExecutor): the compilation slots
+            run_pool (ThreadPoolExecutor): the execution slots
+
+        Returns:
+            int: the number of mutation
+            int: the index of the network in the population
+            Network: The resulting network after mutation
+
+        Raise:
+            RuntimeError: if the compilation or the execution exits (see deriv2.compile_program)
+        """
+        loop = asyncio.get_running_loop()
+        network = self.genus[nnetwork]
+        n_mutations = network.mutate(self.tgeneration) if mutation else 0
+        network.Cseed = network.compute_Cseed()
+        try:
+            run = await loop.run_in_executor(compile_pool,deriv2.compile_integrator,network,prmt,nnetwork,0,network.Cseed)
+            result = None if run is None else await loop.run_in_executor(run_pool,run)
+        except SystemExit as exit: # would stop the event loop without closing the pools
+            raise RuntimeError("The integration of network %i failed" % nnetwork) from exit
+        if n_mutations:
+            network.flag_mutation = True
+        self.update_fitness(nnetwork,result)
+        self.n_mutations+=n_mutations
+        return [n_mutations,nnetwork,network]
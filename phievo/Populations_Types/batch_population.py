@@ -0,0 +1,46 @@
+"""
+Expand the population class of evolution_gillespie to integrate all the
+networks of a generation with one program per shape of network
+"""
+from .evolution_gillespie import Population
+from phievo.Networks import deriv2
+
+class batch_Population(Population):
+    """Update the Population class to evaluate the networks with deriv2.batch_integrate
+
+    The networks are mutated in the same order as in the serial version, then
+    the networks whose C-files only differ by derivC are compiled and run as
+    a single program, which saves one compilation and one process per network.
+    """
+    def __init__(self,namefolder):
+        Population.__init__(self,namefolder)
+
+    def pop_mutate_and_integrate(self,initial,first_mutated,last_mutated,prmt,net_stat):
+        """ Recompute the fitness for half the population and mutate/compute the fitness for the rest.
+        Save all the data in net_stat
+
+        Args:
+            initial (int): index of the first individual in population
+            first_mutated (int): index of the first mutated individual in population
+            last_mutated (int): index of the last mutated individual in population
+            prmt (dict): the inits parameters for integration
+            net_stat (NetworkStat): to store the population data
+
+        Returns:
+            None: in place modification
+        """
+        self.n_mutations=0
+        nnetworks = list(range(initial,last_mutated))
+        for nnetwork in nnetworks:
+            network = self.genus[nnetwork]
+            n_mutations = network.mutate(self.tgeneration) if nnetwork>=first_mutated else 0
+            network.Cseed = network.compute_Cseed()
+            if n_mutations:
+                network.flag_mutation = True
+            self.n_mutations+=n_mutations
+        networks = [self.genus[nnetwork] for nnetwork in nnetworks]
+        results = deriv2.batch_integrate(networks,prmt,nnetworks,[network.Cseed for network in networks])
+        for nnetwork,result in zip(nnetworks,results):
+            self.update_fitness(nnetwork,result)
+        for individual in self.genus:
+            net_stat.add_net(individual)
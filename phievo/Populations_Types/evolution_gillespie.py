@@ -23,6 +23,7 @@ if __verbose__:
 
 import phievo.Networks.classes_eds2 as classes_eds2
 import phievo.Networks.mutation as mutation
+import phievo.Networks.deriv2 as deriv2
 import gc # Garbage collector
 from math import log,sqrt
 import copy,os,random,sys,glob
@@ -402,6 +403,8 @@ class Population(object):
                 net_stat.output()
                 print("Total number of mutations: %i"%self.n_mutations)
                 gen_stat.output()
+                if prmt.get('compiler_cache_dir'):
+                    print("Compiler cache: %(hit)i hits, %(miss)i misses"%deriv2.compiler_cache_stats)
 
             # save an exact copy of genus and relevant parameters for continuing loop
             if( t_gen%prmt['restart']['freq'] == 0):
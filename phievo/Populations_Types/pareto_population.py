@@ -13,6 +13,8 @@ print('Execute pareto_population.py')
 
 from phievo.Populations_Types.evolution_gillespie import Population
 from phievo.Populations_Types.thread_population import thread_Population
+from phievo.Populations_Types.asyncio_population import asyncio_Population
+from phievo.Populations_Types.batch_population import batch_Population
 import random
 from phievo.Networks import classes_eds2
 from math import log,sqrt
@@ -217,5 +219,17 @@ class pareto_thread_Population(pareto_Population,thread_Population):
     """
     pop_mutate_and_integrate = thread_Population.pop_mutate_and_integrate
 
+class pareto_asyncio_Population(pareto_Population,asyncio_Population):
+    """Update the pareto_Population class to pipeline the integrations with asyncio
+    (see pareto_thread_Population)
+    """
+    pop_mutate_and_integrate = asyncio_Population.pop_mutate_and_integrate
+
+class pareto_batch_Population(pareto_Population,batch_Population):
+    """Update the pareto_Population class to integrate the networks by batches
+    (see pareto_thread_Population)
+    """
+    pop_mutate_and_integrate = batch_Population.pop_mutate_and_integrate
+
 if __name__ == "__main__":
     print(pcompare([999,0],[0.5,-0.5],2))
@@ -98,14 +98,20 @@ def check_model_dir(model):
         for key,ff in init_module.pfile.items():
             ff=ff.replace(".",os.sep)            
             if not os.path.isfile(ff+".py"):
+                dotted = os.path.join(os.path.normpath(model_dir),ff).replace(os.sep,".")
                 if os.path.isfile(os.path.join(model_dir,ff)+".py"):
-                    inits.pfile[key] = os.path.join(model_dir,ff).replace(os.sep,".")
+                    # an absolute or ../ model_dir has no dotted name, the module is then
+                    # imported by its own name (model_dir is ahead in sys.path)
+                    if all(name.isidentifier() for name in dotted.split(".")):
+                        inits.pfile[key] = dotted
                 else:
                     raise FileNotFoundError("ERROR: A python file cannot be found:\n{} doesn't match a file.".format(ff+".py"))
     for key,ff in init_module.cfile.items():
         if not os.path.isfile(ff):
             if os.path.isfile(os.path.join(model_dir,ff)):
                 inits.cfile[key] = os.path.join(model_dir,ff)
+            elif os.path.isfile(os.path.join(ccode_dir,ff)):
+                inits.cfile[key] = os.path.join(ccode_dir,ff) # stock file, e.g. dopri5_integrator.c
             else:
                 raise FileNotFoundError("ERROR: The c file cannot be found:\n{} doesn't match a file.".format(ff))
 
@@ -118,7 +124,8 @@ def check_model_dir(model):
         "utilities" : os.path.join(ccode_dir,'utilities.c'),
         "geometry" : os.path.join(ccode_dir,'linear_geometry.c'),
         "integrator" : os.path.join(ccode_dir,'euler_integrator.c'),
-        "main" : os.path.join(ccode_dir,'main_general.c')
+        "main" : os.path.join(ccode_dir,'main_general.c'),
+        "runtime_parameters" : os.path.join(ccode_dir,'runtime_parameters.c')
         }
 
     try:
@@ -174,6 +181,11 @@ def init_networks(inits):
         if (inits.prmt['langevin_noise'] > 0):
             deriv2.noise_flag = 1
 
+    if "numpy_fitness" in inits.pfile:
+        # python fitness used by the numpy backend (prmt['backend'] = 'numpy')
+        deriv_numpy = import_module('phievo.Networks.deriv_numpy')
+        deriv_numpy.fitness_module = import_module(inits.pfile["numpy_fitness"])
+
     if inits.pfile["deriv2"] and inits.pfile["deriv2"] != "phievo.Networks.deriv2":
         mod_deriv2 = import_module(inits.pfile["deriv2"])
         deriv2 = mod_deriv2.modifier(deriv2)
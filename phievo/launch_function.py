@@ -161,6 +161,26 @@ def launch_seed(seed,inits,init_file):
             from phievo.Populations_Types.parallel_population import parallel_Population
             population = parallel_Population(namefolder)
 
+    # Population construction for multiprocessor run on one machine, with pipelined compilations and executions
+    elif (inits.prmt['multipro_level'] == 3):
+        if (inits.prmt['pareto']):
+            from phievo.Populations_Types.pareto_population import pareto_asyncio_Population
+            population = pareto_asyncio_Population(namefolder, inits.prmt['npareto_functions'],
+                                                   inits.prmt['rshare'])
+        else:
+            from phievo.Populations_Types.asyncio_population import asyncio_Population
+            population = asyncio_Population(namefolder)
+
+    # Population construction for a run with one program per shape of network
+    elif (inits.prmt['multipro_level'] == 4):
+        if (inits.prmt['pareto']):
+            from phievo.Populations_Types.pareto_population import pareto_batch_Population
+            population = pareto_batch_Population(namefolder, inits.prmt['npareto_functions'],
+                                                 inits.prmt['rshare'])
+        else:
+            from phievo.Populations_Types.batch_population import batch_Population
+            population = batch_Population(namefolder)
+
     # Population construction for multiprocessor run on one machine
     elif (inits.prmt['multipro_level'] == 1):
         if (inits.prmt['pareto']):
@@ -203,6 +223,7 @@ def test_project(project_path,network=None,return_sim= False):
     """
     from phievo.AnalysisTools import Simulation
     sim = Simulation(project_path,mode="test")
+    sim.inits.prmt["compile_in_memory"] = False # keep the C file in Workplace
     if network:
         net = phievo.read_network(network)
     else:
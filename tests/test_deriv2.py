@@ -0,0 +1,489 @@
+"""
+Test module for the C code generation tools of
+phievo.Networks.deriv2
+"""
+import unittest
+import contextlib
+import copy
+import os
+import random
+import numpy
+import shutil
+import subprocess
+import tempfile
+import phievo
+from phievo import initialization_code
+from phievo.Networks import deriv2
+from phievo.Populations_Types import asyncio_population,evolution_gillespie,population_stat
+
+examples_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(phievo.__file__))),'Examples')
+
+@unittest.skipUnless(shutil.which('gcc') and os.path.isdir(examples_dir),"requires gcc and the Examples directory")
+class ExampleTestCase(unittest.TestCase):
+    """Compile and run the C files of Examples/adaptation with a fixed network
+    (an incoherent feedforward loop of the input)"""
+    @classmethod
+    def setUpClass(cls):
+        from phievo.Networks import interaction,mutation
+        cls.cfile = dict(deriv2.cfile)
+        model_dir,cls.inits,init_file = initialization_code.check_model_dir(os.path.join(examples_dir,'adaptation'))
+        deriv2.cfile.update(cls.inits.cfile)
+        cls.net = mutation.Mutable_Network(random.Random(0))
+        signal = cls.net.new_Species([['Degradable',0.5],['TF',1],['Input',0]])
+        tm,prom,output = cls.net.new_gene(1.0,0,[['Degradable',0.5],['TF',1],['Output',0]])
+        tm_repressor,prom_repressor,repressor = cls.net.new_gene(0.2,0,[['Degradable',0.2],['TF',0]])
+        cls.net.new_TFHill(signal,1.0,0.5,tm,activity=1)
+        cls.net.new_TFHill(signal,1.0,0.5,tm_repressor,activity=1)
+        cls.net.new_TFHill(repressor,1.0,0.5,tm,activity=0)
+        cls.net.write_id()
+
+    @classmethod
+    def tearDownClass(cls):
+        deriv2.cfile.clear()
+        deriv2.cfile.update(cls.cfile)
+
+    def run_example(self, print_buf=False, **update):
+        """Return the output of treatment_fitness with the prmt of the example updated,
+        with print_buf also the mean of every species over the tries and time steps"""
+        prmt = dict(self.inits.prmt,ntries=6,binary_buffer=True)
+        prmt.update(update)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory,'run.c'),'w') as programm_file:
+                deriv2.write_program(programm_file,self.net,prmt,print_buf,1234)
+            executable = deriv2.compile_program(os.path.join(directory,'run'),prmt)
+            output = subprocess.run([executable],cwd=directory,capture_output=True,text=True,check=True).stdout.split()
+            if not print_buf:
+                return output
+            nspecies = len(self.net.dict_types['Species'])
+            histories = [deriv2.load_history(os.path.join(directory,'Buffer%i' % ntry),nspecies,prmt['nstep'],prmt['ncelltot'])
+                         for ntry in range(prmt['ntries'])]
+            return [output,numpy.mean(histories,axis=(0,2,3))]
+
+    def integrate(self, **update):
+        """Return the output of compile_and_integrate with the prmt of the example updated"""
+        prmt = dict(self.inits.prmt,ntries=6)
+        prmt.update(update)
+        with tempfile.TemporaryDirectory() as directory:
+            return deriv2.compile_and_integrate(self.net,dict(prmt,workplace_dir=directory),0,False,1234)
+
+    @contextlib.contextmanager
+    def program_modifier(self):
+        """Replace write_program as a pfile['deriv2'] modifier does (see deriv2.program_modifier)"""
+        write_program = deriv2.write_program
+        def modified_write_program(programm_file, net, prmt, print_buf, Cseed=0):
+            return write_program(programm_file, net, prmt, print_buf, Cseed)
+        deriv2.write_program = modified_write_program
+        try:
+            yield
+        finally:
+            deriv2.write_program = write_program
+
+class TestRuntimeParameters(unittest.TestCase):
+    def tearDown(self):
+        deriv2.code_context.parameters = None
+        deriv2.code_context.delays = None
+
+    def test_param_inC_literal(self):
+        self.assertEqual(deriv2.param_inC(0.5),"0.500000")
+        self.assertEqual(deriv2.param_inC(3,"%i"),"3")
+        self.assertEqual(deriv2.param_inC(0.25,"%s"),"0.25")
+
+    def test_param_inC_runtime(self):
+        deriv2.code_context.parameters = []
+        self.assertEqual(deriv2.param_inC(0.5),"prm[0]")
+        self.assertEqual(deriv2.param_inC(3,"%i"),"((int)prm[1])")
+        self.assertEqual(deriv2.code_context.parameters,[0.5,3])
+
+    def test_param_inC_delays(self):
+        deriv2.code_context.parameters = []
+        deriv2.code_context.delays = []
+        deriv2.param_inC(0.5)
+        deriv2.param_inC(3,"%i")
+        self.assertEqual(deriv2.code_context.delays,["((int)prm[1])"])
+        code = deriv2.min_delay2C(deriv2.code_context.delays)
+        self.assertIn("int delays[] = {((int)prm[1]), 0};",code)
+        self.assertIn("for (i=0;i<1;i++)",code)
+
+    def test_runtime_parameters2str(self):
+        data = deriv2.runtime_parameters2str([0.1,2],dict(generation=4),True,Cseed=12)
+        self.assertEqual(data.split(),["12","4","1","2","0.10000000000000001","2"])
+    def test_runtime_parameters_mode(self):
+        self.assertFalse(deriv2.runtime_parameters_mode({}))
+        self.assertTrue(deriv2.runtime_parameters_mode(dict(runtime_parameters=True)))
+        self.assertTrue(deriv2.runtime_parameters_mode(dict(backend="shared_library")))
+        self.assertTrue(deriv2.runtime_parameters_mode(dict(precompiled_objects=True)))
+
+    def test_cache_entry(self):
+        cache = deriv2.OrderedDict()
+        first = deriv2.get_cache_entry(cache,"a",dict(integrator_cache_size=2))
+        deriv2.get_cache_entry(cache,"b",dict(integrator_cache_size=2))
+        self.assertIs(deriv2.get_cache_entry(cache,"a",dict(integrator_cache_size=2)),first)
+        deriv2.get_cache_entry(cache,"c",dict(integrator_cache_size=2))
+        self.assertEqual(list(cache),["a","c"])
+
+    def test_allows_executables(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertTrue(deriv2.allows_executables(directory))
+            self.assertFalse(deriv2.allows_executables(os.path.join(directory,"missing")))
+
+    def test_cache_entry_in_use(self):
+        prmt = dict(integrator_cache_size=1)
+        cache = deriv2.OrderedDict()
+        with tempfile.TemporaryDirectory() as directory:
+            entry = deriv2.get_cache_entry(cache,"in_use",prmt)
+            entry['path'] = os.path.join(directory,"run")
+            open(entry['path'],"w").close()
+            other = deriv2.get_cache_entry(cache,"other",prmt)
+            self.assertEqual(list(cache),["other"])
+            self.assertTrue(os.path.exists(entry['path'])) # still held by its run
+            self.assertIs(deriv2.get_cache_entry(cache,"in_use",prmt),entry)
+            deriv2.release_cache_entry(other) # "other" is evicted and no longer held
+            deriv2.release_cache_entry(entry)
+            self.assertTrue(os.path.exists(entry['path']))
+            path = entry['path']
+            deriv2.get_cache_entry(cache,"other",prmt)
+            deriv2.release_cache_entry(entry)
+            self.assertFalse(os.path.exists(path))
+            self.assertNotIn("in_use",deriv2.evicted_entries)
+class TestCellBatched(unittest.TestCase):
+    def test_derivC2cells(self):
+        deriv_code = deriv2.derivC_signature+"\n int index;\t for (index=0;index<SIZE;index++) ds[index]=0;//initialization\n"
+        deriv_code += "\t \t rate=prm[0]*s[1]*HIST(2,memory,ncell);\n\t \t ds[1]-=rate;\n}\n\n"
+        code = deriv2.derivC2cells(deriv_code)
+        self.assertTrue(code.startswith("void derivC(double history[][NSTEP][NCELLTOT],int step, double ds[][NCELLTOT]){"))
+        self.assertIn("rate=prm[0]*HIST(1,step,ncell)*HIST(2,memory,ncell);",code)
+        self.assertIn("ds[1][ncell]-=rate;",code)
+        self.assertNotIn("ds[index]=0",code)
+
+    def test_custom_derivC(self):
+        with self.assertRaises(ValueError):
+            deriv2.derivC2cells("void derivC(double s[]){}")
+
+class TestJacobian(unittest.TestCase):
+    def test_compute_jacobian_leap(self):
+        code = deriv2.compute_jacobian_leap(["s[0]","s[1]"],["s[2]"],[["s[0]","0.5*s[1]"],["s[1]","0.5*s[0]"]])
+        self.assertEqual(code.split(),["drate=0.5*s[1];","jac[0][0]-=drate;","jac[1][0]-=drate;","jac[2][0]+=drate;",
+                                       "drate=0.5*s[0];","jac[0][1]-=drate;","jac[1][1]-=drate;","jac[2][1]+=drate;"])
+
+    def test_missing_jacobian(self):
+        net = phievo.Networks.classes_eds2.Network()
+        net.new_Species([['Degradable',0.5]])
+        self.assertIn("jac[0][0]-=drate;",deriv2.write_jacobianC(net))
+        deriv2.interactions_deriv_inC["Degradable"] = lambda net: "" # an interaction of the network without Jacobian
+        try:
+            with self.assertRaises(ValueError):
+                deriv2.write_jacobianC(net)
+        finally:
+            del deriv2.interactions_deriv_inC["Degradable"]
+
+class TestGillespie(unittest.TestCase):
+    def test_dependency_graph(self):
+        reactions = [[["s[0]","s[1]"],["s[2]"],"2.0*s[0]*s[1]"],
+                     [["s[2]"],["s[0]","s[1]"],"1.0*s[2]"],
+                     [[],["s[1]"],"(step>=5 ? HillA(HIST(0,step-5,ncell),0.5,2.0) : 0)"],
+                     [["s[3]"],[],"0.5*s[3]"]]
+        dependents,step_dependent = deriv2.gillespie_dependency_graph(reactions,[3])
+        self.assertEqual(dependents,[[0,1],[0,1],[0],[3]])
+        self.assertEqual(step_dependent,[2,3])
+
+    def test_missing_reactions(self):
+        net = phievo.Networks.classes_eds2.Network()
+        net.new_Species([['Degradable',0.5]])
+        net.write_id()
+        deriv2.write_gillespieC(net)
+        deriv2.interactions_deriv_inC["Degradable"] = lambda net: "" # an interaction of the network without reactions
+        try:
+            with self.assertRaises(ValueError):
+                deriv2.write_gillespieC(net)
+        finally:
+            del deriv2.interactions_deriv_inC["Degradable"]
+
+    def test_stoichiometry(self):
+        reactions = [[["s[0]","s[0]"],["s[1]"],"s[0]*s[0]"],
+                     [["s[1]"],["s[1]","s[2]"],"s[1]"]]
+        self.assertEqual(deriv2.gillespie_stoichiometry(reactions),[{0:-2,1:1},{2:1}])
+
+class TestStiffnessRouting(unittest.TestCase):
+    def setUp(self):
+        self.net = phievo.Networks.classes_eds2.Network()
+        self.net.new_Species([['Degradable',0.5]])
+        self.net.new_Species([['Degradable',20.0],['Diffusible',1.0]])
+        deriv2.cfile.setdefault('integrator','euler_integrator.c')
+
+    def test_fastest_rate(self):
+        self.assertAlmostEqual(deriv2.fastest_rate(self.net,nneighbor=2),24.0)
+
+    def test_route_integrator(self):
+        prmt = dict(dt=0.01)
+        self.assertEqual(deriv2.route_integrator(self.net,prmt),[prmt,None])
+        routed,name = deriv2.route_integrator(self.net,dict(prmt,stiffness_routing={}))
+        self.assertEqual(name,'euler_integrator.c')
+        routed,name = deriv2.route_integrator(self.net,dict(dt=0.1,stiffness_routing={}))
+        self.assertEqual(name,'dopri5_integrator.c')
+        routed,name = deriv2.route_integrator(self.net,dict(dt=1,stiffness_routing={}))
+        self.assertEqual(name,'implicit_euler_integrator.c')
+        self.assertTrue(routed['jacobian'])
+
+    def test_custom_integrator(self):
+        prmt = dict(dt=1,stiffness_routing={},integrator='/project/integrator_pMHC_improved.c')
+        self.assertEqual(deriv2.route_integrator(self.net,prmt),[prmt,None])
+        self.assertTrue(deriv2.is_stock_euler(os.path.join(phievo.initialization_code.ccode_dir,'euler_integrator.c')))
+
+class TestOpenMPTries(ExampleTestCase):
+    def test_number_of_threads(self):
+        self.assertEqual(self.run_example(openmp_tries=1),self.run_example(openmp_tries=3))
+
+class TestSharedLibrary(ExampleTestCase):
+    def test_shared_library(self):
+        self.assertEqual(self.integrate(backend='shared_library'),self.integrate())
+
+    def test_program_modifier(self):
+        self.assertIsNone(deriv2.program_modifier())
+        with self.program_modifier():
+            self.assertEqual(deriv2.program_modifier(),__name__)
+            with self.assertRaises(ValueError):
+                self.integrate(backend='shared_library')
+
+class TestPrecompiledObjects(ExampleTestCase):
+    def test_precompiled_objects(self):
+        self.assertEqual(self.integrate(precompiled_objects=True),self.integrate())
+
+    def test_program_modifier(self):
+        with self.program_modifier():
+            self.assertEqual(self.integrate(precompiled_objects=True),self.integrate())
+
+class TestBatch(ExampleTestCase):
+    def setUp(self):
+        self.networks = [copy.deepcopy(self.net) for index in range(3)]
+        for index,network in enumerate(self.networks):
+            network.dict_types['TFHill'][0].threshold = 0.3+0.2*index
+
+    def compare(self):
+        """Compare batch_integrate with compile_and_integrate for every network"""
+        with tempfile.TemporaryDirectory() as directory:
+            prmt = dict(self.inits.prmt,ntries=2,workplace_dir=directory)
+            results = deriv2.batch_integrate(self.networks,prmt,[0,1,2],[11,12,13])
+            self.assertEqual(len(set(result[0] for result in results)),3)
+            for nnetwork,network in enumerate(self.networks):
+                self.assertEqual(results[nnetwork],deriv2.compile_and_integrate(network,prmt,nnetwork,False,11+nnetwork))
+
+    def test_batch_integrate(self):
+        self.compare()
+
+    def test_program_modifier(self):
+        with self.program_modifier():
+            self.compare()
+
+class TestCompileInMemory(ExampleTestCase):
+    def test_compile_in_memory(self):
+        if not any(deriv2.allows_executables(parent) for parent in ['/dev/shm',tempfile.gettempdir()]):
+            self.skipTest("the scratch directory falls back to workplace_dir")
+        reference = self.integrate()
+        for update in [{},dict(runtime_parameters=True)]:
+            with tempfile.TemporaryDirectory() as directory:
+                prmt = dict(self.inits.prmt,ntries=6,workplace_dir=directory,compile_in_memory=True,**update)
+                self.assertEqual(deriv2.compile_and_integrate(self.net,prmt,0,False,1234),reference)
+                self.assertEqual(os.listdir(directory),[]) # neither C-file nor executable
+        self.assertTrue(deriv2.allows_executables(deriv2.scratch_directory))
+
+class TestAsyncioPopulation(ExampleTestCase):
+    """multipro_level 3 (see Populations_Types/asyncio_population.py)"""
+    def population(self, population_class):
+        """Return a population of three networks differing by a threshold, without
+        the initialization of Population.__init__ from the project"""
+        population = population_class.__new__(population_class)
+        population.genus = [copy.deepcopy(self.net) for index in range(3)]
+        for index,network in enumerate(population.genus):
+            network.dict_types['TFHill'][0].threshold = 0.3+0.2*index
+        population.tgeneration = 0.01
+        return population
+
+    def evaluate(self, population_class, **update):
+        population = self.population(population_class)
+        with tempfile.TemporaryDirectory() as directory:
+            prmt = dict(self.inits.prmt,ntries=2,workplace_dir=directory,**update)
+            population.pop_mutate_and_integrate(0,3,3,prmt,population_stat.NetworkStat(evolution_gillespie.stat_dict))
+        return [network.fitness for network in population.genus]
+
+    def test_fitness(self):
+        fitness = self.evaluate(evolution_gillespie.Population)
+        self.assertEqual(len(set(fitness)),3)
+        self.assertEqual(self.evaluate(asyncio_population.asyncio_Population),fitness)
+
+    def test_failed_compilation(self):
+        with self.assertRaises(RuntimeError):
+            self.evaluate(asyncio_population.asyncio_Population,compiler_flags="-fno-such-option")
+
+class TestHistoryLayout(ExampleTestCase):
+    def test_time_major(self):
+        output = self.run_example()
+        self.assertEqual(self.run_example(history_layout='time_major'),output)
+        self.assertEqual(self.run_example(history_layout='time_major',cell_batched=True),output)
+
+    def test_input_writing_output(self):
+        """An input function doubling the Output every 1000 steps (Examples/Somites/input_bifurcation.c also sets it)"""
+        input_file = deriv2.cfile['input']
+        with tempfile.TemporaryDirectory() as directory:
+            deriv2.cfile['input'] = os.path.join(directory,'input.c')
+            with open(deriv2.cfile['input'],'w') as programm_file:
+                programm_file.write("#define inputs project_inputs\n"+open(input_file).read()+"#undef inputs\n")
+                programm_file.write("void inputs(int pas,int ncell,int n_attempts){\n"
+                                    "  project_inputs(pas,ncell,n_attempts);\n"
+                                    "  if (pas%1000==0) history[trackout[0]][pas][ncell]*=2;\n}\n")
+            try:
+                output = self.run_example()
+                self.assertEqual(self.run_example(history_layout='time_major'),output)
+                self.assertEqual(self.run_example(history_layout='time_major',cell_batched=True),output)
+            finally:
+                deriv2.cfile['input'] = input_file
+        self.assertNotEqual(output,self.run_example())
+
+class TestIntegrators(ExampleTestCase):
+    """Every integrator of CCodes on the network of ExampleTestCase"""
+    def assertClose(self, output, reference, rtol):
+        numpy.testing.assert_allclose(numpy.array(output,dtype=float),numpy.array(reference,dtype=float),rtol=rtol)
+
+    def integrator(self, name):
+        return os.path.join(initialization_code.ccode_dir,name)
+
+    def test_deterministic(self):
+        euler = self.run_example()
+        self.assertClose(self.run_example(integrator=self.integrator('dopri5_integrator.c')),euler,0.02)
+        self.assertClose(self.run_example(integrator=self.integrator('implicit_euler_integrator.c'),jacobian=True),euler,0.02)
+        self.assertClose(self.run_example(integrator=self.integrator('stochastic_heun_integrator.c')),euler,0.02)
+
+    def test_cell_batched(self):
+        """Identical to euler_integrator.c without optimization flags (see derivC2cells)"""
+        for ncelltot in [1,3]:
+            self.assertEqual(self.run_example(ncelltot=ncelltot,cell_batched=True),self.run_example(ncelltot=ncelltot))
+
+    def test_early_termination(self):
+        euler = self.run_example()
+        self.assertEqual(self.run_example(early_termination=True),euler)
+        steady_state = self.run_example(steady_state=True)
+        self.assertEqual(steady_state[:len(euler)],euler)
+        self.assertIn("#steady_state_skipped",steady_state)
+
+    def test_routed(self):
+        prmt = dict(self.inits.prmt,ntries=2,stiffness_routing={})
+        with tempfile.TemporaryDirectory() as directory:
+            result = deriv2.compile_and_integrate(self.net,dict(prmt,workplace_dir=directory),0)
+        self.assertEqual(result[-1],deriv2.route_integrator(self.net,prmt)[1])
+        self.assertTrue(numpy.isfinite(numpy.array(" ".join(result[:-1]).split(),dtype=float)).all())
+
+    def test_fast_rng(self):
+        self.assertEqual(self.run_example(fast_rng=True),self.run_example(fast_rng=True,openmp_tries=2))
+
+    def test_stochastic(self):
+        """The mean output follows the deterministic one for 1000 molecules per unit of concentration"""
+        euler = self.run_example(True,ntries=2)[1][1]
+        for name in ['gillespie_integrator.c','tau_leaping_integrator.c','hybrid_integrator.c','next_subvolume_integrator.c']:
+            output,means = self.run_example(True,ntries=2,integrator=self.integrator(name),gillespie=1000)
+            self.assertAlmostEqual(means[1]/euler,1,delta=0.25,msg=name)
+        deriv2.noise_flag = True
+        try:
+            output,means = self.run_example(True,ntries=2,integrator=self.integrator('stochastic_heun_integrator.c'),langevin_noise=1000)
+        finally:
+            deriv2.noise_flag = False
+        self.assertAlmostEqual(means[1]/euler,1,delta=0.25)
+
+    def test_gillespie_volume(self):
+        self.assertEqual(deriv2.gillespie_volume(dict(gillespie=True,langevin_noise=0)),1)
+        self.assertEqual(deriv2.gillespie_volume(dict(gillespie=True,langevin_noise=100)),100)
+        with self.assertRaises(ValueError):
+            deriv2.gillespie_volume(dict(gillespie=-1))
+        output,means = self.run_example(True,ntries=1,integrator=self.integrator('gillespie_integrator.c'),gillespie=True,langevin_noise=0)
+        self.assertGreater(means[1],0)
+
+class TestStreamingFitness(unittest.TestCase):
+    def test_ring_size(self):
+        self.assertEqual(deriv2.ring_size(1),2)
+        self.assertEqual(deriv2.ring_size(2),2)
+        self.assertEqual(deriv2.ring_size(8),8)
+        self.assertEqual(deriv2.ring_size(11),16)
+
+class TestStreamingExample(ExampleTestCase):
+    """Examples/adaptation on the ring of streaming_fitness, with delayed transcriptions"""
+    def setUp(self):
+        self.net = copy.deepcopy(self.net)
+        for delay,promoter in zip([20,7],self.net.dict_types['CorePromoter']):
+            promoter.delay = delay
+        self.streaming = dict(record=['Species'],window=[self.inits.prmt['nstep']//12,self.inits.prmt['nstep']])
+
+    def test_streaming_fitness(self):
+        output = self.run_example()
+        self.assertEqual(self.run_example(streaming_fitness=self.streaming),output)
+        self.assertEqual(self.run_example(streaming_fitness=dict(self.streaming,record=['Species'],window=[0,100]),
+                                          print_buf=True)[0],output) # every species recorded for the Buffer files
+
+    def test_fitness_step(self):
+        """fitness_step compares the ring with history for the lookback steps of the window"""
+        fitness_file = deriv2.cfile['fitness']
+        with tempfile.TemporaryDirectory() as directory:
+            deriv2.cfile['fitness'] = os.path.join(directory,'fitness.c')
+            with open(deriv2.cfile['fitness'],'w') as programm_file:
+                programm_file.write(open(fitness_file).read())
+                programm_file.write("static TRY_LOCAL int ring_mismatch;\n"
+                                    "void fitness_step(int step, int trackout[], int ntry){\n"
+                                    "  int k,ncell;\n"
+                                    "  for (k=0;k<3 && step-k>=RECORD_FIRST;k++)\n"
+                                    "    for (ncell=0;ncell<NCELLTOT;ncell++)\n"
+                                    "      ring_mismatch+=HIST(trackout[0],step-k,ncell)!=history[trackout[0]][step-k][ncell];\n"
+                                    "  if (step==NSTEP-1) printf(\"#ring_mismatch %i\\n\",ring_mismatch);\n}\n")
+            try:
+                output = self.run_example(streaming_fitness=dict(self.streaming,fitness_step=True,lookback=3))
+            finally:
+                deriv2.cfile['fitness'] = fitness_file
+        reference = self.run_example()
+        self.assertEqual(output[-len(reference):],reference)
+        self.assertEqual(output[:-len(reference)],["#ring_mismatch","0"]*6)
+
+class TestFitnessCache(unittest.TestCase):
+    def tearDown(self):
+        deriv2.fitness_cache.clear()
+
+    def test_store_fitness(self):
+        prmt = dict(fitness_cache_size=2)
+        self.assertEqual(deriv2.store_fitness("a",["1.0"],prmt),["1.0"])
+        deriv2.store_fitness("b",None,prmt)
+        deriv2.store_fitness("c",["2.0"],prmt)
+        self.assertEqual(list(deriv2.fitness_cache.items()),[("b",None),("c",["2.0"])])
+
+    def test_no_key_without_deterministic(self):
+        self.assertIsNone(deriv2.fitness_cache_key(None,{}))
+        self.assertIsNone(deriv2.fitness_cache_key(None,dict(deterministic=True,langevin_noise=0.1)))
+
+class TestSplitOutput(unittest.TestCase):
+    def test_split_output(self):
+        self.assertEqual(deriv2.split_output("1.0\n2.0\n"),["1.0","2.0"])
+        self.assertIsNone(deriv2.split_output("1.0\n\n2.0"))
+        self.assertEqual(deriv2.split_output("1.0\n\n#steady_state_skipped 12\n"),["1.0","12"])
+        self.assertIsNone(deriv2.split_output("\n\n#steady_state_skipped 3\n"))
+
+class TestCompilerCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name,"cache")
+        self.output = os.path.join(self.directory.name,"output")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compiler_cache_key(self):
+        with open(self.output,"w") as source: source.write("int main(){return 0;}")
+        key = deriv2.compiler_cache_key(["gcc"],[self.output])
+        self.assertEqual(key,deriv2.compiler_cache_key(["gcc"],[self.output]))
+        self.assertNotEqual(key,deriv2.compiler_cache_key(["gcc","-c"],[self.output]))
+
+    def test_publish_fetch(self):
+        self.assertFalse(deriv2.fetch_compiled(self.cache_dir,"key",self.output))
+        with open(self.output,"w") as compiled: compiled.write("binary")
+        deriv2.publish_compiled(self.cache_dir,"key",self.output,{})
+        os.remove(self.output)
+        self.assertTrue(deriv2.fetch_compiled(self.cache_dir,"key",self.output))
+        with open(self.output) as compiled: self.assertEqual(compiled.read(),"binary")
+        deriv2.publish_compiled(self.cache_dir,"other",self.output,dict(compiler_cache_size=0))
+        self.assertEqual(os.listdir(self.cache_dir),[])
+
+if __name__ == '__main__':
+    unittest.main()
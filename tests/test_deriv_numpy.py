@@ -0,0 +1,35 @@
+"""
+Test module for the numpy backend phievo.Networks.deriv_numpy
+"""
+import unittest
+import numpy
+from phievo.Networks import deriv_numpy
+
+class TestDerivNumpy(unittest.TestCase):
+    def test_hill(self):
+        x = numpy.array([0.5,1.,2.])
+        numpy.testing.assert_allclose(deriv_numpy.HillA(x,1.,2.),[0.2,0.5,0.8])
+        numpy.testing.assert_allclose(deriv_numpy.HillR(x,1.,2.)+deriv_numpy.HillA(x,1.,2.),1.)
+
+    def test_compute_leap(self):
+        code = deriv_numpy.compute_leap(["s[0]"],["s[1]"],"prm[0]*s[0]")
+        self.assertEqual(code.split("\n")[0],"    rate = prm[0]*s[0]")
+        self.assertIn("    ds[0] -= increment",code)
+        self.assertIn("    ds[1] += increment",code)
+
+    def test_get_derivNumpy(self):
+        source = "def derivNumpy(s, history, step, ds, prm, ligands, noisy_increment):\n    ds[:] = 0\n"
+        source += deriv_numpy.compute_leap(["s[0]"],[],"prm[0]*s[0]")
+        derivNumpy = deriv_numpy.get_derivNumpy(source,{})
+        self.assertIs(deriv_numpy.get_derivNumpy(source,{}),derivNumpy)
+        s = numpy.ones((1,2,3))
+        ds = numpy.zeros((1,2,3))
+        derivNumpy(s,None,0,ds,numpy.array([0.5]),None,None)
+        numpy.testing.assert_allclose(ds,-0.5)
+
+    def test_geometry(self):
+        geometry = deriv_numpy.init_geometry(dict(ncelltot=3,nneighbor=3))
+        self.assertEqual(geometry.tolist(),[[-1,0,1],[0,1,2],[1,2,-1]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Test module for the loading of the projects by
+phievo.initialization_code
+"""
+import unittest
+import os
+import sys
+import tempfile
+from importlib import import_module
+from phievo import initialization_code
+
+class TestCheckModelDir(unittest.TestCase):
+    """A project with its plotdata module in the model directory"""
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.path = list(sys.path)
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        os.makedirs(os.path.join('project','Plots'))
+        with open(os.path.join('project','initialization_check.py'),'w') as init_file:
+            init_file.write("cfile = {}\npfile = {'plotdata': 'Plots.plotdata_check'}\n")
+        with open(os.path.join('project','Plots','plotdata_check.py'),'w') as plot_file:
+            plot_file.write("checked = True\n")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        sys.path[:] = self.path
+        for name in list(sys.modules):
+            if name.split('.')[0] in ['initialization_check','Plots','project']:
+                del sys.modules[name]
+        self.directory.cleanup()
+
+    def test_relative_model_dir(self):
+        model_dir,inits,init_file = initialization_code.check_model_dir('project')
+        self.assertEqual(inits.pfile['plotdata'],'project.Plots.plotdata_check')
+
+    def test_absolute_model_dir(self):
+        model_dir,inits,init_file = initialization_code.check_model_dir(os.path.abspath('project'))
+        self.assertEqual(inits.pfile['plotdata'],'Plots.plotdata_check')
+        self.assertTrue(import_module(inits.pfile['plotdata']).checked)
+
+if __name__ == '__main__':
+    unittest.main()